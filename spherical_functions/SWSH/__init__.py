@@ -8,9 +8,15 @@ import cmath
 
 import numpy as np
 import quaternion
-from quaternion.numba_wrapper import njit, jit, int64, xrange
+from quaternion.numba_wrapper import int64, xrange
+from .._jit import njit, jit
+from numba import prange
 
-from .. import (Wigner_coefficient as coeff, epsilon, LM_range)
+from .. import (_Wigner_coefficients, _Wigner_index, epsilon, LM_range, LM_index, LM_total_size, LMpM_index,
+                 direct_ell_max)
+
+# Approximate number of bytes of recursion workspace touched by each chunk of rotors in `SWSH_grid_recursive`
+_recursion_chunk_bytes = 2**25
 
 
 def SWSH(R, s, indices):
@@ -38,18 +44,41 @@ def SWSH(R, s, indices):
         The shape of this array is `indices.shape[0]`, and contains the values of the SWSH for the (ell,m) values
         specified in `indices`.
 
+    Values with ell > `spherical_functions.direct_ell_max` are computed by `SWSH_grid_recursive`, because the direct
+    sums lose accuracy for large ell.
+
     """
     indices = np.asarray(indices)
     if indices.size > 2 or not isinstance(R, np.ndarray):
         values = np.empty((indices.shape[0],), dtype=complex)
-        _SWSH(R.a, R.b, s, indices, values)
+        direct = indices[:, 0] <= direct_ell_max
+        values_direct = np.empty((np.count_nonzero(direct),), dtype=complex)
+        _SWSH(_Wigner_coefficients, R.a, R.b, s, indices[direct], values_direct)
+        values[direct] = values_direct
+        if not np.all(direct):
+            values[~direct] = _SWSH_recursive(R, s, indices[~direct])
+    elif indices[0] > direct_ell_max:
+        values = _SWSH_recursive(R, s, indices)[..., 0]
     else:
         values = np.empty((R.size,), dtype=complex)
-        _SWSHs(quaternion.as_float_array(R.flatten()), s, indices[0], indices[1], values)
+        _SWSHs(_Wigner_coefficients, quaternion.as_float_array(R.flatten()), s, indices[0], indices[1], values)
         values = values.reshape(R.shape)
     return values
 
 
+def _SWSH_recursive(R, s, indices):
+    """Return SWSH values for large ell, using `SWSH_grid_recursive`
+
+    The input `indices` is an array of (ell,m) values.  Values for invalid indices are 0.0.  The result has shape
+    `R.shape + (len(indices),)`.
+
+    """
+    ell, m = np.asarray(indices, dtype=int).reshape((-1, 2)).T
+    valid = abs(m) <= ell
+    values = SWSH_grid_recursive(R, s, ell.max())
+    return np.where(valid, values[..., LM_index(ell, np.where(valid, m, 0), 0)], 0.0j)
+
+
 def SWSH_grid(R_grid, s, ell_max):
     """Spin-weighted spherical harmonic calculation from rotors representing a grid
 
@@ -81,29 +110,126 @@ def SWSH_grid(R_grid, s, ell_max):
         dimension corresponds to the various (ell,m) values in standard order (e.g., as given by LM_range),
         starting from ell=0 for compatibility with spinsfast.
 
+    See Also
+    --------
+    SWSH_grid_recursive: Used automatically when `ell_max` exceeds `spherical_functions.direct_ell_max`
+
     """
+    if ell_max > direct_ell_max:
+        return SWSH_grid_recursive(R_grid, s, ell_max)
     indices = LM_range(0, ell_max)
-    values = np.zeros(R_grid.shape + (indices.shape[0],), dtype=complex)
-    it = np.nditer(R_grid, flags=['multi_index'])
-    while not it.finished:
-        R = it[0][()]
-        _SWSH(R.a, R.b, s, indices, values[it.multi_index])
-        it.iternext()
+    R_grid = np.asarray(R_grid, dtype=np.quaternion)
+    values = np.empty(R_grid.shape + (indices.shape[0],), dtype=complex)
+    _SWSH_grid(_Wigner_coefficients, quaternion.as_float_array(R_grid).reshape((-1, 4)), s, indices,
+               values.reshape((-1, indices.shape[0])))
     return values
 
 
-@njit('void(complex128, complex128, int64, int64[:,:], complex128[:])')
-def _SWSH(Ra, Rb, s, indices, values):
+def SWSH_grid_recursive(R_grid, s, ell_max, pooled=False):
+    """Spin-weighted spherical harmonic calculation from rotors by recursion
+
+    This function returns the same values as `SWSH_grid`, but rather than evaluating the sum for each (ell,m) mode
+    directly, it uses the recursion for Wigner's d matrices implemented in `WignerD.WignerDRecursion.HCalculator`.
+    Only the rows of the d matrices with |m'| <= |s| are needed, so the cost for each rotor is O(ell_max**2 * |s|),
+    or O(1) per (ell,m) mode for fixed spin weight.  The recursion is also stable, and does not depend on the
+    precomputed coefficient tables, so there is no upper limit on `ell_max`.
+
+    Parameters
+    ----------
+    R_grid : array of unit quaternions
+        Rotors on which to evaluate the SWSH function.
+    s : int
+        Spin weight of the field to evaluate
+    ell_max : int
+        Largest ell value in output arrays.  As in `SWSH_grid`, the output starts at ell=0.
+    pooled : bool, optional
+        If True, the workspace for the recursion is taken from the calling thread's pool (see
+        `HCalculator.workspace`), so that repeated calls in that thread do not reallocate it.
+        Defaults to False, in which case each call allocates its own workspace.
+
+    Returns
+    -------
+    array of complex
+        The shape of this array is `R_grid.shape`, with an extra dimension of length N_lm appended.
+
+    """
+    from ..WignerD.WignerDRecursion import HCalculator
+    R_grid = np.asarray(R_grid, dtype=np.quaternion)
+    Rs = quaternion.as_float_array(R_grid).reshape((-1, 4))
+    values = np.zeros(R_grid.shape + (LM_total_size(0, ell_max),), dtype=complex)
+    values_flat = values.reshape((-1, values.shape[-1]))
+    ra2 = Rs[:, 0]**2 + Rs[:, 3]**2
+    rb2 = Rs[:, 1]**2 + Rs[:, 2]**2
+    cosβ = np.clip((ra2 - rb2) / (ra2 + rb2), -1.0, 1.0)
+    hcalc = HCalculator(ell_max)
+    chunk_size = max(1, _recursion_chunk_bytes // (8 * (2*abs(s)+1) * (ell_max+2)**2))
+    for i in range(0, Rs.shape[0], chunk_size):
+        cosβ_chunk = cosβ[i:i+chunk_size]
+        Hnmpm = hcalc(cosβ_chunk, workspace=hcalc.workspace(cosβ_chunk, pooled=pooled), mp_max=abs(s))
+        _SWSH_from_H(Hnmpm, s, ell_max, Rs[i:i+chunk_size], values_flat[i:i+chunk_size])
+    return values
+
+
+def SWSH_theta_phi_grid(theta, phi, s, ell_max):
+    """Spin-weighted spherical harmonic calculation on an equiangular (theta, phi) grid
+
+    This function returns the same values as `SWSH_grid` would for the rotors
+    `quaternion.from_spherical_coords(theta, phi)` on the outer product of the input `theta` and `phi` values (as
+    produced, for example, by `spherical_functions.theta_phi`), but exploits the fact that the dependence on phi is
+    just the factor exp(1j*m*phi).  The theta-dependent factors are computed just once for each value of theta, and
+    then multiplied by a table of phases, which is much faster than evaluating the full sum at every point.
+
+    Parameters
+    ----------
+    theta : 1-d array of float
+        Values of the polar angle (colatitude) for the rows of the grid
+    phi : 1-d array of float
+        Values of the azimuthal angle for the columns of the grid
+    s : int
+        Spin weight of the field to evaluate
+    ell_max : int
+        Largest ell value in output arrays.  As in `SWSH_grid`, the output starts at ell=0.
+
+    Returns
+    -------
+    array of complex
+        The shape of this array is `(theta.size, phi.size, N_lm)`, where the last dimension corresponds to the
+        various (ell,m) values in standard order (e.g., as given by LM_range), starting from ell=0.
+
+    """
+    theta = np.asarray(theta, dtype=float).ravel()
+    phi = np.asarray(phi, dtype=float).ravel()
+    m = LM_range(0, ell_max)[:, 1]
+    theta_factors = _SWSH_theta_factors(theta, s, ell_max)
+    phases = np.exp(1j * np.multiply.outer(phi, m))
+    return theta_factors[:, np.newaxis, :] * phases[np.newaxis, :, :]
+
+
+def _SWSH_theta_factors(theta, s, ell_max):
+    """Return values of sYlm(theta, 0) for all (ell,m) up to ell_max
+
+    This is the phi-independent part of the spin-weighted spherical harmonics; the full value at (theta, phi) is
+    obtained by multiplying the (ell,m) element by exp(1j*m*phi).  The output has shape `(theta.size, N_lm)`.
+
+    """
+    return SWSH_grid_recursive(quaternion.from_spherical_coords(theta, np.zeros_like(theta)), s, ell_max)
+
+
+@njit
+def _SWSH(coefficients, Ra, Rb, s, indices, values):
     """Compute spin-weighted spherical harmonics from rotor components
 
     This is the core function that does all the work in the
     computation, but it is strict about its inputs, and does not check
     them for validity -- though numba provides some degree of safety.
 
-    _SWSH(Ra, Rb, s, indices, values)
+    _SWSH(coefficients, Ra, Rb, s, indices, values)
 
     Parameters
     ----------
+    coefficients : 1-d array of float
+        Table of Wigner coefficients covering the values of ell in `indices`, as in
+        `spherical_functions._Wigner_coefficients`
     Ra : complex
         Component `a` of the rotor
     Rb : complex
@@ -172,7 +298,8 @@ def _SWSH(Ra, Rb, s, indices, values):
                 # underflow just goes to zero, which is fine since
                 # nothing else should be very large.
                 Prefactor = cmath.rect(
-                    coeff(ell, -m, -s) * rb ** (2 * ell + s - m - 2 * rhoMin) * ra ** (-s + m + 2 * rhoMin),
+                    coefficients[_Wigner_index(2 * ell, -2 * m, -2 * s)]
+                    * rb ** (2 * ell + s - m - 2 * rhoMin) * ra ** (-s + m + 2 * rhoMin),
                     phib * (-s - m) + phia * (-s + m))
                 if (Prefactor == 0.0j):
                     values[i] = 0.0j
@@ -213,7 +340,8 @@ def _SWSH(Ra, Rb, s, indices, values):
                 # underflow just goes to zero, which is fine since
                 # nothing else should be very large.
                 Prefactor = cmath.rect(
-                    coeff(ell, m, -s) * ra ** (2 * ell + s + m - 2 * rhoMin) * rb ** (-s - m + 2 * rhoMin),
+                    coefficients[_Wigner_index(2 * ell, 2 * m, -2 * s)]
+                    * ra ** (2 * ell + s + m - 2 * rhoMin) * rb ** (-s - m + 2 * rhoMin),
                     phia * (-s + m) + phib * (-s - m))
                 if (Prefactor == 0.0j):
                     values[i] = 0.0j
@@ -235,18 +363,21 @@ def _SWSH(Ra, Rb, s, indices, values):
                     values[i] = math.sqrt((2 * ell + 1) / (4 * np.pi)) * Prefactor * Sum
 
 
-@njit('void(float64[:,:], int64, int64, int64, complex128[:])')
-def _SWSHs(Rs, s, ell, m, values):
+@njit
+def _SWSHs(coefficients, Rs, s, ell, m, values):
     """Compute spin-weighted spherical harmonics from rotor components
 
     This is the core function that does all the work in the
     computation, but it is strict about its inputs, and does not check
     them for validity -- though numba provides some degree of safety.
 
-    _SWSHs(Rs, s, ell, m, values)
+    _SWSHs(coefficients, Rs, s, ell, m, values)
 
     Parameters
     ----------
+    coefficients : 1-d array of float
+        Table of Wigner coefficients covering the values of ell in `indices`, as in
+        `spherical_functions._Wigner_coefficients`
     Rs : 2-d array of float
         Components of the rotors, with the 0 index iterating over rotor, and the 1 index iterating over component.
     s : int
@@ -277,7 +408,7 @@ def _SWSHs(Rs, s, ell, m, values):
         s_even = (s % 2 == 0)
         rhoMin_a = max(0, m + s)
         rhoMax_a = min(ell + m, ell + s)
-        coefficient_a = coeff(ell, m, -s)
+        coefficient_a = coefficients[_Wigner_index(2 * ell, 2 * m, -2 * s)]
         if ((rhoMin_a + s) % 2 != 0):
             coefficient_a *= -1
         N1_a = ell + m + 1
@@ -285,7 +416,7 @@ def _SWSHs(Rs, s, ell, m, values):
         M_a = -s - m
         rhoMin_b = max(0, -m + s)
         rhoMax_b = min(ell - m, ell + s)
-        coefficient_b = coeff(ell, -m, -s)
+        coefficient_b = coefficients[_Wigner_index(2 * ell, -2 * m, -2 * s)]
         if ((ell + rhoMin_b) % 2 != 0):
             coefficient_b *= -1
         N1_b = ell - m + 1
@@ -342,3 +473,85 @@ def _SWSHs(Rs, s, ell, m, values):
                         Sum *= absRRatioSquared * ((N1_a - rho) * (N2_a - rho)) / (rho * (M_a + rho))
                         Sum += 1
                     values[i] = constant * Prefactor * Sum
+
+
+@njit(parallel=True)
+def _SWSH_grid(coefficients, Rs, s, indices, values):
+    """Compute spin-weighted spherical harmonics for many rotors in parallel
+
+    This is the core function used by `SWSH_grid`.  It simply calls `_SWSH` for each rotor, but
+    does so in compiled code, with the outer loop distributed over threads.  Like `_SWSH`, it is
+    strict about its inputs, and does not check them for validity.
+
+    _SWSH_grid(coefficients, Rs, s, indices, values)
+
+    Parameters
+    ----------
+    coefficients : 1-d array of float
+        Table of Wigner coefficients covering the values of ell in `indices`, as in
+        `spherical_functions._Wigner_coefficients`
+    Rs : 2-d array of float
+        Components of the rotors, with the 0 index iterating over rotor, and the 1 index iterating over component.
+    s : int
+        Spin weight of the field to evaluate
+    indices : 2-d array of int
+        Array of (ell,m) values to evaluate
+    values : 2-d array of complex
+        Output array to contain values.  The 0 index iterates over rotor, so the first dimension must equal the first
+        dimension of `Rs`; the second dimension must equal the first dimension of `indices`.
+
+    Returns
+    -------
+    void
+        The input/output array `values` is modified in place.
+
+    """
+    for i in prange(Rs.shape[0]):
+        _SWSH(coefficients, complex(Rs[i, 0], Rs[i, 3]), complex(Rs[i, 2], Rs[i, 1]), s, indices, values[i])
+
+
+@njit
+def _SWSH_from_H(Hnmpm, s, ell_max, Rs, values):
+    """Assemble spin-weighted spherical harmonics from the output of HCalculator
+
+    This is the core function used by `SWSH_grid_recursive`.  It uses the relation
+
+        sYlm(R) = (-1)**s sqrt((2ell+1)/(4pi)) D^{ell}_{m,-s}(R)
+                = ϵ(m) ϵ(s) (-1)**s sqrt((2ell+1)/(4pi)) exp(1j*((m-s)*phia - (m+s)*phib)) H^{-s,m}_{ell}(β)
+
+    where phia and phib are the arguments of the components `a` and `b` of the rotor, and
+    ϵ(k) = (-1)**k for k>=0 and 1 otherwise.  Only the rows with m'=-s of `Hnmpm` are used.
+
+    _SWSH_from_H(Hnmpm, s, ell_max, Rs, values)
+
+    Parameters
+    ----------
+    Hnmpm : 2-d array of float
+        Output of `HCalculator.__call__` for the values of cosβ corresponding to `Rs`.
+    s : int
+        Spin weight of the field to evaluate
+    ell_max : int
+        Largest ell value in output arrays
+    Rs : 2-d array of float
+        Components of the rotors, with the 0 index iterating over rotor, and the 1 index iterating over component.
+    values : 2-d array of complex
+        Output array to contain values, starting from ell=0.  Only the elements with ell >= abs(s) are modified.
+
+    Returns
+    -------
+    void
+        The input/output array `values` is modified in place.
+
+    """
+    sign_s = 1 if s >= 0 else (-1)**s
+    for j in range(Rs.shape[0]):
+        phia = math.atan2(Rs[j, 3], Rs[j, 0])
+        phib = math.atan2(Rs[j, 1], Rs[j, 2])
+        for ell in range(abs(s), ell_max+1):
+            constant = sign_s * math.sqrt((2 * ell + 1) / (4 * np.pi))
+            for m in range(-ell, ell+1):
+                sign_m = (-1)**m if m >= 0 else 1
+                values[j, LM_index(ell, m, 0)] = cmath.rect(
+                    sign_m * constant * Hnmpm[LMpM_index(ell, -s, m, 0), j],
+                    (m - s) * phia - (m + s) * phib
+                )
@@ -27,10 +27,12 @@ def modes(self, ell_max=None, **kwargs):
     import numpy as np
     import spinsfast
     from .. import Modes
-    ell_max = ell_max or (max(n_phi, n_theta) - 1) // 2
-    metadata = copy.copy
-    return Modes(spinsfast.map2salm(self.view(np.ndarray), self.s, ell_max),
-                 spin_weight=self.s, ell_min=0, ell_max=ell_max, **metadata)
+    ell_max = ell_max or (max(self.n_phi, self.n_theta) - 1) // 2
+    metadata = copy.copy(self._metadata)
+    metadata.update(**kwargs)
+    metadata['spin_weight'] = self.s
+    metadata['ell_max'] = ell_max
+    return Modes(spinsfast.map2salm(self.view(np.ndarray), self.s, ell_max), ell_min=0, **metadata)
 
 
 def _check_broadcasting(self, array, reverse=False):
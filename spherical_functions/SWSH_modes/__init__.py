@@ -30,8 +30,8 @@ class Modes(np.ndarray):
 
     2) It provides additional convenience methods, like `index` to find the index of a particular
        (ell, m) mode; a `grid` method to convert modes to the SWSH values on a grid over the sphere
-       (while correctly handling additional dimensions); and the various derivative operators,
-       including $\eth$ and $\bar{\eth}$.
+       (while correctly handling additional dimensions); a `rotate` method to rotate the function;
+       and the various derivative operators, including $\eth$ and $\bar{\eth}$.
 
     3) It overrides most of numpy's "universal functions" (ufuncs) to work appropriately for
        spin-weighted functions.  Specifically, these ufuncs are interpreted as acting on the
@@ -81,9 +81,9 @@ class Modes(np.ndarray):
         somehow, whether via a `_metadata` attribute of the input array, or as a keyword argument,
         or as the second positional argument (where the latter will override the former values).
     ell_min: int [defaults to 0]
-        The smallest ell value present in the *input* data.  Note that the data will be stored in
-        this object with all modes present, starting from ell=0.  This parameter just determines how
-        the input data will be copied into the internal representation.
+        The smallest ell value present in the *input* data.  Unless `compact` is True, the data will
+        be stored in this object with all modes present, starting from ell=0, and this parameter
+        just determines how the input data will be copied into the internal representation.
     ell_max: int [optional if ell_min is not passed as positional argument]
         The largest ell value present in the input data.  If this is not passed explicitly, it will
         be inferred from the size of the data.
@@ -93,6 +93,23 @@ class Modes(np.ndarray):
         with `sum` is the most correct one -- keeping all ell values that result -- but also the
         most wasteful, and very likely to be overkill.  The user may prefer to use `max`, which will
         just return a product with ell_max equal to the larger of the two input ell_max values.
+    compact: bool [defaults to False]
+        If True, the data are stored starting from ell=max(ell_min, abs(spin_weight)), rather than
+        being padded with zeros down to ell=0.  The input data are not copied; if they include modes
+        with ell<abs(spin_weight), the stored array is just a view that skips them.  This option is
+        recorded in the metadata, so that objects derived from this one -- by algebra, derivatives,
+        rotations, etc. -- are also compact; the `ell_min` attribute gives the smallest ell value
+        actually stored.
+    trusted: bool [defaults to False]
+        If True, the input is assumed to be valid as it stands: in particular, the modes with
+        ell<abs(spin_weight) are not checked or set to zero.  Otherwise, they are checked, and only
+        set to zero if they are nonzero -- which requires a writeable input array.
+
+    Whenever the input data starts at ell=0 or `compact` is True, the result is a view of the input
+    data; nothing is copied, and nothing is written unless the input has nonzero modes with
+    ell<abs(spin_weight).  This means that read-only, memory-mapped, or shared arrays can be wrapped
+    directly.  Checking the low-ell modes requires reading part of every slice of the data, so
+    `trusted=True` may be used to open large memory-mapped archives instantly.
 
     """
 
@@ -105,8 +122,10 @@ class Modes(np.ndarray):
         if len(args) == 3:
             kwargs['ell_min'] = args[1]
             kwargs['ell_max'] = args[2]
-        ell_min = kwargs.pop('ell_min', 0)
+        trusted = kwargs.pop('trusted', False)
         metadata = copy.copy(getattr(input_array, '_metadata', {}))
+        ell_min = metadata.pop('ell_min', 0)
+        ell_min = kwargs.pop('ell_min', ell_min)
         metadata.update(**kwargs)
         input_array = np.asanyarray(input_array).view(complex)
         spin_weight = metadata.get('spin_weight', None)
@@ -123,12 +142,23 @@ class Modes(np.ndarray):
             raise ValueError(f"Input array has shape {input_array.shape} when viewed as a complex array.\n            "
                              +f"Its last dimension should have size {LM_total_size(ell_min, ell_max)}, "
                              +f"for consistency with the input ell_min ({ell_min}) and ell_max ({ell_max}).")
+        if metadata.get('compact', False):
+            compact_ell_min = max(ell_min, abs(spin_weight))
+            obj = input_array[..., LM_total_size(ell_min, compact_ell_min-1):].view(cls)
+            metadata['ell_min'] = compact_ell_min
+            obj._metadata = metadata
+            return obj
         if ell_min == 0:
             obj = input_array.view(cls)
         else:
             insertion_indices = [0,]*LM_total_size(0, ell_min-1)
             obj = np.insert(input_array, insertion_indices, 0.0, axis=-1).view(cls)
-        obj[..., :LM_total_size(0, abs(spin_weight)-1)] = 0.0
+        low_modes = obj.view(np.ndarray)[..., :LM_total_size(0, abs(spin_weight)-1)]
+        if not trusted and np.any(low_modes):
+            if not low_modes.flags.writeable:
+                raise ValueError(f"Input array is read-only, but has nonzero modes with ell<abs(s)={abs(spin_weight)}.\n"
+                                 +"            Pass `compact=True` to skip those modes, or `trusted=True` to ignore them.")
+            low_modes[...] = 0.0
         obj._metadata = metadata
         return obj
 
@@ -162,7 +192,7 @@ class Modes(np.ndarray):
     @property
     def ell_min(self):
         """Smallest ell value stored in data [need not equal abs(s)]"""
-        return 0
+        return self._metadata.get('ell_min', 0)
 
     @property
     def ell_max(self):
@@ -188,7 +218,12 @@ class Modes(np.ndarray):
     )
 
     from .utilities import (
-        index, truncate_ell, grid, evaluate, _check_broadcasting
+        index, truncate_ell, grid, _grid_separable, evaluate, _check_broadcasting
     )
 
+    from .rotations import rotate
+
     from .ufuncs import __array_ufunc__
+
+
+from .operators import ModesOperator
@@ -6,11 +6,71 @@
 ### probably not be used outside of that class.
 
 import copy
+from functools import lru_cache
 import numpy as np
-from .. import LM_total_size, LM_index
+from .. import LM_total_size
+from .._jit import njit
 from ..multiplication import _multiplication_helper
 
 
+@lru_cache(maxsize=32)
+def _conjugation_table(s, ell_min, ell_max):
+    """Return arrays (index, sign) describing the modes of the conjugate of a function
+
+    For a function f with spin weight `s` and modes stored from `ell_min` to `ell_max`,
+
+        conjugate(f)[..., i] = sign[i] * conjugate(f[..., index[i]])
+
+    where index[i] is the index of (ell, -m) when i is the index of (ell, m), and sign[i] is
+    (-1)**(s+m) for ell>=abs(s), or 0 otherwise.  The arrays are read-only, and the most recently
+    used tables are cached.
+
+    """
+    ell = np.repeat(np.arange(ell_min, ell_max+1), 2*np.arange(ell_min, ell_max+1)+1)
+    m = np.arange(ell.size) + ell_min**2 - ell * (ell + 1)
+    index = ell * (ell + 1) - m - ell_min**2
+    sign = np.where(ell >= abs(s), 1 - 2 * ((s + m) % 2), 0).astype(float)
+    index.flags.writeable = False
+    sign.flags.writeable = False
+    return index, sign
+
+
+def _conjugation(self, a, b, out):
+    """Set out = a * self + b * conjugate(self), where conjugation acts on the function
+
+    Here, `out` is an ndarray of the same shape as this object.  It may be this object's own data,
+    in which case the operation is done in place, with no temporary arrays unless the data cannot
+    be flattened without copying.
+
+    """
+    s = self.view(np.ndarray)
+    index, sign = _conjugation_table(self.s, self.ell_min, self.ell_max)
+    try:
+        # Flatten without copying, if possible, so that results can be written directly to `out`
+        out_2d = out.view()
+        out_2d.shape = (-1, s.shape[-1])
+    except AttributeError:
+        out[...] = _conjugation(self, a, b, np.empty(s.shape, dtype=complex))
+        return out
+    _conjugate_pairs(s.reshape((-1, s.shape[-1])), out_2d, index, sign, a, b)
+    return out
+
+
+@njit
+def _conjugate_pairs(modes, out, index, sign, a, b):
+    # NOTE: `out` may be the same array as `modes`; each pair of modes (ell, m) and (ell, -m) is
+    # read before either is written
+    for j in range(modes.shape[0]):
+        for i in range(index.size):
+            k = index[i]
+            if k < i:
+                continue
+            x = modes[j, i]
+            y = modes[j, k]
+            out[j, i] = a * x + b * sign[i] * y.conjugate()
+            out[j, k] = a * y + b * sign[k] * x.conjugate()
+
+
 def conjugate(self, inplace=False):
     """Return Modes object corresponding to conjugated function
 
@@ -20,8 +80,9 @@ def conjugate(self, inplace=False):
     returns a Modes object containing the data for the conjugated function.
 
     If `inplace` is True, then the operation is performed in place, modifying this Modes object
-    itself.  Note that some copying is still needed, but only for 2 modes at a time, and those
-    copies are freed after this function returns.
+    itself, without any temporary arrays.  In either case, the work is done by a compiled kernel
+    using the index and sign arrays from `_conjugation_table`, which are cached for each spin weight
+    and range of ell values.
 
     Here is the derivation:
 
@@ -43,19 +104,7 @@ def conjugate(self, inplace=False):
 
     """
     s = self.view(np.ndarray)
-    c = s if inplace else np.zeros_like(s)
-    for ell in range(abs(self.s), self.ell_max+1):
-        i = LM_index(ell, 0, self.ell_min)
-        if self.s%2 == 0:
-            c[..., i] = np.conjugate(s[..., i])
-        else:
-            c[..., i] = -np.conjugate(s[..., i])
-        for m in range(1, ell+1):
-            i_p, i_n = LM_index(ell, m, self.ell_min), LM_index(ell, -m, self.ell_min)
-            if (self.s+m)%2 == 0:
-                c[..., i_p], c[..., i_n] = np.conjugate(s[..., i_n]), np.conjugate(s[..., i_p])
-            else:
-                c[..., i_p], c[..., i_n] = -np.conjugate(s[..., i_n]), -np.conjugate(s[..., i_p])
+    c = _conjugation(self, 0.0, 1.0, s if inplace else np.empty_like(s))
     if inplace:
         self._metadata['spin_weight'] = -self.s
         return self
@@ -90,18 +139,7 @@ def _real_func(self, inplace=False):
     if self.s != 0:
         raise ValueError("The real part of a function with non-zero spin weight is meaningless")
     s = self.view(np.ndarray)
-    c = s if inplace else np.zeros_like(s)
-    for ell in range(abs(self.s), self.ell_max+1):
-        i = LM_index(ell, 0, self.ell_min)
-        c[..., i] = np.real(s[..., i])
-        for m in range(1, ell+1):
-            i_p, i_n = LM_index(ell, m, self.ell_min), LM_index(ell, -m, self.ell_min)
-            if m%2 == 0:
-                c[..., i_p] = (s[..., i_p] + np.conjugate(s[..., i_n])) / 2
-                c[..., i_n] = np.conjugate(c[..., i_p])
-            else:
-                c[..., i_p] = (s[..., i_p] - np.conjugate(s[..., i_n])) / 2
-                c[..., i_n] = -np.conjugate(c[..., i_p])
+    c = _conjugation(self, 0.5, 0.5, s if inplace else np.empty_like(s))
     if inplace:
         return self
     return type(self)(c, **self._metadata)
@@ -132,18 +170,7 @@ def _imag_func(self, inplace=False):
     if self.s != 0:
         raise ValueError("The imaginary part of a function with non-zero spin weight is meaningless")
     s = self.view(np.ndarray)
-    c = s if inplace else np.zeros_like(s)
-    for ell in range(abs(self.s), self.ell_max+1):
-        i = LM_index(ell, 0, self.ell_min)
-        c[..., i] = 1j * np.imag(s[..., i])
-        for m in range(1, ell+1):
-            i_p, i_n = LM_index(ell, m, self.ell_min), LM_index(ell, -m, self.ell_min)
-            if m%2 == 0:
-                c[..., i_p] = (s[..., i_p] - np.conjugate(s[..., i_n])) / 2
-                c[..., i_n] = -np.conjugate(c[..., i_p])
-            else:
-                c[..., i_p] = (s[..., i_p] + np.conjugate(s[..., i_n])) / 2
-                c[..., i_n] = np.conjugate(c[..., i_p])
+    c = _conjugation(self, 0.5, -0.5, s if inplace else np.empty_like(s))
     if inplace:
         return self
     return type(self)(c, **self._metadata)
@@ -198,7 +225,7 @@ def subtract(self, other):
         return np.subtract(self, other)
 
 
-def multiply(self, other, truncator=None):
+def multiply(self, other, truncator=None, method='modes'):
     """Multiply by another spin-weighted function or a scalar
 
     For spin-weighted functions, the spin weight of their product is the sum of the spin weights of
@@ -224,13 +251,21 @@ def multiply(self, other, truncator=None):
         back on the `multiplication_truncator` metadata fields of the input Modes objects, and uses
         the greater of the values that they return.  If either input object is missing the
         `multiplication_truncator` metadata field, it defaults to `sum`.
+    method: 'modes', 'grid', or 'auto' [defaults to 'modes']
+        If 'modes', the product is computed exactly from the mode weights.  If 'grid', both
+        functions are evaluated on a grid large enough to avoid aliasing, multiplied pointwise, and
+        transformed back to modes; this requires `spinsfast`, and is faster for large ell_max
+        values, though the results differ from the 'modes' method by roundoff.  If 'auto', the
+        method expected to be faster is chosen based on the ell_max values and the number of
+        functions being multiplied; see `spherical_functions.multiplication.multiplication_method`
+        for details.
 
     """
     if isinstance(other, type(self)):
         s = self.view(np.ndarray)
         o = other.view(np.ndarray)
         new_s = self.s + other.s
-        new_ell_min = 0
+        new_ell_min = abs(new_s) if self._metadata.get('compact', False) else 0
         if truncator is not None:
             new_ell_max = truncator((self.ell_max, other.ell_max))
         else:
@@ -245,7 +280,7 @@ def multiply(self, other, truncator=None):
         new = np.zeros(new_shape, dtype=np.complex_)
         _multiplication_helper(s, self.ell_min, self.ell_max, self.s,
                                o, other.ell_min, other.ell_max, other.s,
-                               new, new_ell_min, new_ell_max, new_s)
+                               new, new_ell_min, new_ell_max, new_s, method=method)
         metadata = copy.copy(self._metadata)
         metadata['spin_weight'] = new_s
         metadata['ell_min'] = new_ell_min
@@ -6,10 +6,107 @@
 ### probably not be used outside of that class.
 
 import copy
+from functools import lru_cache
 import numpy as np
 
 
-def Lsquared(self):
+@lru_cache(maxsize=64)
+def _operator_coefficients(operator, s, ell_min, ell_max):
+    """Return coefficients and shift describing the action of an operator on modes
+
+    For a function f with spin weight `s` and modes stored from `ell_min` to `ell_max`, the modes of
+    the result (stored in the same way) are
+
+        {operator f}[..., i] = coefficients[i] * f[..., i-shift]
+
+    where the shift is 1 for Lplus, -1 for Lminus, and 0 for the other (diagonal) operators.  The
+    coefficients vanish wherever i-shift would refer to a mode with a different ell, and for modes
+    with ell less than the absolute value of the spin weight of the input or the output.  The
+    arrays are read-only, and the most recently used are cached.
+
+    """
+    ell = np.repeat(np.arange(ell_min, ell_max+1), 2*np.arange(ell_min, ell_max+1)+1)
+    m = np.arange(ell.size) + ell_min**2 - ell * (ell + 1)
+    shift = 0
+    s_out = s
+    if operator == 'Lsquared':
+        coefficients = ell * (ell + 1.0)
+    elif operator == 'Lz':
+        coefficients = m.astype(float)
+    elif operator == 'Lplus':
+        coefficients = np.sqrt((ell+m) * (ell-m+1.0))
+        shift = 1
+    elif operator == 'Lminus':
+        coefficients = np.sqrt((ell-m) * (ell+m+1.0))
+        shift = -1
+    elif operator == 'Rz':
+        coefficients = np.full(ell.shape, -float(s))
+    elif operator in ['Rplus', 'ethbar']:
+        s_out = s - 1
+        coefficients = np.sqrt(np.maximum((ell-s_out) * (ell+s_out+1.0), 0.0))
+        if operator == 'ethbar':
+            coefficients = -coefficients
+    elif operator == 'Rminus':
+        s_out = s + 1
+        coefficients = np.sqrt(np.maximum((ell+s_out) * (ell-s_out+1.0), 0.0))
+    else:
+        raise ValueError("Unknown operator '{0}'".format(operator))
+    coefficients[ell < max(abs(s), abs(s_out))] = 0.0
+    coefficients.flags.writeable = False
+    return coefficients, shift
+
+
+def _apply_operator(self, operator, spin_weight, out):
+    """Return Modes object with the result of an operator described by `_operator_coefficients`
+
+    The result is computed in a single pass over the data.  If `out` is not None, it must be an
+    array of the same shape as this object, into which the result is written; if it is a Modes
+    object, its metadata is updated, and it is returned.
+
+    """
+    term = _operator_coefficients(operator, self.s, self.ell_min, self.ell_max)
+    return _apply_coefficients(self, [term], spin_weight, out)
+
+
+def _apply_coefficients(self, terms, spin_weight, out):
+    """Return Modes object with the sum over (coefficients, shift) in `terms` of
+
+        result[..., i] = coefficients[i] * self[..., i-shift]
+
+    Each term takes one pass over the data.  See `_apply_operator` for the meaning of `out`.
+
+    """
+    s = self.view(np.ndarray)
+    d = np.empty_like(s) if out is None else out.view(np.ndarray)
+    if len(terms) > 1 and np.may_share_memory(s, d):
+        s = s.copy()
+    _shifted_product(s, *terms[0], d)
+    if len(terms) > 1:
+        term = np.empty_like(d)
+        for coefficients, shift in terms[1:]:
+            d += _shifted_product(s, coefficients, shift, term)
+    metadata = copy.copy(self._metadata)
+    metadata['spin_weight'] = spin_weight
+    if isinstance(out, type(self)):
+        out._metadata = metadata
+        return out
+    return type(self)(d, **metadata)
+
+
+def _shifted_product(s, coefficients, shift, d):
+    """Set d[..., i] = coefficients[i] * s[..., i-shift], with zeros where i-shift is out of range"""
+    if shift == 0:
+        np.multiply(s, coefficients, out=d)
+    elif shift > 0:
+        np.multiply(s[..., :-shift], coefficients[shift:], out=d[..., shift:])
+        d[..., :shift] = 0.0
+    else:
+        np.multiply(s[..., -shift:], coefficients[:shift], out=d[..., :shift])
+        d[..., shift:] = 0.0
+    return d
+
+
+def Lsquared(self, out=None):
     """Total angular-momentum operator
 
     This is the standard L^2 operator, familiar from basic physics, extended to work with SWSHs.
@@ -31,19 +128,14 @@ def Lsquared(self):
 
         Lsquared {s}Y{l,m} = l * (l+1) * {s}Y{l,m}
 
+    If `out` is given, it must be an array of the same shape as this object, into which the result
+    is written.
+
     """
-    import numpy as np
-    d = self.copy()
-    s = self.view(np.ndarray)
-    for ell in range(abs(self.s), self.ell_max+1):
-        d[..., d.index(ell, -ell):d.index(ell, ell)+1] = (
-            ell * (ell+1)
-            * s[..., d.index(ell, -ell):d.index(ell, ell)+1]
-        )
-    return d
+    return _apply_operator(self, 'Lsquared', self.s, out)
 
 
-def Lz(self):
+def Lz(self, out=None):
     """Left Lie derivative with respect to rotation about z
 
     The left Lie derivative of a function f(Q) over the unit quaternions with respect to a
@@ -57,17 +149,14 @@ def Lz(self):
 
         Lz {s}Y{l,m} = m * {s}Y{l,m}
 
+    If `out` is given, it must be an array of the same shape as this object, into which the result
+    is written.
+
     """
-    import numpy as np
-    d = self.copy()
-    s = self.view(np.ndarray)
-    for ell in range(abs(self.s), self.ell_max+1):
-        for m in range(-ell, ell+1):
-            d[..., d.index(ell, m)] = m * s[..., self.index(ell, m)]
-    return d
+    return _apply_operator(self, 'Lz', self.s, out)
 
 
-def Lplus(self):
+def Lplus(self, out=None):
     """Raising operator for Lz
 
     We define Lplus to be the raising operator for the left Lie derivative with respect to
@@ -80,6 +169,9 @@ def Lplus(self):
 
         {Lplus f}{s, l, m} = sqrt((l+m)*(l-m+1)) * f{s,l,m-1}
 
+    If `out` is given, it must be an array of the same shape as this object, into which the result
+    is written.
+
     """
     # sYlm = (-1)**s sqrt((2ell+1)/(4pi)) D{l,m,-s}
     # Lplus {s}Y{l,m} = (-1)**s sqrt((2ell+1)/(4pi)) Lplus D{l,m,-s}
@@ -96,18 +188,10 @@ def Lplus(self):
     #    = sqrt((l'-(m'-1))(l'+(m'-1)+1)) f{s',l',m'-1}
     #    = sqrt((l'+m')(l'-m'+1)) f{s',l',m'-1}
     # {L+ f}{s, l, m} = sqrt((l+m)(l-m+1)) f{s,l,m-1}
-    import math
-    import numpy as np
-    d = np.zeros_like(self)
-    s = self.view(np.ndarray)
-    for ell in range(abs(self.s), self.ell_max+1):
-        d[..., self.index(ell, -ell)] = 0.0
-        for m in range(-ell+1, ell+1):
-            d[..., d.index(ell, m)] = math.sqrt((ell+m)*(ell-m+1)) * s[..., self.index(ell, m-1)]
-    return d
+    return _apply_operator(self, 'Lplus', self.s, out)
 
 
-def Lminus(self):
+def Lminus(self, out=None):
     """Lowering operator for Lz
 
     We define Lminus to be the lowering operator for the left Lie derivative with respect to
@@ -121,6 +205,9 @@ def Lminus(self):
 
         {Lminus f}{s, l, m} = sqrt((l-m)*(l+m+1)) * f{s,l,m+1}
 
+    If `out` is given, it must be an array of the same shape as this object, into which the result
+    is written.
+
     """
     # sYlm = (-1)**s sqrt((2ell+1)/(4pi)) D{l,m,-s}
     # Lminus {s}Y{l,m} = (-1)**s sqrt((2ell+1)/(4pi)) Lminus D{l,m,-s}
@@ -137,18 +224,10 @@ def Lminus(self):
     #    = sqrt((l'+(m'+1))(l'-(m'+1)+1)) f{s',l',m'+1}
     #    = sqrt((l'-m')(l'+m'+1)) f{s',l',m'+1}
     # {L- f}{s, l, m} = sqrt((l-m)(l+m+1)) f{s,l,m+1}
-    import math
-    import numpy as np
-    d = np.zeros_like(self)
-    s = self.view(np.ndarray)
-    for ell in range(abs(self.s), self.ell_max+1):
-        for m in range(-ell, ell):
-            d[..., self.index(ell, m)] = math.sqrt((ell-m)*(ell+m+1)) * s[..., self.index(ell, m+1)]
-        d[..., self.index(ell, ell)] = 0.0
-    return d
+    return _apply_operator(self, 'Lminus', self.s, out)
 
 
-def Rsquared(self):
+def Rsquared(self, out=None):
     """Total angular-momentum operator
 
     This is the R^2 operator, much like the L^2 operator familiar from basic physics, but using
@@ -172,11 +251,14 @@ def Rsquared(self):
 
         Rsquared {s}Y{l,m} = l * (l+1) * {s}Y{l,m}
 
+    If `out` is given, it must be an array of the same shape as this object, into which the result
+    is written.
+
     """
-    return self.Lsquared()
+    return self.Lsquared(out=out)
 
 
-def Rz(self):
+def Rz(self, out=None):
     """Right Lie derivative with respect to rotation about z
 
     The right Lie derivative of a function f(Q) over the unit quaternions with respect to a
@@ -198,6 +280,9 @@ def Rz(self):
     Note the unfortunate sign of `s`, which seems to be opposite to what we expect, and arises
     from the choice of definition of `s` in the original paper by Newman and Penrose.
 
+    If `out` is given, it must be an array of the same shape as this object, into which the result
+    is written.
+
     """
     # {Rzf}{s', l', m'}
     #    = integral(Rz f {s'}Ybar{l',m'})  # Integral over rotation group
@@ -208,11 +293,10 @@ def Rz(self):
     #    = sum(-s f{s,l,m} delta{s, s'} delta{m, m'} delta{l, l'}
     #    = -s f{s',l',m'}
     # {Rzf}{s, l, m} = -s f{s,l,m}
-    import numpy as np
-    return type(self)(-self.s * self.view(np.ndarray), **self._metadata)
+    return _apply_operator(self, 'Rz', self.s, out)
 
 
-def Rplus(self):
+def Rplus(self, out=None):
     """Raising operator for Rz
 
     We define Rplus to be the raising operator for the right Lie derivative with respect to
@@ -230,6 +314,9 @@ def Rplus(self):
     operator for Rz, and raises the eigenvalue of the corresponding Wigner matrix - though that
     lowers the value of `s`.
 
+    If `out` is given, it must be an array of the same shape as this object, into which the result
+    is written.
+
     """
     # sYlm = (-1)**s sqrt((2ell+1)/(4pi)) D{l,m,-s}
     # Rplus {s}Y{l,m} = (-1)**s sqrt((2ell+1)/(4pi)) Rplus D{l,m,-s}
@@ -245,24 +332,10 @@ def Rplus(self):
     #    = sum(sqrt((l+s)(l-s+1)) f{s,l,m} delta{s-1, s'} delta{m, m'} delta{l, l'}
     #    = sqrt((l'+s'+1)(l'-(s'+1)+1) f{s'+1,l',m'}
     # {R+f}{s, l, m} = sqrt((l-s)(l+s+1)) f{s+1,l,m}
-    import math
-    import numpy as np
-    metadata = copy.copy(self._metadata)
-    metadata['spin_weight'] = self.s-1
-    metadata['ell_min'] = min(abs(self.s-1), self.ell_min)
-    metadata['ell_max'] = self.ell_max
-    d = type(self)(np.zeros_like(self.view(np.ndarray)), **metadata)
-    s = self.view(np.ndarray)
-    for ell in range(max(abs(d.s), abs(self.s)), d.ell_max+1):
-        if ell >= self.ell_min:
-            d[..., d.index(ell, -ell):d.index(ell, ell)+1] = (
-                math.sqrt((ell-d.s)*(ell+d.s+1))
-                * s[..., self.index(ell, -ell):self.index(ell, ell)+1]
-            )
-    return d
+    return _apply_operator(self, 'Rplus', self.s-1, out)
 
 
-def Rminus(self):
+def Rminus(self, out=None):
     """Lowering operator for Rz
 
     We define Rminus to be the lowering operator for the right Lie derivative with respect to
@@ -281,6 +354,9 @@ def Rminus(self):
     operator for Rz, and lowers the eigenvalue of the corresponding Wigner matrix - though that
     raises the value of `s`.
 
+    If `out` is given, it must be an array of the same shape as this object, into which the result
+    is written.
+
     """
     # sYlm = (-1)**s sqrt((2ell+1)/(4pi)) D{l,m,-s}
     # Rminus {s}Y{l,m} = (-1)**s sqrt((2ell+1)/(4pi)) Rminus D{l,m,-s}
@@ -297,21 +373,7 @@ def Rminus(self):
     #    = sqrt((l'-(s'-1))(l'+(s'-1)+1)) f{s'-1,l',m'}
     #    = sqrt((l'-s'+1)(l'+s')) f{s'-1,l',m'}
     # {R- f}{s, l, m} = sqrt((l+s)(l-s+1)) f{s-1,l,m}
-    import math
-    import numpy as np
-    metadata = copy.copy(self._metadata)
-    metadata['spin_weight'] = self.s+1
-    metadata['ell_min'] = min(abs(self.s+1), self.ell_min)
-    metadata['ell_max'] = self.ell_max
-    d = type(self)(np.zeros_like(self.view(np.ndarray)), **metadata)
-    s = self.view(np.ndarray)
-    for ell in range(max(abs(d.s), abs(self.s)), d.ell_max+1):
-        if ell >= self.ell_min:
-            d[..., d.index(ell, -ell):d.index(ell, ell)+1] = (
-                math.sqrt((ell+d.s)*(ell-d.s+1))
-                * s[..., self.index(ell, -ell):self.index(ell, ell)+1]
-            )
-    return d
+    return _apply_operator(self, 'Rminus', self.s+1, out)
 
 
 @property
@@ -331,7 +393,7 @@ def eth(self):
         {eth f} {s,l,m} = sqrt((l+s)(l-s+1)) f{s-1,l,m}
 
     """
-    return self.Rminus()
+    return _apply_operator(self, 'Rminus', self.s+1, None)
 
 
 @property
@@ -352,4 +414,4 @@ def ethbar(self):
         {ethbar f} {s,l,m} = -sqrt((l-s)(l+s+1)) f{s+1,l,m}
 
     """
-    return -self.Rplus()
+    return _apply_operator(self, 'ethbar', self.s-1, None)
@@ -0,0 +1,165 @@
+# Copyright (c) 2020, Michael Boyle
+# See LICENSE file for details: <https://github.com/moble/spherical_functions/blob/master/LICENSE>
+
+"""Algebra of linear operators acting on Modes objects
+
+The derivative operators of `Modes` (Lz, Lplus, eth, etc.) each multiply the modes by a vector of
+coefficients, possibly shifted by one mode in m.  Compositions of such operators are therefore also
+of this form, as are their sums (with one shift per term).  This module provides objects
+representing these operators, which may be multiplied (composed), added, scaled, and raised to
+powers.  When the result is applied to a Modes object, the coefficients for each chain of
+operators are combined into a single vector, so that
+
+    from spherical_functions.SWSH_modes.operators import eth, ethbar
+    (eth**2 * ethbar)(f)
+
+takes one pass over the data of `f`, and gives the same result as `f.ethbar.eth.eth`, which takes
+three passes and allocates two intermediate arrays.  The combined vectors depend on the spin weight
+and range of ell values of the input, and the most recently used are cached.
+
+"""
+
+import numbers
+from functools import lru_cache
+import numpy as np
+from .derivatives import _operator_coefficients, _apply_coefficients
+
+# Change in spin weight caused by each of the basic operators
+_spin_changes = {'Lsquared': 0, 'Lz': 0, 'Lplus': 0, 'Lminus': 0, 'Rz': 0, 'Rplus': -1, 'Rminus': 1}
+
+
+class ModesOperator(object):
+    """Linear combination of products of the derivative operators of Modes objects
+
+    Objects of this class are not usually constructed directly; instead, combine the objects
+    defined in this module (Lsquared, Lz, Lplus, Lminus, Rsquared, Rz, Rplus, Rminus, eth, ethbar,
+    and identity) using `*` (composition, with the right-hand operator applied first), `**`
+    (repeated composition), `+`, `-`, and multiplication by numbers.  Only operators that change
+    the spin weight by the same amount may be added.
+
+    Apply the operator as `operator(modes, out=None)`, where `out` may be an array of the same
+    shape as `modes` into which the result will be written.
+
+    Parameters
+    ==========
+    terms: sequence of (number, tuple of str)
+        Each term is a scalar factor, and the names of the basic operators in the product, in the
+        order in which they are written (so that the last is applied first).
+
+    """
+    def __init__(self, terms):
+        combined = {}
+        for scalar, names in terms:
+            names = tuple(names)
+            combined[names] = combined.get(names, 0) + scalar
+        self.terms = tuple((scalar, names) for names, scalar in combined.items() if scalar != 0)
+        spin_changes = set(sum(_spin_changes[name] for name in names) for scalar, names in self.terms)
+        if len(spin_changes) > 1:
+            raise ValueError("Cannot add operators that change the spin weight by different amounts")
+        self.spin_change = spin_changes.pop() if spin_changes else 0
+
+    def __repr__(self):
+        if not self.terms:
+            return '0'
+        return ' + '.join('{0}*{1}'.format(scalar, '*'.join(names) or 'identity') for scalar, names in self.terms)
+
+    def __mul__(self, other):
+        if isinstance(other, ModesOperator):
+            return ModesOperator([(scalar1 * scalar2, names1 + names2)
+                                  for scalar1, names1 in self.terms for scalar2, names2 in other.terms])
+        if isinstance(other, numbers.Number):
+            return ModesOperator([(scalar * other, names) for scalar, names in self.terms])
+        return NotImplemented
+
+    def __rmul__(self, other):
+        if isinstance(other, numbers.Number):
+            return self * other
+        return NotImplemented
+
+    def __truediv__(self, other):
+        if isinstance(other, numbers.Number):
+            return self * (1 / other)
+        return NotImplemented
+
+    def __pow__(self, exponent):
+        if not isinstance(exponent, numbers.Integral) or exponent < 0:
+            raise ValueError("Operators can only be raised to non-negative integer powers")
+        result = identity
+        for i in range(exponent):
+            result = self * result
+        return result
+
+    def __add__(self, other):
+        if isinstance(other, numbers.Number):
+            other = other * identity
+        if not isinstance(other, ModesOperator):
+            return NotImplemented
+        return ModesOperator(self.terms + other.terms)
+
+    __radd__ = __add__
+
+    def __neg__(self):
+        return self * -1
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __rsub__(self, other):
+        return (-self) + other
+
+    def coefficients(self, s, ell_max, ell_min=0):
+        """Return list of (coefficients, shift) pairs describing the action of this operator
+
+        For input with spin weight `s` and modes stored from `ell_min` to `ell_max`, the modes of
+        the result are the sum over the list of coefficients[i] * input[..., i-shift].  There is one
+        pair for each distinct shift.
+
+        """
+        return _fused_coefficients(self.terms, s, ell_min, ell_max)
+
+    def __call__(self, modes, out=None):
+        return _apply_coefficients(modes, self.coefficients(modes.s, modes.ell_max, modes.ell_min), modes.s + self.spin_change, out)
+
+
+@lru_cache(maxsize=64)
+def _fused_coefficients(terms, s, ell_min, ell_max):
+    """Combine the coefficients of each product of basic operators, and add those with equal shifts"""
+    n_modes = (ell_max + 1) ** 2 - ell_min ** 2
+    by_shift = {}
+    for scalar, names in terms:
+        coefficients = np.full(n_modes, scalar, dtype=np.result_type(type(scalar), float))
+        shift = 0
+        s_i = s
+        for name in reversed(names):
+            c, shift_i = _operator_coefficients(name, s_i, ell_min, ell_max)
+            # result[i] = c[i] * previous[i-shift_i], where previous[j] = coefficients[j] * f[j-shift]
+            shifted = np.zeros_like(coefficients)
+            if shift_i >= 0:
+                shifted[shift_i:] = coefficients[:n_modes-shift_i]
+            else:
+                shifted[:shift_i] = coefficients[-shift_i:]
+            coefficients = c * shifted
+            shift += shift_i
+            s_i += _spin_changes[name]
+        if shift in by_shift:
+            by_shift[shift] = by_shift[shift] + coefficients
+        else:
+            by_shift[shift] = coefficients
+    if not by_shift:
+        by_shift[0] = np.zeros(n_modes)
+    for coefficients in by_shift.values():
+        coefficients.flags.writeable = False
+    return [(coefficients, shift) for shift, coefficients in sorted(by_shift.items())]
+
+
+identity = ModesOperator([(1, ())])
+Lsquared = ModesOperator([(1, ('Lsquared',))])
+Lz = ModesOperator([(1, ('Lz',))])
+Lplus = ModesOperator([(1, ('Lplus',))])
+Lminus = ModesOperator([(1, ('Lminus',))])
+Rsquared = Lsquared
+Rz = ModesOperator([(1, ('Rz',))])
+Rplus = ModesOperator([(1, ('Rplus',))])
+Rminus = ModesOperator([(1, ('Rminus',))])
+eth = Rminus
+ethbar = -Rplus
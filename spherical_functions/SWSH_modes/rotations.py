@@ -0,0 +1,67 @@
+# Copyright (c) 2020, Michael Boyle
+# See LICENSE file for details: <https://github.com/moble/spherical_functions/blob/master/LICENSE>
+
+### NOTE: The functions in this file are intended purely for inclusion in the Modes class.  In
+### particular, they assume that the first argument, `self` is an instance of Modes.  They should
+### probably not be used outside of that class.
+
+import copy
+import numpy as np
+from .. import LM_index, LMpM_index
+from .._jit import njit
+from numba import prange
+
+
+def rotate(self, R):
+    """Return Modes object corresponding to the function rotated by R
+
+    The rotated function g is related to this function f by g(R*Q) = f(Q) for all Q.  The modes of
+    each ell are transformed among themselves by the Wigner D matrix for that ell:
+
+        g{s, l, mp} = sum(conjugate(D{l, mp, m}(R)) * f{s, l, m} for m in range(-l, l+1))
+
+    For a single rotor, the matrices are computed once, and applied one ell at a time by a
+    compiled kernel, which runs in parallel over the slices of the data (e.g., the time steps of a
+    waveform).  For many rotors, `spherical_functions.rotate_modes` is used instead, which
+    avoids computing the matrices for each rotor.
+
+    Parameters
+    ==========
+    R: quaternion or array of quaternions
+        If this is a single quaternion, every slice of the data is rotated by it.  Otherwise, it must
+        be broadcastable against the leading (non-mode) axes of this object, and each slice is
+        rotated by the corresponding rotor -- so that, for example, a waveform can be transformed to
+        a rotating frame in one call.  The rotors are assumed to be normalized.
+
+    """
+    from .. import Wigner_D_matrices
+    from ..WignerD import rotate_modes
+    R = np.asarray(R, dtype=np.quaternion)
+    s = self.view(np.ndarray)
+    if R.ndim == 0:
+        rotated = np.empty(s.shape, dtype=complex)
+        _rotate_modes(Wigner_D_matrices(R, self.ell_min, self.ell_max), self.ell_min, self.ell_max,
+                      s.reshape((-1, s.shape[-1])), rotated.reshape((-1, s.shape[-1])))
+    else:
+        rotated = rotate_modes(s, self.ell_min, self.ell_max, R)
+    return type(self)(rotated, **copy.copy(self._metadata))
+
+
+@njit(parallel=True)
+def _rotate_modes(D, ell_min, ell_max, modes, rotated):
+    """Apply D matrices to the modes for each ell
+
+    Each row of `modes` is transformed by the matrices in `D`, and written to the same row of
+    `rotated`.  `D` holds all matrices for ell from `ell_min` to `ell_max`, as returned by
+    `Wigner_D_matrices`, and the modes are stored for the same range of ell.
+
+    """
+    for j in prange(modes.shape[0]):
+        for ell in range(ell_min, ell_max+1):
+            i0 = LM_index(ell, -ell, ell_min)
+            for mp in range(-ell, ell+1):
+                i_D = LMpM_index(ell, mp, -ell, ell_min)
+                value = 0.0j
+                for m in range(2*ell+1):
+                    value += np.conj(D[i_D+m]) * modes[j, i0+m]
+                rotated[j, i0+ell+mp] = value
@@ -63,8 +63,7 @@ def __array_ufunc__(self, ufunc, method, *args, out=None, **kwargs):
             metadata['ell_max'] = ell_max
             result = type(self)(result, **metadata)
             if out is not None and isinstance(out[0], type(self)):
-                metadata.pop('ell_min')
-                out[0]._metadata = metadata
+                out[0]._metadata = copy.copy(result._metadata)
         elif isinstance(args[0], type(self)):
             modes = args[0]
             scalars = np.asanyarray(args[1])
@@ -89,7 +88,7 @@ def __array_ufunc__(self, ufunc, method, *args, out=None, **kwargs):
             s = args[0].view(np.ndarray)
             o = args[1].view(np.ndarray)
             result_s = args[0].s + args[1].s
-            result_ell_min = 0
+            result_ell_min = abs(result_s) if self._metadata.get('compact', False) else 0
             result_ell_max = max(
                 truncator((args[0].ell_max, args[1].ell_max))
                 for truncator in [
@@ -112,8 +111,7 @@ def __array_ufunc__(self, ufunc, method, *args, out=None, **kwargs):
             metadata['ell_max'] = result_ell_max
             result = type(self)(result, **metadata)
             if out is not None and isinstance(out[0], type(self)):
-                metadata.pop('ell_min')
-                out[0]._metadata = metadata
+                out[0]._metadata = copy.copy(result._metadata)
         elif isinstance(args[0], type(self)):
             modes = args[0]
             scalars = np.asanyarray(args[1])
@@ -146,20 +144,10 @@ def __array_ufunc__(self, ufunc, method, *args, out=None, **kwargs):
 
     elif ufunc in [np.conj, np.conjugate]:
         if isinstance(args[0], type(self)):
+            from .algebra import _conjugation
             s = args[0].view(np.ndarray)
-            c = np.zeros_like(s) if out is None else out[0]
-            for ell in range(abs(args[0].s), args[0].ell_max+1):
-                i = LM_index(ell, 0, args[0].ell_min)
-                if args[0].s%2 == 0:
-                    c[..., i] = np.conjugate(s[..., i])
-                else:
-                    c[..., i] = -np.conjugate(s[..., i])
-                for m in range(1, ell+1):
-                    i_p, i_n = LM_index(ell, m, args[0].ell_min), LM_index(ell, -m, args[0].ell_min)
-                    if (args[0].s+m)%2 == 0:
-                        c[..., i_p], c[..., i_n] = np.conjugate(s[..., i_n]), np.conjugate(s[..., i_p])
-                    else:
-                        c[..., i_p], c[..., i_n] = -np.conjugate(s[..., i_n]), -np.conjugate(s[..., i_p])
+            c = np.empty_like(s) if out is None else out[0]
+            c = _conjugation(args[0], 0.0, 1.0, c.view(np.ndarray) if isinstance(c, type(self)) else c)
             metadata = copy.copy(args[0]._metadata)
             metadata['spin_weight'] = -args[0].s
             result = type(self)(c, **metadata)
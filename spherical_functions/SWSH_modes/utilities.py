@@ -36,7 +36,7 @@ def truncate_ell(self, new_ell_max):
     return truncated
 
 
-def grid(self, n_theta=None, n_phi=None, **kwargs):
+def grid(self, n_theta=None, n_phi=None, use_spinsfast=True, **kwargs):
     """Return values of function on an equi-angular grid
 
     This method uses `spinsfast` to convert mode weights of spin-weighted function to values on a
@@ -59,20 +59,58 @@ def grid(self, n_theta=None, n_phi=None, **kwargs):
         Number of points to use in the phi direction.  Here, None is equivalent to n_phi=n_theta,
         after calculation of the default value for n_theta.  Note that the same comments apply about
         avoiding aliasing.
+    use_spinsfast: bool [defaults to True]
+        If False, `spinsfast` is not used; instead, the function is evaluated directly using the fact
+        that each row of the grid has a single value of theta.  The theta-dependent parts of the SWSHs
+        are computed once per row, and combined with a table of phases exp(1j*m*phi).  This avoids the
+        dependency, and may be preferable for small grids or large numbers of functions.
     **kwargs: any types
         Additional keyword arguments are passed through to the Grid constructor on output
 
     """
     import copy
     import numpy as np
-    import spinsfast
-    from .. import Grid
+    from .. import Grid, LM_total_size
     n_theta = n_theta or 2*self.ell_max+1
     n_phi = n_phi or n_theta
     metadata = copy.copy(self._metadata)
     metadata.pop('ell_max', None)
+    metadata.pop('ell_min', None)
     metadata.update(**kwargs)
-    return Grid(spinsfast.salm2map(self.view(np.ndarray), self.s, self.ell_max, n_theta, n_phi), **metadata)
+    if not use_spinsfast:
+        return Grid(self._grid_separable(n_theta, n_phi), **metadata)
+    import spinsfast
+    s = self.view(np.ndarray)
+    if self.ell_min > 0:
+        # spinsfast requires all modes from ell=0
+        s = np.concatenate((np.zeros(s.shape[:-1] + (LM_total_size(0, self.ell_min-1),), dtype=complex), s), axis=-1)
+    return Grid(spinsfast.salm2map(s, self.s, self.ell_max, n_theta, n_phi), **metadata)
+
+
+def _grid_separable(self, n_theta, n_phi):
+    """Evaluate function on the `spherical_functions.theta_phi` grid without spinsfast
+
+    The modes are contracted against the theta-dependent factors of the SWSHs for each row, giving
+    one value per (theta, m) pair; these are then multiplied by the phases exp(1j*m*phi) to produce
+    the values on the grid.  The cost is O(n_theta*ell_max**2 + n_theta*n_phi*ell_max) per function.
+
+    """
+    import numpy as np
+    from .. import LM_range
+    from ..SWSH import _SWSH_theta_factors
+    ell_max = self.ell_max
+    theta = np.linspace(0.0, np.pi, num=n_theta, endpoint=True)
+    phi = np.linspace(0.0, 2*np.pi, num=n_phi, endpoint=False)
+    LM = LM_range(self.ell_min, ell_max)
+    ell, m = LM[:, 0], LM[:, 1] + ell_max
+    theta_factors = _SWSH_theta_factors(theta, self.s, ell_max)[:, LM_range(0, ell_max)[:, 0] >= self.ell_min]
+    factors = np.zeros((n_theta, ell_max+1, 2*ell_max+1), dtype=complex)
+    factors[:, ell, m] = theta_factors
+    modes = np.zeros(self.shape[:-1] + (ell_max+1, 2*ell_max+1), dtype=complex)
+    modes[..., ell, m] = self.view(np.ndarray)
+    theta_m = np.einsum('...lm,tlm->...tm', modes, factors)
+    phases = np.exp(1j * np.multiply.outer(np.arange(-ell_max, ell_max+1), phi))
+    return theta_m @ phases
 
 
 def evaluate(self, rotors, **kwargs):
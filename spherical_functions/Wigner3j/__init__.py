@@ -10,11 +10,19 @@ This module uses code from sympy, originally written by Jens Rasch.
 from __future__ import print_function, division, absolute_import
 
 from math import sqrt
+from functools import lru_cache
+import numpy as np
 from .. import factorials
-from quaternion.numba_wrapper import njit, xrange
+from .._coefficient_tables import load_cached
+from quaternion.numba_wrapper import xrange
+from .._jit import njit, vectorize
 
+# For j_1+j_2+j_3 beyond this, the factorials in the direct sum lose accuracy, and soon overflow, so
+# `Wigner3j` uses the recursion in `Wigner3j_j3` instead
+direct_j_sum_max = 40
 
-@njit('f8(i8,i8,i8,i8,i8,i8)')
+
+@njit
 def Wigner3j(j_1, j_2, j_3, m_1, m_2, m_3):
     """Calculate the Wigner 3j symbol `Wigner3j(j_1,j_2,j_3,m_1,m_2,m_3)`
 
@@ -26,6 +34,10 @@ def Wigner3j(j_1, j_2, j_3, m_1, m_2, m_3):
     only occur when the `j`s obey the triangle inequality (any two
     must add up to be as big as or bigger than the third).
 
+    When j_1+j_2+j_3 exceeds `direct_j_sum_max`, the factorial sum
+    is replaced by the recursion used in `Wigner3j_j3`, which
+    remains accurate for j values in the hundreds and beyond.
+
     Examples
     ========
 
@@ -51,6 +63,8 @@ def Wigner3j(j_1, j_2, j_3, m_1, m_2, m_3):
     a3 = -j_1 + j_2 + j_3;
     if (a3 < 0):
         return 0
+    if j_1 + j_2 + j_3 > direct_j_sum_max:
+        return _Wigner3j_recursive(j_1, j_2, j_3, m_1, m_2)
 
     argsqrt = ( factorials[j_1 + j_2 - j_3] *
                 factorials[j_1 - j_2 + j_3] *
@@ -82,7 +96,254 @@ def Wigner3j(j_1, j_2, j_3, m_1, m_2, m_3):
     return ressqrt * sumres * prefid
 
 
-@njit('f8(i8,i8,i8,i8,i8,i8)')
+@njit
+def _Wigner3j_recursive(j_1, j_2, j_3, m_1, m_2):
+    row = np.empty((2*min(j_1, j_2)+1,), dtype=np.float64)
+    j_3_min = Wigner3j_j3(j_1, j_2, m_1, m_2, row)
+    return row[j_3 - j_3_min]
+
+
+@njit
 def clebsch_gordan(j_1, m_1, j_2, m_2, j_3, m_3):
     """Calculate the Clebsch-Gordan coefficient <j1 m1 j2 m2 | j3 m3>"""
     return (-1.)**(j_1-j_2+m_3) * sqrt(2*j_3+1) * Wigner3j(j_1, j_2, j_3, m_1, m_2, -m_3)
+
+
+def _Wigner3j_scalar(j_1, j_2, j_3, m_1, m_2, m_3):
+    return Wigner3j(j_1, j_2, j_3, m_1, m_2, m_3)
+
+
+def _clebsch_gordan_scalar(j_1, m_1, j_2, m_2, j_3, m_3):
+    return clebsch_gordan(j_1, m_1, j_2, m_2, j_3, m_3)
+
+
+@lru_cache(maxsize=None)
+def _ufunc(name, target):
+    """Return ufunc version of the named scalar function, compiling it on first use"""
+    scalar = {'Wigner3j': _Wigner3j_scalar, 'clebsch_gordan': _clebsch_gordan_scalar}[name]
+    return vectorize(['float64(int64, int64, int64, int64, int64, int64)'], target=target)(scalar)
+
+
+def Wigner3j_vectorized(j_1, j_2, j_3, m_1, m_2, m_3, out=None, target='parallel'):
+    """Evaluate `Wigner3j` for each element of broadcastable integer arrays
+
+    This calls a numpy ufunc made by numba's `vectorize`, so the loop over elements runs in compiled
+    code -- by default split across threads -- rather than calling `Wigner3j` once per element from
+    python.  The ufunc is compiled the first time it is used with each `target`, which may be
+    'parallel' or 'cpu'.  The inputs must be integers (or safely castable to int64), and the output
+    is a float array with the broadcast shape of the inputs; it is written into `out` if given.
+
+    """
+    kwargs = {} if out is None else {'out': out}
+    return _ufunc('Wigner3j', target)(j_1, j_2, j_3, m_1, m_2, m_3, **kwargs)
+
+
+def clebsch_gordan_vectorized(j_1, m_1, j_2, m_2, j_3, m_3, out=None, target='parallel'):
+    """Evaluate `clebsch_gordan` for each element of broadcastable integer arrays
+
+    See `Wigner3j_vectorized` for details.
+
+    """
+    kwargs = {} if out is None else {'out': out}
+    return _ufunc('clebsch_gordan', target)(j_1, m_1, j_2, m_2, j_3, m_3, **kwargs)
+
+
+@njit
+def Wigner3j_j3(j_1, j_2, m_1, m_2, out):
+    """Compute the Wigner 3j symbols for all allowed values of j_3, with the other arguments fixed
+
+    This fills `out` with the values of `Wigner3j(j_1, j_2, j_3, m_1, m_2, -m_1-m_2)` for j_3 in
+    range(j_3_min, j_1+j_2+1), and returns j_3_min=max(abs(j_1-j_2), abs(m_1+m_2)).  The output
+    array must have at least 2*min(j_1, j_2)+1 elements; any further elements are left untouched.
+    If abs(m_1)>j_1 or abs(m_2)>j_2, all symbols vanish, and nothing is written to `out`.
+
+    The symbols are computed with the three-term recursion of Schulten and Gordon [J. Math. Phys.
+    16, 1961 (1975)], running forwards from j_3_min and backwards from j_1+j_2 so that each
+    direction is used only where it is stable, as described by Luscombe and Luban [Phys. Rev. E
+    57, 7274 (1998)].  The cost is a small constant per symbol, and the results are accurate to
+    roughly machine precision even for large j values.  `Wigner3j` itself uses this function for
+    j_1+j_2+j_3 > `direct_j_sum_max`, so the two agree there; calling this directly is simply
+    faster when the whole range of j_3 is needed.
+
+    """
+    m_3 = -m_1 - m_2
+    j_3_min = max(abs(j_1 - j_2), abs(m_3))
+    j_3_max = j_1 + j_2
+    if abs(m_1) > j_1 or abs(m_2) > j_2 or j_3_min > j_3_max:
+        return j_3_min
+    n = j_3_max - j_3_min + 1
+    scale = 1.0e100
+
+    # Forward recursion from j_3_min, until |f| first decreases (the first local maximum)
+    out[0] = 1.0
+    i_forward = n - 1
+    if n > 1:
+        j = j_3_min
+        if j == 0:
+            out[1] = -out[0] * (m_2 - m_1) / (2 * sqrt(j_1 * (j_1 + 1.0)))
+        else:
+            out[1] = -_Wigner3j_j3_B(j_1, j_2, m_1, m_2, j) * out[0] / (j * _Wigner3j_j3_A(j_1, j_2, m_3, j + 1))
+        for i in xrange(2, n):
+            if abs(out[i-1]) < abs(out[i-2]):
+                i_forward = i - 1
+                break
+            j = j_3_min + i - 1
+            out[i] = -(_Wigner3j_j3_B(j_1, j_2, m_1, m_2, j) * out[i-1]
+                       + (j + 1) * _Wigner3j_j3_A(j_1, j_2, m_3, j) * out[i-2]) / (j * _Wigner3j_j3_A(j_1, j_2, m_3, j + 1))
+            if abs(out[i]) > scale:
+                for k in xrange(i+1):
+                    out[k] /= scale
+
+    # Backward recursion from j_1+j_2, down to the element before the forward recursion stopped
+    if i_forward < n - 1:
+        i_match = max(i_forward - 1, 0)
+        f_match_0 = out[i_match]
+        f_match_1 = out[i_match + 1]
+        out[n-1] = 1.0
+        j = j_3_max
+        out[n-2] = -_Wigner3j_j3_B(j_1, j_2, m_1, m_2, j) * out[n-1] / ((j + 1) * _Wigner3j_j3_A(j_1, j_2, m_3, j))
+        for i in xrange(n - 3, i_match - 1, -1):
+            j = j_3_min + i + 1
+            out[i] = -(j * _Wigner3j_j3_A(j_1, j_2, m_3, j + 1) * out[i+2]
+                       + _Wigner3j_j3_B(j_1, j_2, m_1, m_2, j) * out[i+1]) / ((j + 1) * _Wigner3j_j3_A(j_1, j_2, m_3, j))
+            if abs(out[i]) > scale:
+                for k in xrange(i, n):
+                    out[k] /= scale
+        # Rescale the backward part to match the forward part (in the least-squares sense) where
+        # they overlap, then restore the forward values
+        ratio = ((f_match_0 * out[i_match] + f_match_1 * out[i_match + 1])
+                 / (out[i_match] ** 2 + out[i_match + 1] ** 2))
+        for i in xrange(i_match, n):
+            out[i] *= ratio
+        out[i_match] = f_match_0
+
+    # Normalize so that sum((2*j_3+1)*f**2)=1, with the sign of the last element (-1)**(j_1-j_2-m_3)
+    norm = 0.0
+    for i in xrange(n):
+        norm += (2 * (j_3_min + i) + 1) * out[i] ** 2
+    norm = 1.0 / sqrt(norm)
+    if (out[n-1] < 0) != ((j_1 - j_2 - m_3) % 2 == 1):
+        norm = -norm
+    for i in xrange(n):
+        out[i] *= norm
+    return j_3_min
+
+
+@njit
+def _Wigner3j_j3_A(j_1, j_2, m_3, j):
+    return sqrt((j ** 2 - (j_1 - j_2) ** 2) * ((j_1 + j_2 + 1) ** 2 - j ** 2) * (j ** 2 - m_3 ** 2) * 1.0)
+
+
+@njit
+def _Wigner3j_j3_B(j_1, j_2, m_1, m_2, j):
+    m_3 = -m_1 - m_2
+    return -(2 * j + 1) * (j_1 * (j_1 + 1.0) * m_3 - j_2 * (j_2 + 1.0) * m_3 - j * (j + 1.0) * (m_2 - m_1))
+
+
+def _Wigner3j_table_offsets(j_max):
+    """Return the offsets of the blocks for each (j_1, j_2, j_3) in a Wigner3jTable, and its size
+
+    Blocks are stored only for j_1 >= j_2 >= j_3 >= j_1-j_2; the block for (j_1, j_2, j_3) contains
+    the symbols with m_3 in range(-j_3, 1) and m_2 in range(-j_2, j_2+1), with m_2 varying fastest,
+    and m_1=-m_2-m_3.  Other offsets are set to -1.
+
+    """
+    offsets = np.full((j_max+1, j_max+1, j_max+1), -1, dtype=np.int64)
+    size = 0
+    for j_1 in range(j_max+1):
+        for j_2 in range(j_1+1):
+            for j_3 in range(j_1-j_2, j_2+1):
+                offsets[j_1, j_2, j_3] = size
+                size += (2*j_2+1) * (j_3+1)
+    return offsets, size
+
+
+@njit
+def _Wigner3j_table_values(offsets, values):
+    j_max = offsets.shape[0] - 1
+    row = np.empty((2*j_max+1,), dtype=np.float64)
+    values[:] = 0.0
+    for j_1 in xrange(j_max+1):
+        for j_2 in xrange(j_1+1):
+            for m_3 in xrange(-j_2, 1):
+                for m_2 in xrange(-j_2, j_2+1):
+                    m_1 = -m_2 - m_3
+                    if abs(m_1) > j_1:
+                        continue
+                    j_3_min = Wigner3j_j3(j_1, j_2, m_1, m_2, row)
+                    for j_3 in xrange(max(j_3_min, j_1-j_2), j_2+1):
+                        values[offsets[j_1, j_2, j_3] + (m_3 + j_3) * (2*j_2+1) + m_2 + j_2] = row[j_3 - j_3_min]
+    return values
+
+
+@njit
+def Wigner3j_lookup(values, offsets, j_1, j_2, j_3, m_1, m_2, m_3):
+    """Return `Wigner3j(j_1, j_2, j_3, m_1, m_2, m_3)` from the arrays of a Wigner3jTable
+
+    This can be called from numba-compiled code, with `values` and `offsets` being the attributes
+    of a Wigner3jTable.  The symmetries of the 3j symbols under permutation of the columns and
+    reversal of the signs of the `m`s are used to find the stored element, so this takes constant
+    time.  Symbols with any `j` greater than the table's `j_max` are computed directly.
+
+    """
+    if (m_1 + m_2 + m_3 != 0):
+        return 0.0
+    if (abs(m_1) > j_1) or (abs(m_2) > j_2) or (abs(m_3) > j_3):
+        return 0.0
+    # Odd permutations of the columns, and reversal of the signs of the m values, both multiply the
+    # symbol by (-1)**(j_1+j_2+j_3)
+    sign = 1.0 if (j_1 + j_2 + j_3) % 2 == 0 else -1.0
+    phase = 1.0
+    if j_1 < j_2:
+        j_1, j_2, m_1, m_2 = j_2, j_1, m_2, m_1
+        phase *= sign
+    if j_2 < j_3:
+        j_2, j_3, m_2, m_3 = j_3, j_2, m_3, m_2
+        phase *= sign
+    if j_1 < j_2:
+        j_1, j_2, m_1, m_2 = j_2, j_1, m_2, m_1
+        phase *= sign
+    if j_3 < j_1 - j_2:
+        return 0.0
+    if j_1 >= offsets.shape[0]:
+        return phase * Wigner3j(j_1, j_2, j_3, m_1, m_2, m_3)
+    if m_3 > 0:
+        m_2, m_3 = -m_2, -m_3
+        phase *= sign
+    return phase * values[offsets[j_1, j_2, j_3] + (m_3 + j_3) * (2*j_2+1) + m_2 + j_2]
+
+
+class Wigner3jTable(object):
+    """Precomputed table of Wigner 3j symbols for integer j_1, j_2, j_3 <= j_max
+
+    Calling this object with arguments (j_1, j_2, j_3, m_1, m_2, m_3) returns the same value as
+    `Wigner3j`, but by looking it up in the table.  Numba-compiled code can do the same by passing
+    the `values` and `offsets` attributes to `Wigner3j_lookup`.
+
+    Only the symbols with j_1 >= j_2 >= j_3 and m_3 <= 0 are stored; the others are related to these
+    by the symmetries of the 3j symbols, which reduces the size of the table by a factor of roughly
+    12.  For j_max=32, the table holds about 1.9 million numbers.  The values are computed with
+    `Wigner3j_j3`, so they remain accurate for large j_max.
+
+    Parameters
+    ==========
+    j_max: int
+        Largest value of any j in the table
+    cache: bool [defaults to False]
+        If True, the table is loaded from the cache directory used by `_coefficient_tables`, and
+        stored there if it is not yet present.
+
+    """
+    def __init__(self, j_max, cache=False):
+        self.j_max = j_max
+        self.offsets, self.size = _Wigner3j_table_offsets(j_max)
+        if cache:
+            self.values = load_cached('Wigner3j_{0}.npy'.format(j_max), self._generate)
+        else:
+            self.values = self._generate()
+
+    def _generate(self):
+        return _Wigner3j_table_values(self.offsets, np.empty((self.size,), dtype=float))
+
+    def __call__(self, j_1, j_2, j_3, m_1, m_2, m_3):
+        return Wigner3j_lookup(self.values, self.offsets, j_1, j_2, j_3, m_1, m_2, m_3)
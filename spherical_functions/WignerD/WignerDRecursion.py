@@ -1,7 +1,12 @@
+import os
+import collections
+import threading
 import numpy as np
 from functools import lru_cache
-from scipy.special import factorial
-from numba import njit
+from scipy.special import gammaln
+import numba
+from numba import prange
+from .._jit import njit
 import spherical_functions as sf
 
 """Algorithm for computing H, as given by arxiv:1403.7698:
@@ -111,6 +116,37 @@ def nmpm_index(n, mp, m):
     return (((4 * n + 6) * n + 6 * mp + 5) * n + 3 * (m + mp)) // 3
 
 
+@njit
+def triangle_index(n, mp, m):
+    """Return flat index into array of H^{m', m}_{n} values stored in triangle form
+
+    Only the computational triangle m=0,...,n, m'=-m,...,m is stored, ordered as
+    [[n, mp, m] for n in range(n_max+1) for m in range(n+1) for mp in range(-m, m+1)].  Any other
+    (n, mp, m) is mapped to the equivalent element of the triangle by the symmetries
+    H^{m', m}_n = H^{m, m'}_n = H^{-m', -m}_n.
+
+    """
+    if m >= abs(mp):
+        return _triangle_index(n, mp, m)
+    elif mp >= abs(m):
+        return _triangle_index(n, m, mp)
+    elif -m >= abs(mp):
+        return _triangle_index(n, -mp, -m)
+    else:
+        return _triangle_index(n, -m, -mp)
+
+
+@njit
+def _triangle_index(n, mp, m):
+    """Return flat index into triangle-form array, assuming that abs(mp) <= m <= n"""
+    return (n * (n + 1) * (2 * n + 1)) // 6 + m * (m + 1) + mp
+
+
+def triangle_total_size(n_max):
+    """Return size of triangle-form array of H values for n=0,...,n_max"""
+    return ((n_max + 1) * (n_max + 2) * (2 * n_max + 3)) // 6
+
+
 @njit
 def _step_1(Hnmpm):
     """If n=0 set H_{0}^{0,0}=1."""
@@ -217,7 +253,7 @@ def _step_3(a, b, n_max, Hnmpm, cosβ, sinβ):
 
 
 @njit
-def _step_4(d, n_max, Hnmpm):
+def _step_4(d, n_max, mp_max, Hnmpm):
     """Recursively compute H^{m'+1, m}_{n}(β) for m'=1,...,n−1, m=m',...,n using relation (50) resolved
     with respect to H^{m'+1, m}_{n}:
       d^{m'}_{n} H^{m'+1, m}_{n} =   d^{m'−1}_{n} H^{m'−1, m}_{n}
@@ -225,9 +261,11 @@ def _step_4(d, n_max, Hnmpm):
                                    + d^{m}_{n} H^{m', m+1}_{n}
     (where the last term drops out for m=n).
 
+    The recursion stops once m'+1 reaches mp_max.
+
     """
     for n in range(2, n_max+1):
-        for mp in range(1, n):
+        for mp in range(1, min(n, mp_max)):
             # m = m', ..., n-1
             i1 = nmpm_index(n, mp+1, mp)
             i2 = nmpm_index(n, mp-1, mp)
@@ -256,7 +294,7 @@ def _step_4(d, n_max, Hnmpm):
 
 
 @njit
-def _step_5(d, n_max, Hnmpm):
+def _step_5(d, n_max, mp_max, Hnmpm):
     """Recursively compute H^{m'−1, m}_{n}(β) for m'=−1,...,−n+1, m=−m',...,n using relation (50)
     resolved with respect to H^{m'−1, m}_{n}:
       d^{m'−1}_{n} H^{m'−1, m}_{n} = d^{m'}_{n} H^{m'+1, m}_{n}
@@ -268,9 +306,12 @@ def _step_5(d, n_max, Hnmpm):
     start at 0, or there will be missing information.  This also requires setting the (m',m)=(0,-1)
     components before beginning this loop.
 
+    The recursion stops once m'-1 reaches -mp_max-1; that last row is needed by _step_6 to fill the
+    row m'=mp_max.
+
     """
     for n in range(0, n_max+1):
-        for mp in range(0, -n, -1):
+        for mp in range(0, max(-n, -mp_max-1), -1):
             # m = -m', ..., n-1
             i1 = nmpm_index(n, mp-1, -mp)
             i2 = nmpm_index(n, mp+1, -mp)
@@ -301,23 +342,294 @@ def _step_5(d, n_max, Hnmpm):
 
 
 @njit
-def _step_6(n_max, Hnmpm):
+def _step_6(n_max, mp_max, Hnmpm):
     """Apply the symmetry relations below to obtain all other values H^{m',m}_{n}
     outside the computational triangle m=0,...,n, m'=−m,...,m:
       H^{m', m}_n(\beta) = H^{m, m'}_n(\beta)
       H^{m', m}_n(\beta) = H^{-m', -m}_n(\beta)
+
+    Only the rows with |m'| <= mp_max are filled.
     """
     for n in range(1, n_max+1):
-        for mp in range(1, n+1):
+        for mp in range(1, min(n, mp_max)+1):
             for m in range(max(-mp-1, -n), mp-1):
                 for j in range(Hnmpm.shape[1]):
                     Hnmpm[nmpm_index(n, mp, m), j] = Hnmpm[nmpm_index(n, m, mp), j]
-        for mp in range(-n, n+1):
+        for mp in range(-min(n, mp_max), min(n, mp_max)+1):
             for m in range(-n, -mp-1):
                 for j in range(Hnmpm.shape[1]):
                     Hnmpm[nmpm_index(n, mp, m), j] = Hnmpm[nmpm_index(n, -mp, -m), j]
 
 
+@njit
+def _step_2_triangle(g, h, n_max, Htriangle, cosβ, sinβ):
+    """Triangle-storage version of `_step_2`
+
+    The computation is the same, but the extra edge cases need not be set, because the symmetric
+    elements are read from the same location.
+
+    """
+    sin2β = sinβ**2
+
+    # n = 1
+    Htriangle[_triangle_index(1, 0, 1), :] = np.sqrt(3)  # Un-normalized
+    Htriangle[_triangle_index(1, 0, 0), :] = (g[nm_index(1, 1)-1] * cosβ) / np.sqrt(2)  # Normalized
+    # n = 2, ..., n_max+1
+    for n in range(2, n_max+2):
+        nn_index = nm_index(n, n)
+        i_n = _triangle_index(n, 0, n)
+        i_nm1 = _triangle_index(n-1, 0, n-1)
+        const = np.sqrt((2*n+1) / (2*n))
+        gi = g[nn_index-1]
+        for j in range(Htriangle.shape[1]):
+            # m = n
+            Htriangle[i_n, j] = const * Htriangle[i_nm1, j]
+            # m = n-1
+            Htriangle[_triangle_index(n, 0, n-1), j] = gi * cosβ[j] * Htriangle[i_n, j]
+        # m = n-2, ..., 1
+        for i in range(2, n):
+            gi = g[nn_index-i]
+            hi = h[nn_index-i]
+            i0 = _triangle_index(n, 0, n-i)
+            i1 = _triangle_index(n, 0, n-i+1)
+            i2 = _triangle_index(n, 0, n-i+2)
+            for j in range(Htriangle.shape[1]):
+                Htriangle[i0, j] = gi * cosβ[j] * Htriangle[i1, j] - hi * sin2β[j] * Htriangle[i2, j]
+        # m = 0, with normalization
+        const = np.sqrt(2*(2*n+1))
+        gi = g[nn_index-n]
+        hi = h[nn_index-n]
+        i0 = _triangle_index(n, 0, 0)
+        i1 = _triangle_index(n, 0, 1)
+        i2 = _triangle_index(n, 0, 2)
+        for j in range(Htriangle.shape[1]):
+            Htriangle[i0, j] = (gi * cosβ[j] * Htriangle[i1, j] - hi * sin2β[j] * Htriangle[i2, j]) / const
+        # Now, loop back through, correcting the normalization for this row, except for n=n element
+        prefactor = np.full_like(sinβ, 1/const)
+        for i in range(1, n):
+            prefactor *= sinβ
+            Htriangle[_triangle_index(n, 0, i), :] *= prefactor
+    # Correct normalization of m=n elements
+    prefactor = np.ones_like(sinβ)
+    for n in range(1, n_max+2):
+        prefactor *= sinβ
+        Htriangle[_triangle_index(n, 0, n), :] *= prefactor / np.sqrt(2*(2*n+1))
+
+
+@njit
+def _step_3_triangle(a, b, n_max, Htriangle, cosβ, sinβ):
+    """Triangle-storage version of `_step_3`"""
+    for n in range(1, n_max+1):
+        # m = 1, ..., n
+        i5 = nm_index(n+1, 0)
+        i6 = nm_index(n+1, -2)
+        i7 = nm_index(n+1, 0)
+        i8 = nabsm_index(n, 1)
+        b5 = b[i5]
+        for i in range(n):
+            b6 = b[-i+i6]
+            b7 = b[i+i7]
+            a8 = a[i+i8]
+            i1 = _triangle_index(n, 1, 1+i)
+            i2 = _triangle_index(n+1, 0, 2+i)
+            i3 = _triangle_index(n+1, 0, i)
+            i4 = _triangle_index(n+1, 0, 1+i)
+            for j in range(Htriangle.shape[1]):
+                Htriangle[i1, j] = (1 / b5) * (
+                    0.5 * (
+                          b6 * (1-cosβ[j]) * Htriangle[i2, j]
+                        - b7 * (1+cosβ[j]) * Htriangle[i3, j]
+                    )
+                    - a8 * sinβ[j] * Htriangle[i4, j]
+                )
+
+
+@njit
+def _step_4_triangle(d, n_max, mp_max, Htriangle):
+    """Triangle-storage version of `_step_4`
+
+    The element H^{m'+1, m'}_{n} lies outside the triangle, and its symmetric equivalent has
+    already been computed, so it is skipped.
+
+    """
+    for n in range(2, n_max+1):
+        for mp in range(1, min(n, mp_max)):
+            i5 = nm_index(n, mp)
+            i6 = nm_index(n, mp-1)
+            d5 = d[i5]
+            d6 = d[i6]
+            # m = m'+1, ..., n-1
+            for i in range(1, n-mp):
+                d7 = d[i+i6]
+                d8 = d[i+i5]
+                i1 = _triangle_index(n, mp+1, mp+i)
+                i2 = triangle_index(n, mp-1, mp+i)
+                i3 = triangle_index(n, mp, mp-1+i)
+                i4 = triangle_index(n, mp, mp+1+i)
+                for j in range(Htriangle.shape[1]):
+                    Htriangle[i1, j] = (1 / d5) * (
+                          d6 * Htriangle[i2, j]
+                        - d7 * Htriangle[i3, j]
+                        + d8 * Htriangle[i4, j]
+                    )
+            # m = n
+            i = n-mp
+            i1 = _triangle_index(n, mp+1, n)
+            i2 = triangle_index(n, mp-1, n)
+            i3 = triangle_index(n, mp, n-1)
+            for j in range(Htriangle.shape[1]):
+                Htriangle[i1, j] = (1 / d5) * (
+                      d6 * Htriangle[i2, j]
+                    - d[i+i6] * Htriangle[i3, j]
+                )
+
+
+@njit
+def _step_5_triangle(d, n_max, mp_max, Htriangle):
+    """Triangle-storage version of `_step_5`
+
+    The element H^{m'-1, -m'}_{n} lies outside the triangle, and its symmetric equivalent has
+    already been computed, so it is skipped.  Also, the extra row needed by `_step_6` is not needed
+    here, because that step is unnecessary.
+
+    """
+    for n in range(0, n_max+1):
+        for mp in range(0, max(-n, -mp_max), -1):
+            i5 = nm_index(n, mp-1)
+            i6 = nm_index(n, mp)
+            i7 = nm_index(n, -mp-1)
+            i8 = nm_index(n, -mp)
+            d5 = d[i5]
+            d6 = d[i6]
+            # m = -m'+1, ..., n-1
+            for i in range(1, n+mp):
+                d7 = d[i+i7]
+                d8 = d[i+i8]
+                i1 = _triangle_index(n, mp-1, -mp+i)
+                i2 = triangle_index(n, mp+1, -mp+i)
+                i3 = triangle_index(n, mp, -mp-1+i)
+                i4 = triangle_index(n, mp, -mp+1+i)
+                for j in range(Htriangle.shape[1]):
+                    Htriangle[i1, j] = (1 / d5) * (
+                          d6 * Htriangle[i2, j]
+                        + d7 * Htriangle[i3, j]
+                        - d8 * Htriangle[i4, j]
+                    )
+            # m = n
+            i = n+mp
+            i1 = _triangle_index(n, mp-1, n)
+            i2 = triangle_index(n, mp+1, n)
+            i3 = triangle_index(n, mp, n-1)
+            for j in range(Htriangle.shape[1]):
+                Htriangle[i1, j] = (1 / d5) * (
+                      d6 * Htriangle[i2, j]
+                    + d[i+i7] * Htriangle[i3, j]
+                )
+
+
+@njit
+def _steps_triangle(g, h, a, b, d, n_max, mp_max, Htriangle, cosβ, sinβ):
+    """Run all steps on triangle-form storage; no symmetry step is needed"""
+    _step_1(Htriangle)
+    _step_2_triangle(g, h, n_max, Htriangle, cosβ, sinβ)
+    _step_3_triangle(a, b, n_max, Htriangle, cosβ, sinβ)
+    _step_4_triangle(d, n_max, mp_max, Htriangle)
+    _step_5_triangle(d, n_max, mp_max, Htriangle)
+
+
+@njit
+def _materialize(n_max, mp_max, Htriangle, Hnmpm):
+    """Copy triangle-form values into the rows |m'| <= mp_max of full-form array Hnmpm"""
+    for n in range(n_max+1):
+        for mp in range(-min(n, mp_max), min(n, mp_max)+1):
+            for m in range(-n, n+1):
+                i1 = nmpm_index(n, mp, m)
+                i2 = triangle_index(n, mp, m)
+                for j in range(Hnmpm.shape[1]):
+                    Hnmpm[i1, j] = Htriangle[i2, j]
+
+
+@njit(parallel=True)
+def _steps_parallel(g, h, a, b, d, n_max, mp_max, Hnmpm, cosβ, sinβ, n_chunks, triangle):
+    """Run steps 1 through 6 on contiguous blocks of β values in parallel
+
+    Each block of columns of `Hnmpm` is processed by the same serial functions as above, so the
+    results are identical to the serial computation.  If `triangle` is True, `Hnmpm` is in
+    triangle form.
+
+    """
+    N = Hnmpm.shape[1]
+    for k in prange(n_chunks):
+        j0 = (k * N) // n_chunks
+        j1 = ((k + 1) * N) // n_chunks
+        H = Hnmpm[:, j0:j1]
+        if triangle:
+            _steps_triangle(g, h, a, b, d, n_max, mp_max, H, cosβ[j0:j1], sinβ[j0:j1])
+        else:
+            _step_1(H)
+            _step_2(g, h, n_max, H, cosβ[j0:j1], sinβ[j0:j1])
+            _step_3(a, b, n_max, H, cosβ[j0:j1], sinβ[j0:j1])
+            _step_4(d, n_max, mp_max, H)
+            _step_5(d, n_max, mp_max, H)
+            _step_6(n_max, mp_max, H)
+
+
+# Directory in which coefficient arrays for HCalculator are stored between processes; if None, they
+# are only cached in memory
+coefficient_cache_directory = os.environ.get('SPHERICAL_FUNCTIONS_CACHE_DIR', None)
+
+# Maximum number of workspaces kept for each thread by `HCalculator.workspace(cosβ, pooled=True)`
+workspace_pool_size = 4
+_workspace_pool = threading.local()
+
+
+@lru_cache(maxsize=16)
+def _coefficients(n_max):
+    """Return a dict of the (read-only) coefficient arrays used by HCalculator(n_max)
+
+    Results are cached in memory for the most recently used values of n_max.  If
+    `coefficient_cache_directory` is set, they are also loaded from or saved to that directory.
+
+    """
+    keys = ('sqrt_factorial_ratio', 'a', 'b', 'd', 'g', 'h', 'absm')
+    coefficients = None
+    if coefficient_cache_directory is not None:
+        path = os.path.join(coefficient_cache_directory, 'HCalculator_coefficients_{0}.npz'.format(n_max))
+        try:
+            with np.load(path) as f:
+                coefficients = {key: f[key] for key in keys}
+        except (OSError, KeyError, ValueError):
+            coefficients = None
+    if coefficients is None:
+        # The arrays are indexed as [n, m] for n in range(n_max+2) for m in range(-n, n+1)
+        n = np.repeat(np.arange(n_max+2), 2*np.arange(n_max+2)+1)
+        m = np.arange(n.size) - n * (n + 1)
+        # ...or as [n, abs(m)] for n in range(n_max+2) for m in range(n+1)
+        absn = np.repeat(np.arange(n_max+2), np.arange(n_max+2)+1)
+        absm = np.arange(absn.size) - (absn * (absn + 1)) // 2
+        coefficients = {'absm': absm}
+        coefficients['sqrt_factorial_ratio'] = (-1)**absm * np.exp(0.5 * (gammaln(absn-absm+1) - gammaln(absn+absm+1)))
+        coefficients['a'] = np.sqrt((absn+1+absm) * (absn+1-absm) / ((2*absn+1)*(2*absn+3)))
+        coefficients['b'] = np.sqrt((n-m-1) * (n-m) / ((2*n-1)*(2*n+1)))
+        coefficients['b'][m<0] *= -1
+        coefficients['d'] = 0.5 * np.sqrt((n-m) * (n+m+1))
+        coefficients['d'][m<0] *= -1
+        with np.errstate(divide='ignore', invalid='ignore'):
+            coefficients['g'] = 2*(m+1) / np.sqrt((n-m)*(n+m+1))
+            coefficients['h'] = np.sqrt((n+m+2)*(n-m-1) / ((n-m)*(n+m+1)))
+        if coefficient_cache_directory is not None:
+            try:
+                os.makedirs(coefficient_cache_directory, exist_ok=True)
+                temp_path = '{0}.{1}.tmp.npz'.format(path[:-4], os.getpid())
+                np.savez(temp_path, **coefficients)
+                os.replace(temp_path, path)
+            except OSError:
+                pass
+    for value in coefficients.values():
+        value.flags.writeable = False
+    return coefficients
+
+
 class HCalculator(object):
     def __init__(self, n_max):
         self.n_max = int(n_max)
@@ -325,21 +637,16 @@ class HCalculator(object):
             raise ValueError('Nonsensical value for n_max = {0}'.format(self.n_max))
         self.nmpm_total_size = sf.LMpM_total_size(0, self.n_max)
         self.nmpm_total_size_plus1 = sf.LMpM_total_size(0, self.n_max+1)
-        n = np.array([n for n in range(self.n_max+2) for m in range(-n, n+1)])
-        m = np.array([m for n in range(self.n_max+2) for m in range(-n, n+1)])
-        absn = np.array([n for n in range(self.n_max+2) for m in range(n+1)])
-        absm = np.array([m for n in range(self.n_max+2) for m in range(n+1)])
-        self.sqrt_factorial_ratio = (-1)**absm * np.sqrt(
-            np.asarray(factorial(absn-absm, exact=True) / factorial(absn+absm, exact=True), dtype=float))
-        self.a = np.sqrt((absn+1+absm) * (absn+1-absm) / ((2*absn+1)*(2*absn+3)))
-        self.b = np.sqrt((n-m-1) * (n-m) / ((2*n-1)*(2*n+1)))
-        self.b[m<0] *= -1
-        self.d = 0.5 * np.sqrt((n-m) * (n+m+1))
-        self.d[m<0] *= -1
-        with np.errstate(divide='ignore', invalid='ignore'):
-            self.g = 2*(m+1) / np.sqrt((n-m)*(n+m+1))
-            self.h = np.sqrt((n+m+2)*(n-m-1) / ((n-m)*(n+m+1)))
-        self.absm = absm
+        self.triangle_total_size = triangle_total_size(self.n_max)
+        self.triangle_total_size_plus1 = triangle_total_size(self.n_max+1)
+        coefficients = _coefficients(self.n_max)
+        self.sqrt_factorial_ratio = coefficients['sqrt_factorial_ratio']
+        self.a = coefficients['a']
+        self.b = coefficients['b']
+        self.d = coefficients['d']
+        self.g = coefficients['g']
+        self.h = coefficients['h']
+        self.absm = coefficients['absm']
         if not (
             np.all(np.isfinite(self.sqrt_factorial_ratio)) and
             np.all(np.isfinite(self.a)) and
@@ -349,24 +656,94 @@ class HCalculator(object):
         ):
             raise ValueError("Found a non-finite value inside this object")
 
-    def workspace(self, cosβ):
-        """Return a new workspace sized for cosβ."""
-        return np.zeros((self.nmpm_total_size_plus1,) + cosβ.shape, dtype=float)
-
-    def __call__(self, cosβ, workspace=None):
+    def workspace(self, cosβ, pooled=False, triangle=False):
+        """Return a workspace sized for cosβ
+
+        If `triangle` is True, the workspace is sized for the triangle form of the output (see
+        `__call__`).  If `pooled` is True, the workspace is taken from a small pool belonging to the
+        calling thread, and shared by all HCalculator objects used in that thread, rather than newly
+        allocated.  The same array will be returned by later pooled requests from the same thread
+        for a workspace of the same shape, so the output of any computation using it will be
+        overwritten by the next such computation.  At most `workspace_pool_size` workspaces are
+        kept for each thread, with the least recently used being discarded first.
+
+        """
+        size = self.triangle_total_size_plus1 if triangle else self.nmpm_total_size_plus1
+        shape = (size,) + np.shape(cosβ)
+        if not pooled:
+            return np.zeros(shape, dtype=float)
+        pool = getattr(_workspace_pool, 'workspaces', None)
+        if pool is None:
+            pool = _workspace_pool.workspaces = collections.OrderedDict()
+        workspace = pool.pop(shape, None)
+        if workspace is None:
+            workspace = np.zeros(shape, dtype=float)
+        pool[shape] = workspace
+        while len(pool) > workspace_pool_size:
+            pool.popitem(last=False)
+        return workspace
+
+    def __call__(self, cosβ, workspace=None, mp_max=None, parallel=False, num_threads=None, triangle=False):
+        """Compute H^{m',m}_{n}(β) for all n <= n_max
+
+        If `mp_max` is given, only the rows with |m'| <= mp_max are computed (and filled by
+        symmetry); all other elements of the output are left untouched.  This reduces the cost from
+        O(n_max**3) to O(n_max**2 * mp_max) per value of β, which is useful when only a few values of
+        m' are needed -- as for the spin-weighted spherical harmonics of a given spin weight.
+
+        If `parallel` is True, the values of β are split into blocks that are processed on separate
+        threads.  The results are identical to the serial computation.  The number of threads
+        defaults to `numba.get_num_threads()`, and may be set for this call with `num_threads`.
+
+        If `triangle` is True, only the computational triangle m=0,...,n, m'=-m,...,m is stored,
+        which takes roughly 1/4 of the memory, and avoids copying values by symmetry.  Elements of
+        the output are located with `triangle_index(n, mp, m)` for any valid (n, mp, m), and the
+        full array can be recovered with `materialize`.  The workspace, if given, must be created
+        with `self.workspace(cosβ, triangle=True)`.
+
+        """
+        mp_max = self.n_max if mp_max is None else min(abs(int(mp_max)), self.n_max)
         cosβ = np.asarray(cosβ, dtype=float)
         if np.max(cosβ) > 1.0 or np.min(cosβ) < -1.0:
             raise ValueError('Nonsensical value for range of cosβ: [{0}, {1}]'.format(np.min(cosβ), np.max(cosβ)))
         cosβshape = cosβ.shape
-        Hnmpm = workspace if workspace is not None else self.workspace(cosβ)
+        Hnmpm = workspace if workspace is not None else self.workspace(cosβ, triangle=triangle)
         cosβ = cosβ.ravel(order='K')
         sinβ = np.sqrt(1 - cosβ**2)
         Hnmpm = Hnmpm.reshape((-1, cosβ.size))
-        _step_1(Hnmpm)
-        _step_2(self.g, self.h, self.n_max, Hnmpm, cosβ, sinβ)
-        _step_3(self.a, self.b, self.n_max, Hnmpm, cosβ, sinβ)
-        _step_4(self.d, self.n_max, Hnmpm)
-        _step_5(self.d, self.n_max, Hnmpm)
-        _step_6(self.n_max, Hnmpm)
+        if parallel and cosβ.size > 1:
+            previous_num_threads = numba.get_num_threads()
+            num_threads = previous_num_threads if num_threads is None else int(num_threads)
+            numba.set_num_threads(num_threads)
+            try:
+                _steps_parallel(self.g, self.h, self.a, self.b, self.d, self.n_max, mp_max, Hnmpm, cosβ, sinβ,
+                                min(cosβ.size, 4 * num_threads), triangle)
+            finally:
+                numba.set_num_threads(previous_num_threads)
+        elif triangle:
+            _steps_triangle(self.g, self.h, self.a, self.b, self.d, self.n_max, mp_max, Hnmpm, cosβ, sinβ)
+        else:
+            _step_1(Hnmpm)
+            _step_2(self.g, self.h, self.n_max, Hnmpm, cosβ, sinβ)
+            _step_3(self.a, self.b, self.n_max, Hnmpm, cosβ, sinβ)
+            _step_4(self.d, self.n_max, mp_max, Hnmpm)
+            _step_5(self.d, self.n_max, mp_max, Hnmpm)
+            _step_6(self.n_max, mp_max, Hnmpm)
         Hnmpm.reshape((-1,)+cosβshape)
+        if triangle:
+            return Hnmpm[:self.triangle_total_size]  # Remove n_max+1 scratch space
         return Hnmpm[:self.nmpm_total_size]  # Remove n_max+1 scratch space
+
+    def materialize(self, Htriangle, mp_max=None):
+        """Return full array of H values from the triangle form returned by `__call__`
+
+        The output is what `__call__` would have returned with `triangle=False`.  If `mp_max` is
+        given, only the rows with |m'| <= mp_max are filled; the others are zero.
+
+        """
+        mp_max = self.n_max if mp_max is None else min(abs(int(mp_max)), self.n_max)
+        Htriangle = np.asarray(Htriangle, dtype=float)
+        Hnmpm = np.zeros((self.nmpm_total_size,) + Htriangle.shape[1:], dtype=float)
+        _materialize(self.n_max, mp_max, Htriangle.reshape((Htriangle.shape[0], -1)),
+                     Hnmpm.reshape((Hnmpm.shape[0], -1)))
+        return Hnmpm
@@ -13,19 +13,26 @@ matrices (respectively) of Wigner's D symbols.
 from __future__ import print_function, division, absolute_import
 
 import numbers
+import math
 import cmath
+from functools import lru_cache
 import numpy as np
 import quaternion
-from .. import (_Wigner_coefficient as _coeff,
-                Wigner_coefficient as coeff,
-                epsilon, error_on_bad_indices, LMpM_total_size,
-                ell_max as sf_ell_max)
-from quaternion.numba_wrapper import njit, jit, int64, complex128, xrange
+from .. import (_Wigner_coefficients, _Wigner_index,
+                epsilon, error_on_bad_indices, LM_total_size, LM_index, LMpM_total_size, LMpM_index,
+                direct_ell_max)
+from quaternion.numba_wrapper import int64, complex128, xrange
+from .._jit import njit, jit
+from numba import prange, get_num_threads
 
+# Approximate number of bytes of recursion workspace touched by each chunk of rotors in
+# `Wigner_D_matrices_recursive`
+_recursion_chunk_bytes = 2**25
 
-@njit('b1(i8,i8,i8)')
+
+@njit
 def _check_valid_indices(twoell, twomp, twom):
-    if (twoell > 2*sf_ell_max or abs(twomp) > twoell or abs(twom) > twoell):
+    if (abs(twomp) > twoell or abs(twom) > twoell):
         return False
     return True
 
@@ -76,14 +83,24 @@ def Wigner_D_element(*args):
     one component was requested, a one-dimensional numpy array of complex
     scalars is returned, in the same order as the input.
 
+    Elements with ell > `spherical_functions.direct_ell_max` are computed
+    by `Wigner_D_matrices_recursive`, because the direct sums lose
+    accuracy for large ell.  Half-integer values of ell are only
+    supported up to that limit.
+
     """
     # Find the rotation from the args
     if isinstance(args[0], np.ndarray):
+        if round(2*args[1]) > 2*direct_ell_max:
+            indices = [[round(2*args[1]), round(2*args[2]), round(2*args[3])]]
+            return _Wigner_D_elements_recursive(args[0], indices)[..., 0]
         elements = np.empty_like(args[0], dtype=complex)
-        _Wigner_D_elements(quaternion.as_float_array(args[0]), args[1], args[2], args[3], elements)
+        _Wigner_D_elements(_Wigner_coefficients, quaternion.as_float_array(args[0]), args[1], args[2], args[3],
+                           elements)
         return elements
     elif isinstance(args[0], np.quaternion):
         # The rotation is input as a single quaternion
+        R = args[0]
         Ra = args[0].a
         Rb = args[0].b
         mode_offset = 1
@@ -98,6 +115,7 @@ def Wigner_D_element(*args):
         # The rotation is input as the two parts of a single quaternion
         Ra = args[0]
         Rb = args[1]
+        R = np.quaternion(Ra.real, Rb.imag, Rb.real, Ra.imag)
         mode_offset = 2
     else:
         raise ValueError("Can't understand input rotation")
@@ -143,14 +161,39 @@ def Wigner_D_element(*args):
         raise ValueError("Can't understand input indices")
 
     elements = np.empty((len(indices),), dtype=complex)
-    _Wigner_D_element(Ra, Rb, indices, elements)
+    direct = indices[:, 0] <= 2*direct_ell_max
+    elements_direct = np.empty((np.count_nonzero(direct),), dtype=complex)
+    _Wigner_D_element(_Wigner_coefficients, Ra, Rb, indices[direct], elements_direct)
+    elements[direct] = elements_direct
+    if not np.all(direct):
+        elements[~direct] = _Wigner_D_elements_recursive(R, indices[~direct])
 
     if (return_scalar):
         return elements[0]
     return elements
 
+def _Wigner_D_elements_recursive(R, indices):
+    """Return Wigner D matrix elements for large ell, using `Wigner_D_matrices_recursive`
+
+    The input `indices` is an array of integer sets [2*ell, 2*mp, 2*m], as
+    in `_Wigner_D_element`, though only integer values of ell are
+    supported.  Elements with invalid indices are 0.0.  The result has
+    shape `R.shape + (len(indices),)`.
+
+    """
+    twoell, twomp, twom = np.asarray(indices, dtype=int).reshape((-1, 3)).T
+    if np.any(twoell % 2):
+        raise ValueError("Half-integer ell values are only supported up to "
+                         "spherical_functions.direct_ell_max={0}".format(direct_ell_max))
+    valid = (abs(twomp) <= twoell) & (abs(twom) <= twoell) & (twomp % 2 == 0) & (twom % 2 == 0)
+    ell, mp, m = twoell // 2, np.where(valid, twomp // 2, 0), np.where(valid, twom // 2, 0)
+    ell_min = ell.min()
+    matrices = Wigner_D_matrices_recursive(R, ell_min, ell.max())
+    return np.where(valid, matrices[..., LMpM_index(ell, mp, m, ell_min)], 0.0j)
+
+
 #@njit('void(complex128, complex128, int64[:,:], complex128[:])')
-def _Wigner_D_element(Ra, Rb, indices, elements):
+def _Wigner_D_element(coefficients, Ra, Rb, indices, elements):
     """Main work function for computing Wigner D matrix elements
 
     This is the core function that does all the work in the
@@ -161,8 +204,10 @@ def _Wigner_D_element(Ra, Rb, indices, elements):
 
     Input arguments
     ===============
-    _Wigner_D_element(Ra, Rb, indices, elements)
+    _Wigner_D_element(coefficients, Ra, Rb, indices, elements)
 
+      * coefficients is the table of Wigner coefficients, as in
+        `spherical_functions._Wigner_coefficients`
       * Ra, Rb are the complex components of the rotor
       * indices is an array of integer sets [2*ell, 2*mp, 2*m]
       * elements is an array of complex with length equal to the first
@@ -218,7 +263,7 @@ def _Wigner_D_element(Ra, Rb, indices, elements):
                 # underflow just goes to zero, which is fine since
                 # nothing else should be very large.
                 Prefactor = cmath.rect(
-                    _coeff(twoell, -twomp, twom)
+                    coefficients[_Wigner_index(twoell, -twomp, twom)]
                         * rb ** (twoell - (twom + twomp)/2 - tworhoMin)
                         * ra ** ((twom + twomp)/2 + tworhoMin),
                     phib * (twom - twomp)/2 + phia * (twom + twomp)/2)
@@ -257,7 +302,7 @@ def _Wigner_D_element(Ra, Rb, indices, elements):
                 # underflow just goes to zero, which is fine since
                 # nothing else should be very large.
                 Prefactor = cmath.rect(
-                    _coeff(twoell, twomp, twom)
+                    coefficients[_Wigner_index(twoell, twomp, twom)]
                         * ra ** (twoell - twom/2 + twomp/2 - tworhoMin)
                         * rb ** (twom/2 - twomp/2 + tworhoMin),
                     phia * (twom + twomp)/2 + phib * (twom - twomp)/2)
@@ -277,7 +322,7 @@ def _Wigner_D_element(Ra, Rb, indices, elements):
                     elements[i] = Prefactor * Sum
 
 
-@njit('int64(int64, int64, int64)')
+@njit
 def _linear_matrix_index(ell, mp, m):
     """Index of array corresponding to matrix element
 
@@ -295,7 +340,7 @@ def _linear_matrix_index(ell, mp, m):
     return (ell + m) + (ell + mp) * (2 * ell + 1)
 
 
-@njit('int64(int64, int64)')
+@njit
 def _linear_matrix_diagonal_index(ell, mpm):
     """Index of array corresponding to matrix diagonal element
 
@@ -313,7 +358,7 @@ def _linear_matrix_diagonal_index(ell, mpm):
     return (ell + mpm) * (2 * ell + 2)
 
 
-@njit('int64(int64, int64)')
+@njit
 def _linear_matrix_offset(ell, ell_min):
     """Index of initial element in linear array of D matrices
 
@@ -337,17 +382,17 @@ def _linear_matrix_offset(ell, ell_min):
     return ( (4 * ell ** 2 - 1) * ell - (4 * ell_min ** 2 - 1) * ell_min ) // 3
 
 
-@njit('int64(int64,int64)')
+@njit
 def _total_size_D_matrices(ell_min, ell_max):
     return ( ((4 * ell_max + 12) * ell_max + 11) * ell_max + 3 - (4 * ell_min ** 2 - 1) * ell_min ) // 3
 
 
-@njit('complex128(complex128)')
+@njit
 def conjugate(z):
     return z.conjugate()
 
 
-def Wigner_D_matrices(R, ell_min, ell_max):
+def Wigner_D_matrices(R, ell_min, ell_max, out=None):
     """Return linear array of Wigner D matrix elements for range of integer ell values
 
     Note that this only accepts and outputs integer values of ell; for half-integer values,
@@ -355,19 +400,25 @@ def Wigner_D_matrices(R, ell_min, ell_max):
 
     Parameters
     ----------
-    R : quaternion
-        The rotor for the D matrices
+    R : quaternion or array of quaternions
+        The rotor(s) for the D matrices.  If this is an array, the matrices for all rotors are
+        computed in parallel by a single numba kernel.
     ell_min : int
         Lowest ell value included in array
     ell_max : int
         Highest ell value included in array
+    out : numpy.ndarray, optional
+        C-contiguous complex array of shape `R.shape + (LMpM_total_size(ell_min, ell_max),)` into
+        which the result will be placed.  This can be used to avoid reallocating the output when
+        this function is called repeatedly.
 
     Returns
     -------
     numpy.ndarray
-        Linear array of all matrix elements
+        Array of all matrix elements, with shape `R.shape + (LMpM_total_size(ell_min, ell_max),)`.
+        If `out` was passed, it is returned.
 
-        The array is in the standard order, essentially of the form
+        The last axis is in the standard order, essentially of the form
 
             [D(ell,mp,m) for ell in range(ell_min, ell_max+1)
                          for mp in range(-ell,ell+1)
@@ -378,6 +429,7 @@ def Wigner_D_matrices(R, ell_min, ell_max):
     LMpM_total_size: Calculate total size of this array
     LMpM_index: Find index in this array of element (ell,mp,m)
     LMpM_range: Construct list of corresponding (ell,mp,m) values
+    Wigner_D_matrices_recursive: Used automatically when `ell_max` exceeds `spherical_functions.direct_ell_max`
 
     """
     if abs(round(ell_max)-ell_max) > 1e-10 or abs(round(ell_min)-ell_min) > 1e-10:
@@ -385,14 +437,122 @@ def Wigner_D_matrices(R, ell_min, ell_max):
                  + "Input values ell_min={0} and ell_max={1} are not valid.\n".format(ell_min, ell_max)
                  + "Try `Wigner_D_element` with an explicit array of `indices` for half-integers.")
         raise ValueError(error)
-    matrices = np.empty((LMpM_total_size(ell_min, ell_max),), dtype=complex)
-    _Wigner_D_matrices(R.a, R.b, ell_min, ell_max, matrices)
+    ell_min, ell_max = int(round(ell_min)), int(round(ell_max))
+    if ell_max > direct_ell_max:
+        return Wigner_D_matrices_recursive(R, ell_min, ell_max, out=out)
+    R = np.asarray(R, dtype=np.quaternion)
+    matrices = _output_array(out, R.shape + (LMpM_total_size(ell_min, ell_max),))
+    if R.ndim == 0:
+        R = R[()]
+        _Wigner_D_matrices(_Wigner_coefficients, R.a, R.b, ell_min, ell_max, matrices)
+    else:
+        _Wigner_D_matrices_grid(_Wigner_coefficients, quaternion.as_float_array(R).reshape((-1, 4)), ell_min, ell_max,
+                                matrices.reshape((-1, matrices.shape[-1])))
     return matrices
 
 
-@njit('void(complex128, complex128, int64, int64, complex128[:])',
-      locals={'Prefactor1': complex128, 'Prefactor2': complex128})
-def _Wigner_D_matrices(Ra, Rb, ell_min, ell_max, matrices):
+def _output_array(out, shape):
+    """Return `out` after checking that it can hold the output, or a new array if it is None"""
+    if out is None:
+        return np.empty(shape, dtype=complex)
+    if not isinstance(out, np.ndarray) or out.shape != shape or out.dtype != complex or not out.flags.c_contiguous:
+        raise ValueError("Output array must be a C-contiguous complex array of shape {0}".format(shape))
+    return out
+
+
+def Wigner_D_matrices_recursive(R, ell_min, ell_max, out=None, pooled=False):
+    """Return linear array of Wigner D matrix elements for range of integer ell values, by recursion
+
+    This function returns the same values as `Wigner_D_matrices`, but rather than evaluating the sum
+    for each element directly, it uses the recursion for Wigner's d matrices implemented in
+    `WignerD.WignerDRecursion.HCalculator`, and then multiplies by the phases depending on the other
+    two Euler angles.  The recursion is stable and does not depend on the precomputed coefficient
+    tables, so there is no upper limit on `ell_max`.  It also accepts arrays of rotors, in which
+    case the result has the shape of the input array, with an extra dimension appended.
+
+    Parameters
+    ----------
+    R : quaternion or array of quaternions
+        The rotor(s) for the D matrices.  Note that, for speed, these are assumed to be normalized.
+    ell_min : int
+        Lowest ell value included in array
+    ell_max : int
+        Highest ell value included in array
+    out : numpy.ndarray, optional
+        C-contiguous complex array of shape `R.shape + (LMpM_total_size(ell_min, ell_max),)` into
+        which the result will be placed.
+    pooled : bool, optional
+        If True, the workspace for the recursion is taken from the calling thread's pool (see
+        `HCalculator.workspace`), so that repeated calls in that thread do not reallocate it.
+        Defaults to False, in which case each call allocates its own workspace.
+
+    Returns
+    -------
+    numpy.ndarray
+        Array of all matrix elements, with shape `R.shape + (LMpM_total_size(ell_min, ell_max),)`.
+        The last axis is in the standard order described in `Wigner_D_matrices`.  If `out` was
+        passed, it is returned.
+
+    """
+    from .WignerDRecursion import HCalculator
+    ell_min, ell_max = int(round(ell_min)), int(round(ell_max))
+    R = np.asarray(R, dtype=np.quaternion)
+    Rs = quaternion.as_float_array(R).reshape((-1, 4))
+    matrices = _output_array(out, R.shape + (LMpM_total_size(ell_min, ell_max),))
+    matrices_flat = matrices.reshape((-1, matrices.shape[-1]))
+    ra2 = Rs[:, 0]**2 + Rs[:, 3]**2
+    rb2 = Rs[:, 1]**2 + Rs[:, 2]**2
+    cosβ = np.clip((ra2 - rb2) / (ra2 + rb2), -1.0, 1.0)
+    hcalc = HCalculator(ell_max)
+    chunk_size = max(1, _recursion_chunk_bytes // (8 * LMpM_total_size(0, ell_max+1)))
+    for i in range(0, Rs.shape[0], chunk_size):
+        cosβ_chunk = cosβ[i:i+chunk_size]
+        Hnmpm = hcalc(cosβ_chunk, workspace=hcalc.workspace(cosβ_chunk, pooled=pooled))
+        _Wigner_D_matrices_from_H(Hnmpm, ell_min, ell_max, Rs[i:i+chunk_size], matrices_flat[i:i+chunk_size])
+    return matrices
+
+
+@njit
+def _Wigner_D_matrices_from_H(Hnmpm, ell_min, ell_max, Rs, matrices):
+    """Main work function for `Wigner_D_matrices_recursive`
+
+    This applies the phases to the output of the d-matrix recursion, using
+
+        D^{ell}_{mp,m}(R) = ϵ(mp) ϵ(-m) exp(1j*((mp+m)*phia + (m-mp)*phib)) H^{mp,m}_{ell}(β)
+
+    where phia and phib are the arguments of the components `a` and `b` of the rotor, and
+    ϵ(k) = (-1)**k for k>=0 and 1 otherwise.
+
+    Input arguments
+    ===============
+    _Wigner_D_matrices_from_H(Hnmpm, ell_min, ell_max, Rs, matrices)
+
+      * Hnmpm is the output of `HCalculator.__call__` for the values of cosβ corresponding to `Rs`
+      * ell_min, ell_max are the limits of the matrices
+      * Rs is a two-dimensional array of the rotor components, with the 0 index iterating over
+        rotor, and the 1 index iterating over component
+      * matrices is a two-dimensional array of complex numbers to be filled with the elements of
+        the matrices for each rotor; the correct shape is assumed
+
+    """
+    i0 = LMpM_index(ell_min, -ell_min, -ell_min, 0)
+    for j in xrange(Rs.shape[0]):
+        phia = math.atan2(Rs[j, 3], Rs[j, 0])
+        phib = math.atan2(Rs[j, 1], Rs[j, 2])
+        for ell in xrange(ell_min, ell_max + 1):
+            for mp in xrange(-ell, ell + 1):
+                sign_mp = (-1)**mp if mp >= 0 else 1
+                for m in xrange(-ell, ell + 1):
+                    sign_m = (-1)**m if m <= 0 else 1
+                    i = LMpM_index(ell, mp, m, 0)
+                    matrices[j, i - i0] = cmath.rect(
+                        sign_mp * sign_m * Hnmpm[i, j],
+                        (mp + m) * phia + (m - mp) * phib
+                    )
+
+
+@njit(locals={'Prefactor1': complex128, 'Prefactor2': complex128})
+def _Wigner_D_matrices(coefficients, Ra, Rb, ell_min, ell_max, matrices):
     """Main work function for `Wigner_D_matrices`
 
     This is the core function that does all the work in the
@@ -401,8 +561,10 @@ def _Wigner_D_matrices(Ra, Rb, ell_min, ell_max, matrices):
 
     Input arguments
     ===============
-    _Wigner_D_matrices(Ra, Rb, ell_min, ell_max, elements)
+    _Wigner_D_matrices(coefficients, Ra, Rb, ell_min, ell_max, elements)
 
+      * coefficients is the table of Wigner coefficients, as in
+        `spherical_functions._Wigner_coefficients`
       * Ra, Rb are the complex components of the rotor
       * ell_min, ell_max are the limits of the matrices
       * matrix is a one-dimensional array of complex numbers to be
@@ -461,7 +623,8 @@ def _Wigner_D_matrices(Ra, Rb, ell_min, ell_max, matrices):
                     # positive, which protects from overflow.  Meanwhile,
                     # underflow just goes to zero, which is fine since
                     # nothing else should be very large.
-                    d = coeff(ell, -mp, m) * rb ** (2 * ell - m - mp - 2 * rhoMin) * ra ** (m + mp + 2 * rhoMin)
+                    d = (coefficients[_Wigner_index(2 * ell, -2 * mp, 2 * m)]
+                         * rb ** (2 * ell - m - mp - 2 * rhoMin) * ra ** (m + mp + 2 * rhoMin))
                     if (d == 0.0j):
                         matrices[i_ell + i_mpm] = 0.0j
                         if (abs(m) != abs(mp)):
@@ -529,7 +692,8 @@ def _Wigner_D_matrices(Ra, Rb, ell_min, ell_max, matrices):
                     # positive, which protects from overflow.  Meanwhile,
                     # underflow just goes to zero, which is fine since
                     # nothing else should be very large.
-                    d = coeff(ell, mp, m) * ra ** (2 * ell - m + mp - 2 * rhoMin) * rb ** (m - mp + 2 * rhoMin)
+                    d = (coefficients[_Wigner_index(2 * ell, 2 * mp, 2 * m)]
+                         * ra ** (2 * ell - m + mp - 2 * rhoMin) * rb ** (m - mp + 2 * rhoMin))
                     if (d == 0.0j):
                         matrices[i_ell + i_mpm] = 0.0j
                         if (abs(m) != abs(mp)):
@@ -579,9 +743,8 @@ def _Wigner_D_matrices(Ra, Rb, ell_min, ell_max, matrices):
                                 matrices[i_ell + _linear_matrix_index(ell, -mp, -m)] = -Prefactor1.conjugate() * Sum
 
 
-@njit('void(float64[:,:], int64, int64, int64, complex128[:])',
-      locals={'Prefactor1': complex128, 'Prefactor2': complex128})
-def _Wigner_D_elements(Rs, ell, mp, m, values):
+@njit(locals={'Prefactor1': complex128, 'Prefactor2': complex128})
+def _Wigner_D_elements(coefficients, Rs, ell, mp, m, values):
     """Main work function for computing Wigner D matrix elements
 
     This is the core function that does all the work in the
@@ -590,7 +753,7 @@ def _Wigner_D_elements(Rs, ell, mp, m, values):
 
     Input arguments
     ===============
-    _Wigner_D_matrices(Rs, ell, m, mp, elements)
+    _Wigner_D_elements(coefficients, Rs, ell, mp, m, values)
 
     The `matrices` variable is needed because numba cannot create
     arrays at the moment, but this is modified in place, so after
@@ -608,7 +771,7 @@ def _Wigner_D_elements(Rs, ell, mp, m, values):
 
         rhoMin_a = max(0, mp - m)
         rhoMax_a = min(ell + mp, ell - m)
-        coefficient_a = coeff(ell, mp, m)
+        coefficient_a = coefficients[_Wigner_index(2 * ell, 2 * mp, 2 * m)]
         if (rhoMin_a % 2 != 0):
             coefficient_a *= -1
         N1_a = ell + mp + 1
@@ -616,7 +779,7 @@ def _Wigner_D_elements(Rs, ell, mp, m, values):
         M_a = m - mp
         rhoMin_b = max(0, -m - mp)
         rhoMax_b = min(ell - mp, ell - m)
-        coefficient_b = coeff(ell, -mp, m)
+        coefficient_b = coefficients[_Wigner_index(2 * ell, -2 * mp, 2 * m)]
         if ((ell + m + rhoMin_b) % 2 != 0):
             coefficient_b *= -1
         N1_b = ell - mp + 1
@@ -672,3 +835,156 @@ def _Wigner_D_elements(Rs, ell, mp, m, values):
                         Sum *= absRRatioSquared * ((N1_a - rho) * (N2_a - rho)) / (rho * (M_a + rho))
                         Sum += 1
                     values[i] = Prefactor1 * Sum
+
+
+@njit(parallel=True)
+def _Wigner_D_matrices_grid(coefficients, Rs, ell_min, ell_max, matrices):
+    """Compute Wigner D matrices for many rotors in parallel
+
+    This simply calls `_Wigner_D_matrices` for each rotor, distributing the rotors over threads.
+
+    Input arguments
+    ===============
+    _Wigner_D_matrices_grid(coefficients, Rs, ell_min, ell_max, matrices)
+
+      * coefficients is the table of Wigner coefficients, as in
+        `spherical_functions._Wigner_coefficients`
+      * Rs is a two-dimensional array of the rotor components, with the 0 index iterating over
+        rotor, and the 1 index iterating over component
+      * ell_min, ell_max are the limits of the matrices
+      * matrices is a two-dimensional array of complex numbers to be filled with the elements of
+        the matrices for each rotor; the correct shape is assumed
+
+    """
+    for i in prange(Rs.shape[0]):
+        _Wigner_D_matrices(coefficients, complex(Rs[i, 0], Rs[i, 3]), complex(Rs[i, 2], Rs[i, 1]), ell_min, ell_max,
+                           matrices[i])
+
+
+@lru_cache(maxsize=8)
+def _Delta_matrices(ell_max):
+    """Return the D matrices for a rotation by π/2 about y, for all ell up to ell_max
+
+    These matrices are real, so just the real parts are returned, as a read-only array in the
+    standard order of `Wigner_D_matrices`.  They are computed by recursion, because errors in the
+    direct sums grow too quickly with ell.  The most recently used arrays are cached.
+
+    """
+    Delta = Wigner_D_matrices_recursive(quaternion.from_rotation_vector([0.0, np.pi/2, 0.0]), 0, ell_max).real.copy()
+    Delta.flags.writeable = False
+    return Delta
+
+
+def rotate_modes(modes, ell_min, ell_max, R, out=None):
+    """Return modes of the functions rotated by each of the rotors R
+
+    The rotated function g is related to the input function f by g(R*Q) = f(Q) for all Q, so that
+    the modes of each ell are transformed by the conjugated Wigner D matrix for that ell:
+
+        g(ell, mp) = sum(conjugate(D(ell, mp, m)(R)) * f(ell, m) for m in range(-ell, ell+1))
+
+    Rather than evaluating D for each rotor, this uses the factorization (due to Risbo)
+
+        D(R) = Z(α+π/2) Δ Z(β) Δ^T Z(γ-π/2)
+
+    where (α, β, γ) are the Euler angles of R, Z(θ) is the diagonal matrix of phases exp(1j*m*θ),
+    and Δ is the real D matrix for a rotation by π/2 about y.  The Δ matrices are computed once for
+    each ell_max and cached, so that each rotor costs just two real matrix-vector products per ell,
+    and a few phases.  This is the fastest way to rotate one set of modes by many rotors, or a
+    series of modes by one rotor each.  The rotors are processed in parallel.
+
+    Parameters
+    ----------
+    modes : complex array
+        Mode weights in the standard order, along the last axis:
+            [f(ell, m) for ell in range(ell_min, ell_max+1) for m in range(-ell, ell+1)]
+    ell_min : int
+        Smallest ell value in `modes`
+    ell_max : int
+        Largest ell value in `modes`
+    R : quaternion or array of quaternions
+        Rotors, which must broadcast against the leading (non-mode) axes of `modes`.  They are
+        assumed to be normalized.
+    out : numpy.ndarray, optional
+        C-contiguous complex array of the output shape, into which the result will be placed.
+
+    Returns
+    -------
+    numpy.ndarray
+        Rotated modes, of shape `np.broadcast(modes[..., 0], R).shape + modes.shape[-1:]`.  If `out`
+        was passed, it is returned.
+
+    """
+    ell_min, ell_max = int(ell_min), int(ell_max)
+    modes = np.asarray(modes)
+    R = np.asarray(R, dtype=np.quaternion)
+    if modes.shape[-1] != LM_total_size(ell_min, ell_max):
+        raise ValueError("Input modes have size {0} along the last axis, but should have size {1} for "
+                         "ell_min={2} and ell_max={3}".format(modes.shape[-1], LM_total_size(ell_min, ell_max),
+                                                              ell_min, ell_max))
+    shape = np.broadcast(modes[..., 0], R).shape
+    rotated = _output_array(out, shape + modes.shape[-1:])
+    Rs = quaternion.as_float_array(np.broadcast_to(R, shape)).reshape((-1, 4))
+    _rotate_modes_factored(_Delta_matrices(ell_max), ell_min, ell_max, Rs,
+                           np.broadcast_to(modes, shape + modes.shape[-1:]).reshape((-1, modes.shape[-1])),
+                           rotated.reshape((-1, modes.shape[-1])), min(Rs.shape[0], 4 * get_num_threads()))
+    return rotated
+
+
+@njit(parallel=True)
+def _rotate_modes_factored(Delta, ell_min, ell_max, Rs, modes, rotated, n_chunks):
+    """Main work function for `rotate_modes`
+
+    Input arguments
+    ===============
+    _rotate_modes_factored(Delta, ell_min, ell_max, Rs, modes, rotated, n_chunks)
+
+      * Delta is the output of `_Delta_matrices(ell_max)`
+      * ell_min, ell_max are the limits of the modes
+      * Rs is a two-dimensional array of the rotor components, with the 0 index iterating over
+        rotor, and the 1 index iterating over component
+      * modes is a two-dimensional array of mode weights, with one row for each rotor
+      * rotated is a two-dimensional array of the same shape as `modes`, to be filled with the
+        rotated mode weights
+      * n_chunks is the number of contiguous blocks of rotors to be processed in parallel, each
+        with its own workspaces
+
+    """
+    N = Rs.shape[0]
+    for chunk in prange(n_chunks):
+        phases_α = np.empty((2*ell_max+1,), dtype=np.complex128)
+        phases_β = np.empty((2*ell_max+1,), dtype=np.complex128)
+        phases_γ = np.empty((2*ell_max+1,), dtype=np.complex128)
+        u = np.empty((2*ell_max+1,), dtype=np.complex128)
+        v = np.empty((2*ell_max+1,), dtype=np.complex128)
+        for j in range((chunk * N) // n_chunks, ((chunk + 1) * N) // n_chunks):
+            # Euler angles of R = exp(α*z/2) * exp(β*y/2) * exp(γ*z/2), with the π/2 offsets
+            Ra = complex(Rs[j, 0], Rs[j, 3])
+            Rb = complex(Rs[j, 2], Rs[j, 1])
+            phia = math.atan2(Ra.imag, Ra.real)
+            phib = math.atan2(Rb.imag, Rb.real)
+            α = phia - phib + np.pi/2
+            β = 2 * math.atan2(abs(Rb), abs(Ra))
+            γ = phia + phib - np.pi/2
+            for m in range(-ell_max, ell_max+1):
+                phases_α[m+ell_max] = cmath.rect(1.0, -m * α)
+                phases_β[m+ell_max] = cmath.rect(1.0, -m * β)
+                phases_γ[m+ell_max] = cmath.rect(1.0, -m * γ)
+            for ell in range(ell_min, ell_max+1):
+                i0 = LM_index(ell, -ell, ell_min)
+                i_D = LMpM_index(ell, -ell, -ell, 0)
+                n = 2*ell+1
+                for m in range(n):
+                    u[m] = phases_γ[ell_max-ell+m] * modes[j, i0+m]
+                    v[m] = 0.0
+                # v = Δ^T u, accumulated row by row so that Δ is read contiguously
+                for m in range(n):
+                    for k in range(n):
+                        v[k] += Delta[i_D+m*n+k] * u[m]
+                for k in range(n):
+                    v[k] *= phases_β[ell_max-ell+k]
+                for mp in range(n):
+                    value = 0.0j
+                    for k in range(n):
+                        value += Delta[i_D+mp*n+k] * v[k]
+                    rotated[j, i0+mp] = phases_α[ell_max-ell+mp] * value
@@ -18,12 +18,20 @@ __all__ = ['Wigner3j', 'Wigner_D_element', 'Wigner_D_matrices', 'SWSH', 'SWSH_gr
 
 import numpy as np
 from math import factorial
-import os.path
 
-from quaternion.numba_wrapper import njit, xrange
+from quaternion.numba_wrapper import xrange
+from ._jit import njit
+from . import _coefficient_tables
+from ._coefficient_tables import table as coefficient_table
 
 # Module constants
-ell_max = 32  # More than 29, and you get roundoff building quickly
+#   The coefficient tables loaded at import cover ell <= ell_max, which is all that the direct sums
+#   for D matrices and SWSHs need.  The coefficient functions below load larger tables when they are
+#   asked for larger values, generating and caching them on first request; see `coefficient_table`.
+ell_max = _coefficient_tables.shipped_ell_max
+#   The direct sums for D matrices and SWSHs lose accuracy beyond this, so larger values of ell are
+#   always evaluated by the recursive methods instead
+direct_ell_max = 32  # More than 29, and you get roundoff building quickly
 epsilon = 1.e-15
 error_on_bad_indices = True
 
@@ -31,50 +39,48 @@ error_on_bad_indices = True
 #   binomial_coefficients.npy
 #   ladder_operator_coefficients.npy
 #   Wigner_coefficients.npy
-# were originally produced with the code in `_generate_coefficients.py`.
+# were originally produced with the code in `_generate_coefficients.py`.  Larger tables are
+# produced by `_coefficient_tables`.
 
 
 # Factorial
 factorials = np.array([float(factorial(i)) for i in range(171)])
 
 
-@njit('f8(i8)')
+@njit
 def factorial(i):
     return factorials[i]
 
 
 # Binomial coefficients
-_binomial_coefficients = np.load(os.path.join(os.path.dirname(__file__), 'binomial_coefficients.npy'))
+_binomial_coefficients = coefficient_table('binomial_coefficients', ell_max)
 
-@njit('f8(i8,i8)')
 def binomial_coefficient(n, k):
-    return _binomial_coefficients[(n * (n + 1)) // 2 + k]
+    return coefficient_table('binomial_coefficients', (n + 1) // 2)[(n * (n + 1)) // 2 + k]
 
 
 # Ladder-operator coefficients
-_ladder_operator_coefficients = np.load(os.path.join(os.path.dirname(__file__), 'ladder_operator_coefficients.npy'))
+_ladder_operator_coefficients = coefficient_table('ladder_operator_coefficients', ell_max)
 
-@njit('f8(i8,i8)')
 def _ladder_operator_coefficient(twoell, twom):
-    return _ladder_operator_coefficients[((twoell + 2) * twoell + twom) // 2]
+    return coefficient_table('ladder_operator_coefficients', (twoell + 1) // 2)[((twoell + 2) * twoell + twom) // 2]
 
-@njit('f8(f8,f8)')
 def ladder_operator_coefficient(ell, m):
     return _ladder_operator_coefficient(round(2*ell), round(2*m))
 
 
-# Coefficients used in constructing the Wigner D matrices
-_Wigner_coefficients = np.load(os.path.join(os.path.dirname(__file__), 'Wigner_coefficients.npy'))
+# Coefficients used in constructing the Wigner D matrices.  The compiled D-matrix and SWSH functions
+# take this table as an argument, because numba would otherwise freeze a copy of the global array
+# into their compiled code, rather than sharing the memory-mapped pages.
+_Wigner_coefficients = coefficient_table('Wigner_coefficients', ell_max)
 
-@njit('i8(i8,i8,i8)')
+@njit
 def _Wigner_index(twoell, twomp, twom):
     return twoell*((2*twoell + 3)*twoell + 1) // 6 + (twoell + twomp)//2 * (twoell + 1) + (twoell + twom)//2
 
-@njit('f8(i8,i8,i8)')
 def _Wigner_coefficient(twoell, twomp, twom):
-    return _Wigner_coefficients[_Wigner_index(twoell, twomp, twom)]
+    return coefficient_table('Wigner_coefficients', (twoell + 1) // 2)[_Wigner_index(twoell, twomp, twom)]
 
-@njit('f8(f8,f8,f8)')
 def Wigner_coefficient(ell, mp, m):
     return _Wigner_coefficient(round(2*ell), round(2*mp), round(2*m))
 
@@ -100,7 +106,7 @@ def LM_range(ell_min, ell_max):
     return LM
 
 
-@njit('void(i8,i8,i8[:,:])')
+@njit
 def _LM_range(ell_min, ell_max, LM):
     i = 0
     for ell in xrange(ell_min, ell_max + 1):
@@ -110,7 +116,7 @@ def _LM_range(ell_min, ell_max, LM):
             i += 1
 
 
-@njit('i8(i8,i8,i8)')
+@njit
 def LM_index(ell, m, ell_min):
     """Array index for given (ell,m) mode
 
@@ -133,7 +139,7 @@ def LM_index(ell, m, ell_min):
     return ell * (ell + 1) - ell_min ** 2 + m
 
 
-@njit('i8(i8,i8)')
+@njit
 def LM_total_size(ell_min, ell_max):
     """Total array size of (ell,m) components
 
@@ -188,7 +194,7 @@ def LMpM_range(ell_min, ell_max):
     _LMpM_range(ell_min, ell_max, LMpM)
     return LMpM
 
-@njit('void(i8,i8,i8[:,:])')
+@njit
 def _LMpM_range(ell_min, ell_max, LMpM):
     i = 0
     for ell in xrange(ell_min, ell_max + 1):
@@ -222,7 +228,7 @@ def LMpM_range_half_integer(ell_min, ell_max):
     _LMpM_range_half_integer(round(2*ell_min), round(2*ell_max), LMpM)
     return LMpM
 
-@njit('void(i8,i8,f8[:,:])')
+@njit
 def _LMpM_range_half_integer(twoell_min, twoell_max, LMpM):
     i = 0
     for twoell in xrange(twoell_min, twoell_max + 1):
@@ -234,7 +240,7 @@ def _LMpM_range_half_integer(twoell_min, twoell_max, LMpM):
                 i += 1
 
 
-@njit('i8(i8,i8,i8,i8)')
+@njit
 def LMpM_index(ell, mp, m, ell_min):
     """Array index for given (ell,mp,m) mode
 
@@ -260,7 +266,7 @@ def LMpM_index(ell, mp, m, ell_min):
     return (((4 * ell + 6) * ell + 6 * mp + 5) * ell + ell_min * (1 - 4 * ell_min ** 2) + 3 * (m + mp)) // 3
 
 
-@njit('i8(i8, i8)')
+@njit
 def LMpM_total_size(ell_min, ell_max):
     """Total array size of Wigner D matrix
 
@@ -308,13 +314,15 @@ def theta_phi(n_theta, n_phi):
                      for theta in np.linspace(0.0, np.pi, num=n_theta, endpoint=True)])
 
 
-from .Wigner3j import Wigner3j, clebsch_gordan
+from .Wigner3j import (Wigner3j, Wigner3j_j3, clebsch_gordan, Wigner3jTable,
+                       Wigner3j_vectorized, clebsch_gordan_vectorized)
 from .WignerD import (Wigner_D_element, _Wigner_D_element,
-                      Wigner_D_matrices, _Wigner_D_matrices,
+                      Wigner_D_matrices, _Wigner_D_matrices, _Wigner_D_matrices_grid,
+                      Wigner_D_matrices_recursive, _Wigner_D_matrices_from_H, rotate_modes,
                       _linear_matrix_index, _linear_matrix_diagonal_index,
                       _linear_matrix_offset, _total_size_D_matrices)
-from .SWSH import SWSH, SWSH_grid, _SWSH  # sYlm, Ylm
-from .SWSH_modes import Modes
+from .SWSH import SWSH, SWSH_grid, SWSH_grid_recursive, SWSH_theta_phi_grid, _SWSH, _SWSH_grid  # sYlm, Ylm
+from .SWSH_modes import Modes, ModesOperator
 from .SWSH_grids import Grid
 from .mode_conversions import (constant_as_ell_0_mode, constant_from_ell_0_mode,
                                vector_as_ell_1_modes, vector_from_ell_1_modes,
@@ -0,0 +1,155 @@
+# Copyright (c) 2020, Michael Boyle
+# See LICENSE file for details: <https://github.com/moble/spherical_functions/blob/master/LICENSE>
+
+"""Generate, cache, and load the tables of coefficients used throughout this package
+
+The tables for ell_max<=32 are shipped with the package as `.npy` files (originally produced with
+the code in `_generate_coefficients.py`, using mpmath).  Larger tables are generated on demand in
+double precision, and stored in a cache directory so that later processes can simply map them into
+memory.  The cache directory is `$SPHERICAL_FUNCTIONS_CACHE_DIR` if that is set, and otherwise
+`spherical_functions` inside `$XDG_CACHE_HOME` (defaulting to `~/.cache`).
+
+To avoid overflow and roundoff, the binomial coefficients are built by Pascal's rule, and the
+Wigner coefficients are expressed as products and ratios of binomial coefficients, rather than by
+evaluating factorials.  Each element is then accurate to a few parts in 10^16, up to the point
+where the binomial coefficients overflow (ell_max of roughly 500).
+
+"""
+
+import os
+import numpy as np
+
+# Largest ell value for which the tables are shipped with this package
+shipped_ell_max = 32
+
+_package_directory = os.path.dirname(__file__)
+
+
+def cache_directory():
+    """Return the directory in which generated coefficient tables are stored"""
+    directory = os.environ.get('SPHERICAL_FUNCTIONS_CACHE_DIR', None)
+    if directory is None:
+        directory = os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')),
+                                 'spherical_functions')
+    return directory
+
+
+def binomial_coefficients(ell_max):
+    """Return array of binomial coefficients C(n, k) for n in range(2*ell_max+1), k in range(n+1)"""
+    n_max = 2 * ell_max
+    coefficients = np.empty((((n_max + 1) * (n_max + 2)) // 2,), dtype=float)
+    row = np.ones((1,), dtype=float)
+    coefficients[0] = 1.0
+    for n in range(1, n_max + 1):
+        row = np.concatenate(([1.0], row[:-1] + row[1:], [1.0]))
+        coefficients[(n * (n + 1)) // 2:((n + 1) * (n + 2)) // 2] = row
+    return coefficients
+
+
+def ladder_operator_coefficients(ell_max):
+    """Return array of sqrt(ell*(ell+1)-m*(m+1)) for twoell in range(2*ell_max+1), twom in range(-twoell, twoell+1, 2)"""
+    twoell = np.repeat(np.arange(2 * ell_max + 1), np.arange(2 * ell_max + 1) + 1)
+    twom = 2 * (np.arange(twoell.size) - (twoell * (twoell + 1)) // 2) - twoell
+    return np.sqrt((twoell * (twoell + 2) - twom * (twom + 2)) / 4)
+
+
+def Wigner_coefficients(ell_max):
+    """Return array of coefficients used by the Wigner D matrices and SWSHs
+
+    The elements are ordered as
+
+        [coefficient(twoell, twomp, twom) for twoell in range(2*ell_max+1)
+                                          for twomp in range(-twoell, twoell+1, 2)
+                                          for twom in range(-twoell, twoell+1, 2)]
+
+    where, for ell=twoell/2, etc., and rho_min=max(0, mp-m),
+
+        coefficient = sqrt((ell+m)! (ell-m)! / ((ell+mp)! (ell-mp)!))
+                      * binomial(ell+mp, rho_min) * binomial(ell-mp, ell-m-rho_min)
+
+    The factorial ratio is evaluated as sqrt(binomial(twoell, ell+mp) / binomial(twoell, ell+m)).
+
+    """
+    binomials = binomial_coefficients(ell_max)
+
+    def binomial(n, k):
+        return binomials[(n * (n + 1)) // 2 + k]
+
+    coefficients = np.empty(((8 * ell_max ** 3 + 18 * ell_max ** 2 + 13 * ell_max + 3) // 3,), dtype=float)
+    i = 0
+    for twoell in range(2 * ell_max + 1):
+        # Integer values of ell+mp and ell+m; note that ell-mp = twoell - (ell+mp), etc.
+        ellpmp = np.arange(twoell + 1)[:, np.newaxis]
+        ellpm = np.arange(twoell + 1)[np.newaxis, :]
+        rho_min = np.maximum(0, ellpmp - ellpm)
+        with np.errstate(over='ignore', invalid='ignore'):
+            block = (np.sqrt(binomial(twoell, ellpmp) / binomial(twoell, ellpm))
+                     * binomial(ellpmp, rho_min) * binomial(twoell - ellpmp, twoell - ellpm - rho_min))
+        coefficients[i:i + block.size] = block.ravel()
+        i += block.size
+    return coefficients
+
+
+_generators = {
+    'binomial_coefficients': binomial_coefficients,
+    'ladder_operator_coefficients': ladder_operator_coefficients,
+    'Wigner_coefficients': Wigner_coefficients,
+}
+
+_tables = {}  # Largest table loaded by `table`, as (ell_max, table), for each name
+
+
+def load(name, ell_max):
+    """Return the named coefficient table, covering at least the given ell_max
+
+    For ell_max <= `shipped_ell_max`, the table shipped with this package is returned.  Otherwise,
+    the table is loaded from the cache directory, being generated and saved first if necessary.  In
+    either case, the table is a read-only memory map, so that loading is nearly free, and the pages
+    are shared between processes.  If the cache directory cannot be written, the generated table is
+    returned directly.
+
+    """
+    if ell_max <= shipped_ell_max:
+        return np.load(os.path.join(_package_directory, name + '.npy'), mmap_mode='r')
+    return load_cached('{0}_{1}.npy'.format(name, ell_max), _generators[name], ell_max)
+
+
+def table(name, ell_max):
+    """Return the named coefficient table, covering at least the given ell_max
+
+    This is like `load`, except that the largest table loaded so far in this process is kept, and
+    returned for any smaller ell_max; the tables are ordered by ell, so each extends the smaller
+    ones.  A larger table is only loaded (or generated) when a larger ell_max is first requested.
+
+    """
+    loaded = _tables.get(name, None)
+    if loaded is None or loaded[0] < ell_max:
+        loaded_ell_max = max(ell_max, shipped_ell_max)
+        loaded = _tables[name] = (loaded_ell_max, load(name, loaded_ell_max))
+    return loaded[1]
+
+
+def load_cached(filename, generator, *args):
+    """Return the table stored as `filename` in the cache directory, generating it if necessary
+
+    If the file cannot be read, the table is produced by calling `generator(*args)`, and saved to
+    the cache directory for later use.  The returned table is a read-only memory map, unless the
+    cache directory cannot be written, in which case the generated table is returned directly.
+
+    """
+    path = os.path.join(cache_directory(), filename)
+    try:
+        return np.load(path, mmap_mode='r')
+    except (OSError, ValueError):
+        pass
+    table = generator(*args)
+    if not np.all(np.isfinite(table)):
+        raise ValueError("Coefficients for {0} overflow; try a smaller value".format(filename))
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = '{0}.{1}.tmp.npy'.format(path[:-4], os.getpid())
+        np.save(temp_path, table)
+        os.replace(temp_path, path)
+        return np.load(path, mmap_mode='r')
+    except OSError:
+        return table
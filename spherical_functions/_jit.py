@@ -0,0 +1,61 @@
+# Copyright (c) 2020, Michael Boyle
+# See LICENSE file for details: <https://github.com/moble/spherical_functions/blob/master/LICENSE>
+
+"""Decorators used to compile the functions in this package with numba
+
+These are just numba's `njit` and `jit`, except that compiled code can optionally be cached on disk,
+so that new processes need not compile the same functions again.  This is turned on by setting the
+environment variable `SPHERICAL_FUNCTIONS_NUMBA_CACHE=1` before importing this package.  The cache
+is managed entirely by numba: it is stored in `$NUMBA_CACHE_DIR` if that is set (before numba is
+imported), and otherwise in `__pycache__` directories inside this package, or in numba's own
+user-wide cache directory if those cannot be written.
+
+Numba checks the source file of each cached function for changes, but cannot tell when functions it
+calls or global arrays it uses have changed.  Installing a new version of this package replaces the
+source files, which invalidates the cache, but after editing the source in place, the cache should
+be deleted.  Run `python -m spherical_functions.precompile` to fill the cache with the most
+commonly used functions.
+
+"""
+
+import os
+from quaternion.numba_wrapper import njit as _njit, jit as _jit, GOT_NUMBA
+
+cache_compiled_functions = (
+    GOT_NUMBA and os.environ.get('SPHERICAL_FUNCTIONS_NUMBA_CACHE', '0').lower() not in ['', '0', 'false', 'no']
+)
+
+_package_directory = os.path.dirname(os.path.abspath(__file__))
+
+
+def numba_cache_directory():
+    """Return the directory under which numba caches compiled functions from this package
+
+    This is `$NUMBA_CACHE_DIR` if that is set, and otherwise this package's own directory, under
+    which numba uses the `__pycache__` subdirectories.
+
+    """
+    return os.environ.get('NUMBA_CACHE_DIR', '') or _package_directory
+
+
+def njit(*args, **kwargs):
+    """Compile function with `numba.njit`, caching the result if requested; see module docstring"""
+    if cache_compiled_functions:
+        kwargs.setdefault('cache', True)
+    return _njit(*args, **kwargs)
+
+
+def jit(*args, **kwargs):
+    """Compile function with `numba.jit`, caching the result if requested; see module docstring"""
+    if cache_compiled_functions:
+        kwargs.setdefault('cache', True)
+    return _jit(*args, **kwargs)
+
+
+def vectorize(*args, **kwargs):
+    """Create ufunc with `numba.vectorize`, caching the result if requested; see module docstring"""
+    from numba import vectorize as _vectorize
+    if cache_compiled_functions:
+        kwargs.setdefault('cache', True)
+    return _vectorize(*args, **kwargs)
+
@@ -5,7 +5,8 @@ from __future__ import print_function, division, absolute_import
 
 from math import sqrt, pi
 import numpy as np
-from quaternion.numba_wrapper import jit, xrange
+from quaternion.numba_wrapper import xrange
+from ._jit import jit
 from . import LM_total_size
 
 
@@ -1,33 +1,262 @@
 import math
+import collections
+import threading
 import numpy as np
-from . import LM_total_size, Wigner3j, LM_index
-from quaternion.numba_wrapper import jit, njit, xrange
+from . import LM_total_size, LM_index
+from .Wigner3j import Wigner3j_j3
+from quaternion.numba_wrapper import xrange
+from numba import prange, get_num_threads
+from ._jit import jit, njit
+
+
+# Largest number of nonzero elements in a coupling tensor (16 bytes each) that will be built and
+# cached; larger products are computed directly by `_multiplication_kernel`.  The cache keeps at most
+# `coupling_tensor_cache_size` tensors, using at most `coupling_tensor_cache_bytes` bytes in total,
+# discarding the least recently used first.  So, by default, the cache never holds more than 256 MB,
+# which is also the size of the largest single tensor.  Call `clear_coupling_tensor_cache` to release
+# that memory.
+coupling_tensor_max_size = 2**24
+coupling_tensor_cache_size = 8
+coupling_tensor_cache_bytes = 2**28
+_coupling_tensor_cache = collections.OrderedDict()
+_coupling_tensor_cache_lock = threading.Lock()
+
+# Approximate costs used to choose between multiplication methods: seconds per element of the
+# coupling tensor per function, and per grid point per function, along with the per-call overheads
+# of each method (measured in units of functions)
+_modes_cost, _modes_overhead = 1.4e-9, 4
+_grid_cost, _grid_overhead = 1.6e-7, 2
+
+
+def multiplication_method(ellmax_f, ellmax_g, n_functions=1):
+    """Return the faster method ('modes' or 'grid') for multiplying functions with these ell_max values
+
+    The 'modes' method contracts the mode weights directly with the coupling tensor, which has
+    roughly ellmax_f**2 * ellmax_g**2 * min(ellmax_f, ellmax_g) elements.  The 'grid' method
+    evaluates both functions on an equiangular grid fine enough to avoid aliasing, multiplies
+    pointwise, and transforms back, which costs roughly (ellmax_f + ellmax_g)**2 per function
+    (with some logarithmic factors), but requires `spinsfast`.  Typically, the 'modes' method is
+    faster when both ell_max values are below about 10, while the 'grid' method is faster above.
+    The crossover rises a little as `n_functions` (the number of functions being multiplied at
+    once) grows.  The costs are only rough estimates, so the choice may be less than optimal near
+    the crossover.
+
+    This choice is only made when multiplication is requested with `method='auto'`; by default,
+    the exact 'modes' method is always used.
+
+    """
+    try:
+        import spinsfast
+    except ImportError:
+        return 'modes'
+    n_modes = (ellmax_f+1)**2 * (ellmax_g+1)**2 * (min(ellmax_f, ellmax_g)+1)
+    n_grid = (2*(ellmax_f + ellmax_g) + 1) ** 2
+    modes_time = _modes_cost * n_modes * (n_functions + _modes_overhead)
+    grid_time = _grid_cost * n_grid * (n_functions + _grid_overhead)
+    return 'grid' if grid_time < modes_time else 'modes'
 
 
-@njit()
 def _multiplication_helper(f, ellmin_f, ellmax_f, s_f,
                            g, ellmin_g, ellmax_g, s_g,
-                           fg, ellmin_fg, ellmax_fg, s_fg):
+                           fg, ellmin_fg, ellmax_fg, s_fg, method='modes'):
     # NOTE: This works in-place on fg, and returns fg for good measure
+    if method == 'auto':
+        method = multiplication_method(ellmax_f, ellmax_g, int(np.prod(fg.shape[:-1])))
+    if method == 'grid':
+        return _multiplication_helper_grid(f, ellmin_f, ellmax_f, s_f,
+                                           g, ellmin_g, ellmax_g, s_g,
+                                           fg, ellmin_fg, ellmax_fg, s_fg)
+    elif method != 'modes':
+        raise ValueError("Unknown multiplication method '{0}'; use 'modes', 'grid', or 'auto'".format(method))
+    # Flatten the leading (broadcast) axes, and put them last, so that the innermost loops of the
+    # kernels run over contiguous memory
+    shape = fg.shape[:-1]
+    f_T = np.ascontiguousarray(np.broadcast_to(f, shape + f.shape[-1:]).reshape((-1, f.shape[-1])).T)
+    g_T = np.ascontiguousarray(np.broadcast_to(g, shape + g.shape[-1:]).reshape((-1, g.shape[-1])).T)
+    fg_T = np.ascontiguousarray(fg.reshape((-1, fg.shape[-1])).T)
+    tensor = _coupling_tensor(ellmin_f, ellmax_f, s_f, ellmin_g, ellmax_g, s_g, ellmin_fg, ellmax_fg, s_fg)
+    if tensor is None:
+        n_chunks = min(fg_T.shape[1], 4 * get_num_threads())
+        _multiplication_kernel(f_T, ellmin_f, ellmax_f, s_f,
+                               g_T, ellmin_g, ellmax_g, s_g,
+                               fg_T, ellmin_fg, ellmax_fg, s_fg, n_chunks)
+    else:
+        _coupling_contraction(*tensor, f_T, g_T, fg_T)
+    fg[...] = fg_T.T.reshape(fg.shape)
+    return fg
+
+
+def _multiplication_helper_grid(f, ellmin_f, ellmax_f, s_f,
+                                g, ellmin_g, ellmax_g, s_g,
+                                fg, ellmin_fg, ellmax_fg, s_fg):
+    # NOTE: This works in-place on fg, and returns fg for good measure
+    import spinsfast
+    # This is the smallest grid that can represent the product without aliasing
+    n = 2*max(ellmax_f + ellmax_g, ellmax_fg) + 1
+    if ellmin_f > 0:
+        f = np.concatenate((np.zeros(f.shape[:-1] + (LM_total_size(0, ellmin_f-1),), dtype=f.dtype), f), axis=-1)
+    if ellmin_g > 0:
+        g = np.concatenate((np.zeros(g.shape[:-1] + (LM_total_size(0, ellmin_g-1),), dtype=g.dtype), g), axis=-1)
+    f_grid = spinsfast.salm2map(np.ascontiguousarray(f, dtype=complex), s_f, ellmax_f, n, n)
+    g_grid = spinsfast.salm2map(np.ascontiguousarray(g, dtype=complex), s_g, ellmax_g, n, n)
+    fg_modes = spinsfast.map2salm(f_grid * g_grid, s_fg, ellmax_fg)
+    # spinsfast leaves garbage in the modes with ell<|s|
+    fg_modes[..., :LM_total_size(0, abs(s_fg)-1)] = 0.0
+    fg += fg_modes[..., LM_total_size(0, ellmin_fg-1):]
+    return fg
+
+
+def clear_coupling_tensor_cache():
+    """Discard all cached coupling tensors used by the 'modes' multiplication method"""
+    with _coupling_tensor_cache_lock:
+        _coupling_tensor_cache.clear()
+
+
+def _coupling_tensor(*key):
+    """Return sparse tensor coupling the modes of f and g to those of f*g
+
+    The arguments are (ellmin_f, ellmax_f, s_f, ellmin_g, ellmax_g, s_g, ellmin_fg, ellmax_fg, s_fg).
+    The tensor is returned as a tuple of read-only arrays (indptr, index_f, index_g, coefficients),
+    in the manner of a CSR matrix with one row for each mode of f*g, so that
+
+        fg[k] = sum(coefficients[p] * f[index_f[p]] * g[index_g[p]] for p in range(indptr[k], indptr[k+1]))
+
+    If the tensor would have more than `coupling_tensor_max_size` elements, None is returned
+    instead.  The most recently used results are cached, within the limits described next to
+    `coupling_tensor_max_size`.
+
+    """
+    with _coupling_tensor_cache_lock:
+        if key in _coupling_tensor_cache:
+            _coupling_tensor_cache.move_to_end(key)
+            return _coupling_tensor_cache[key]
+    tensor = _build_coupling_tensor(*key)
+    with _coupling_tensor_cache_lock:
+        _coupling_tensor_cache[key] = tensor
+        nbytes = sum(_coupling_tensor_nbytes(cached) for cached in _coupling_tensor_cache.values())
+        while len(_coupling_tensor_cache) > 1 and (len(_coupling_tensor_cache) > coupling_tensor_cache_size
+                                                   or nbytes > coupling_tensor_cache_bytes):
+            nbytes -= _coupling_tensor_nbytes(_coupling_tensor_cache.popitem(last=False)[1])
+    return tensor
+
+
+def _coupling_tensor_nbytes(tensor):
+    return 0 if tensor is None else sum(array.nbytes for array in tensor)
+
+
+def _build_coupling_tensor(ellmin_f, ellmax_f, s_f, ellmin_g, ellmax_g, s_g, ellmin_fg, ellmax_fg, s_fg):
+    """Compute the tensor returned by `_coupling_tensor`, without caching"""
+    W3j_s = np.empty((2*min(ellmax_f, ellmax_g)+1,), dtype=float)
+    W3j_m = np.empty((2*min(ellmax_f, ellmax_g)+1,), dtype=float)
+    indptr = np.zeros((LM_total_size(ellmin_fg, ellmax_fg)+1,), dtype=np.int64)
+    empty_index = np.empty((0,), dtype=np.int32)
+    _coupling_tensor_elements(ellmin_f, ellmax_f, s_f, ellmin_g, ellmax_g, s_g, ellmin_fg, ellmax_fg, s_fg,
+                              W3j_s, W3j_m, indptr, empty_index, empty_index, np.empty((0,), dtype=float), False)
+    np.cumsum(indptr, out=indptr)
+    if indptr[-1] > coupling_tensor_max_size:
+        return None
+    index_f = np.empty((indptr[-1],), dtype=np.int32)
+    index_g = np.empty((indptr[-1],), dtype=np.int32)
+    coefficients = np.empty((indptr[-1],), dtype=float)
+    _coupling_tensor_elements(ellmin_f, ellmax_f, s_f, ellmin_g, ellmax_g, s_g, ellmin_fg, ellmax_fg, s_fg,
+                              W3j_s, W3j_m, indptr, index_f, index_g, coefficients, True)
+    for array in [indptr, index_f, index_g, coefficients]:
+        array.flags.writeable = False
+    return indptr, index_f, index_g, coefficients
+
+
+@njit
+def _coupling_tensor_elements(ellmin_f, ellmax_f, s_f, ellmin_g, ellmax_g, s_g, ellmin_fg, ellmax_fg, s_fg,
+                              W3j_s, W3j_m, indptr, index_f, index_g, coefficients, fill):
+    # If `fill` is False, count the nonzero elements of each row into indptr[1:]; otherwise, fill
+    # the rows whose boundaries are given by indptr
+    next_element = indptr[:-1].copy()
     for ell1 in range(ellmin_f, ellmax_f+1):
-        for m1 in range(-ell1, ell1+1):
-            sum1 = math.sqrt((2*ell1+1)/(4*math.pi))*f[..., LM_index(ell1, m1, ellmin_f)]  # Calculate f contribution
-            for ell2 in range(ellmin_g, ellmax_g+1):
+        for ell2 in range(ellmin_g, ellmax_g+1):
+            if abs(s_f) > ell1 or abs(s_g) > ell2:
+                continue
+            ell3min_s = Wigner3j_j3(ell1, ell2, s_f, s_g, W3j_s)
+            for m1 in range(-ell1, ell1+1):
+                i_f = LM_index(ell1, m1, ellmin_f)
                 for m2 in range(-ell2, ell2+1):
-                    sum2 = math.sqrt(2*ell2+1)*g[..., LM_index(ell2, m2, ellmin_g)]   # Calculate g contribution
+                    i_g = LM_index(ell2, m2, ellmin_g)
                     m3 = m1+m2
-                    for ell3 in range(max(abs(m3), abs(ell1-ell2)), min(ell1+ell2, ellmax_fg)+1):
-                        # Could loop over same (ell3, m3) more than once, so add all contributions together
-                        fg[..., LM_index(ell3, m3, ellmin_fg)] += (
-                            math.pow(-1, ell1 + ell2 + ell3 + s_fg + m3)
-                            * math.sqrt(2*ell3+1)
-                            * Wigner3j(ell1, ell2, ell3, s_f, s_g, -s_fg)
-                            * Wigner3j(ell1, ell2, ell3, m1, m2, -m3)
-                        ) * sum1 * sum2
-    return fg
+                    ell3min_m = Wigner3j_j3(ell1, ell2, m1, m2, W3j_m)
+                    for ell3 in range(max(ell3min_m, ell3min_s, ellmin_fg), min(ell1+ell2, ellmax_fg)+1):
+                        coefficient = (
+                            (1 - 2 * ((ell1 + ell2 + ell3 + s_fg + m3) % 2))
+                            * math.sqrt((2*ell1+1)*(2*ell2+1)*(2*ell3+1)/(4*math.pi))
+                            * W3j_s[ell3-ell3min_s]
+                            * W3j_m[ell3-ell3min_m]
+                        )
+                        if coefficient == 0.0:
+                            continue
+                        k = LM_index(ell3, m3, ellmin_fg)
+                        if fill:
+                            p = next_element[k]
+                            index_f[p] = i_f
+                            index_g[p] = i_g
+                            coefficients[p] = coefficient
+                            next_element[k] = p + 1
+                        else:
+                            indptr[k+1] += 1
+
+
+@njit(parallel=True)
+def _coupling_contraction(indptr, index_f, index_g, coefficients, f, g, fg):
+    # NOTE: This adds to fg in place; all arrays other than the tensor are 2-d, with modes on the
+    # first axis and the (flattened) leading axes of the inputs on the second.  Each row of fg is
+    # written by just one thread, so the rows can be computed in parallel.
+    for k in prange(indptr.size-1):
+        for p in range(indptr[k], indptr[k+1]):
+            coefficient = coefficients[p]
+            i_f = index_f[p]
+            i_g = index_g[p]
+            for i in range(fg.shape[1]):
+                fg[k, i] += coefficient * f[i_f, i] * g[i_g, i]
+
+
+@njit(parallel=True)
+def _multiplication_kernel(f, ellmin_f, ellmax_f, s_f,
+                           g, ellmin_g, ellmax_g, s_g,
+                           fg, ellmin_fg, ellmax_fg, s_fg, n_chunks):
+    # NOTE: This adds to fg in place; f, g, and fg are 2-d, as in `_coupling_contraction`.  The
+    # columns are split into `n_chunks` contiguous blocks that are processed in parallel, each with
+    # its own workspaces.  The 3j symbols for all ell3 are computed together by recursion, so that
+    # the spin-weight factors are computed once for each (ell1, ell2)
+    N = fg.shape[1]
+    for chunk in prange(n_chunks):
+        i0 = (chunk * N) // n_chunks
+        i1 = ((chunk + 1) * N) // n_chunks
+        W3j_s = np.empty((2*min(ellmax_f, ellmax_g)+1,), dtype=np.float64)
+        W3j_m = np.empty((2*min(ellmax_f, ellmax_g)+1,), dtype=np.float64)
+        for ell1 in range(ellmin_f, ellmax_f+1):
+            for ell2 in range(ellmin_g, ellmax_g+1):
+                if abs(s_f) > ell1 or abs(s_g) > ell2:
+                    continue
+                ell3min_s = Wigner3j_j3(ell1, ell2, s_f, s_g, W3j_s)
+                for m1 in range(-ell1, ell1+1):
+                    i_f = LM_index(ell1, m1, ellmin_f)
+                    for m2 in range(-ell2, ell2+1):
+                        i_g = LM_index(ell2, m2, ellmin_g)
+                        m3 = m1+m2
+                        ell3min_m = Wigner3j_j3(ell1, ell2, m1, m2, W3j_m)
+                        for ell3 in range(max(ell3min_m, ell3min_s, ellmin_fg), min(ell1+ell2, ellmax_fg)+1):
+                            # Could loop over same (ell3, m3) more than once, so add all contributions together
+                            coefficient = (
+                                (1 - 2 * ((ell1 + ell2 + ell3 + s_fg + m3) % 2))
+                                * math.sqrt((2*ell1+1)*(2*ell2+1)*(2*ell3+1)/(4*math.pi))
+                                * W3j_s[ell3-ell3min_s]
+                                * W3j_m[ell3-ell3min_m]
+                            )
+                            if coefficient == 0.0:
+                                continue
+                            k = LM_index(ell3, m3, ellmin_fg)
+                            for i in range(i0, i1):
+                                fg[k, i] += coefficient * f[i_f, i] * g[i_g, i]
 
 
-def multiply(f, ellmin_f, ellmax_f, s_f, g, ellmin_g, ellmax_g, s_g):
+def multiply(f, ellmin_f, ellmax_f, s_f, g, ellmin_g, ellmax_g, s_g, method='modes'):
     """Return modes of the decomposition of f*g
 
     s1Yl1m1 * s2Yl2m2 = sum([
@@ -74,6 +303,12 @@ def multiply(f, ellmin_f, ellmax_f, s_f, g, ellmin_g, ellmax_g, s_g):
         As above, but for the second function
     s_f: int
         As above, but for the second function
+    method: 'modes', 'grid', or 'auto' [defaults to 'modes']
+        If 'modes', the product is computed exactly from the mode weights, using the formula
+        above.  If 'grid', the functions are evaluated on a grid (using `spinsfast`), multiplied
+        pointwise, and transformed back to modes, which is faster for large ell values.  If 'auto',
+        the method expected to be faster is chosen by `multiplication_method`.  The 'modes' method
+        runs in parallel on as many threads as numba is set to use (see `numba.set_num_threads`).
 
     Returns
     -------
@@ -96,6 +331,6 @@ def multiply(f, ellmin_f, ellmax_f, s_f, g, ellmin_g, ellmax_g, s_g):
 
     _multiplication_helper(f, ellmin_f, ellmax_f, s_f,
                            g, ellmin_g, ellmax_g, s_g,
-                           fg, ellmin_fg, ellmax_fg, s_fg)
+                           fg, ellmin_fg, ellmax_fg, s_fg, method=method)
 
     return fg, ellmin_fg, ellmax_fg, s_fg
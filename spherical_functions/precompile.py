@@ -0,0 +1,94 @@
+# Copyright (c) 2020, Michael Boyle
+# See LICENSE file for details: <https://github.com/moble/spherical_functions/blob/master/LICENSE>
+
+"""Fill the on-disk numba cache with the most commonly used functions
+
+Run as
+
+    python -m spherical_functions.precompile [--no-timing] [--cache-dir DIRECTORY]
+
+This compiles the common signatures of the main functions in this package, with numba's disk
+caching turned on, so that later processes run with `SPHERICAL_FUNCTIONS_NUMBA_CACHE=1` can load
+them instead of compiling them again.  See `spherical_functions._jit` for the cache location.  If
+`--cache-dir` is given, it is used as `NUMBA_CACHE_DIR` for the compilation, so later processes
+must set `NUMBA_CACHE_DIR` to the same directory.
+
+Each step is run in a fresh process.  Unless `--no-timing` is given, the time taken to run the same
+workload is reported without the cache, and then again once the cache has been filled.
+
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import os
+import sys
+import subprocess
+
+
+def warm_up():
+    """Call the common signatures of the compiled functions in this package"""
+    import numpy as np
+    import quaternion
+    import spherical_functions as sf
+    from spherical_functions.WignerD.WignerDRecursion import HCalculator
+
+    ell_min, ell_max, s = 0, 8, -2
+    R = quaternion.from_rotation_vector([0.1, 0.2, 0.3])
+    Rs = quaternion.from_rotation_vector(np.random.uniform(-1, 1, size=(4, 3)))
+    indices = sf.LM_range(abs(s), ell_max)
+
+    sf.Wigner_D_element(R, 2, 1, 0)
+    sf.Wigner_D_element(R, sf.LMpM_range(0, 2))
+    sf.Wigner_D_matrices(R, ell_min, ell_max)
+    sf.Wigner_D_matrices(Rs, ell_min, ell_max)
+    sf.Wigner_D_matrices_recursive(Rs, ell_min, ell_max)
+    sf.SWSH(R, s, indices)
+    sf.SWSH_grid(Rs, s, ell_max)
+    sf.SWSH_grid_recursive(Rs, s, ell_max)
+    sf.Wigner3j(2, 6, 4, -2, 2, 0)
+    sf.LM_index(2, 1, 0)
+    sf.LMpM_index(2, 1, 0, 0)
+
+    hcalc = HCalculator(ell_max)
+    cosβ = np.linspace(-1, 1, num=5)
+    hcalc(cosβ)
+    hcalc(cosβ, parallel=True)
+    hcalc.materialize(hcalc(cosβ, triangle=True))
+
+    f = np.random.normal(size=(sf.LM_total_size(0, ell_max), 2)).view(complex)[:, 0]
+    sf.multiply(f, 0, ell_max, 0, f, 0, ell_max, 0)
+
+
+def _run(cache):
+    """Run `warm_up` in a new process, returning the time it took in seconds"""
+    code = """\
+import time
+t0 = time.perf_counter()
+from spherical_functions.precompile import warm_up
+warm_up()
+print(time.perf_counter() - t0)
+"""
+    env = dict(os.environ, SPHERICAL_FUNCTIONS_NUMBA_CACHE='1' if cache else '0')
+    output = subprocess.check_output([sys.executable, '-c', code], env=env)
+    return float(output.decode().split()[-1])
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    timing = '--no-timing' not in argv
+    if '--cache-dir' in argv:
+        os.environ['NUMBA_CACHE_DIR'] = os.path.abspath(argv[argv.index('--cache-dir') + 1])
+    os.environ.pop('SPHERICAL_FUNCTIONS_NUMBA_CACHE', None)
+    from spherical_functions._jit import numba_cache_directory
+    if timing:
+        print("Without cache: {0:.2f} s".format(_run(cache=False)))
+        sys.stdout.flush()
+    elapsed = _run(cache=True)
+    print("Filled cache in {0} ({1:.2f} s)".format(numba_cache_directory(), elapsed))
+    sys.stdout.flush()
+    if timing:
+        print("With cache: {0:.2f} s".format(_run(cache=True)))
+
+
+if __name__ == '__main__':
+    main()
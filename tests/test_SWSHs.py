@@ -149,6 +149,64 @@ def test_SWSH_grid(special_angles, ell_max):
         assert np.array_equal(values_explicit, values_grid)
 
 
+def test_SWSH_theta_phi_grid():
+    ell_max = 8
+    n_theta, n_phi = 2*ell_max+1, 2*ell_max+2
+    theta = np.linspace(0.0, np.pi, num=n_theta, endpoint=True)
+    phi = np.linspace(0.0, 2*np.pi, num=n_phi, endpoint=False)
+    R_grid = quaternion.from_spherical_coords(sf.theta_phi(n_theta, n_phi))
+    for s in range(-3, 3+1):
+        values_separable = sf.SWSH_theta_phi_grid(theta, phi, s, ell_max)
+        values_grid = sf.SWSH_grid(R_grid, s, ell_max)
+        assert values_separable.shape == values_grid.shape
+        assert np.allclose(values_separable, values_grid, atol=1e-14, rtol=0.0)
+
+
+def test_SWSH_grid_recursive(Rs):
+    ell_max = 12
+    for s in range(-4, 4+1):
+        values_recursive = sf.SWSH_grid_recursive(Rs, s, ell_max)
+        values_grid = sf.SWSH_grid(Rs, s, ell_max)
+        assert values_recursive.shape == values_grid.shape
+        assert np.allclose(values_recursive, values_grid, atol=1e-12, rtol=0.0)
+
+    # Beyond the direct formula's range, check the sum rule sum_m |sYlm|^2 = (2*ell+1)/(4*pi)
+    ell_max = 2 * sf.direct_ell_max
+    LM = sf.LM_range(0, ell_max)
+    for s in [-2, 0, 3]:
+        values = sf.SWSH_grid(Rs, s, ell_max)
+        assert values.shape == Rs.shape + (LM.shape[0],)
+        for ell in range(abs(s), ell_max+1):
+            sum_squares = np.sum(np.abs(values[..., LM[:, 0] == ell])**2, axis=-1)
+            assert np.allclose(sum_squares, (2*ell+1)/(4*np.pi), atol=0.0, rtol=1e-12)
+        # Individual values in that range also come from the recursion, rather than the direct sums
+        large = LM[:, 0] > sf.direct_ell_max
+        assert np.array_equal(sf.SWSH(Rs[1], s, LM)[large], values[1, large])
+        assert np.array_equal(sf.SWSH(Rs, s, LM[-3]), values[..., -3])
+
+
+def test_SWSH_grid_recursive_threads():
+    # Concurrent calls must not share workspaces; frequent thread switches make any sharing show up
+    import sys
+    from concurrent.futures import ThreadPoolExecutor
+    np.random.seed(1234)
+    Rs = [quaternion.from_rotation_vector(np.random.uniform(-1, 1, size=(3, 3))) for i in range(8)]
+    functions = [lambda R, pooled: sf.SWSH_grid_recursive(R, -2, 8, pooled=pooled),
+                 lambda R, pooled: sf.Wigner_D_matrices_recursive(R, 0, 8, pooled=pooled)]
+    switch_interval = sys.getswitchinterval()
+    try:
+        sys.setswitchinterval(1e-6)
+        for function in functions:
+            expected = [function(R, False) for R in Rs]
+            for pooled in [False, True]:
+                def n_wrong(i):
+                    return sum(not np.array_equal(function(Rs[i], pooled), expected[i]) for k in range(100))
+                with ThreadPoolExecutor(max_workers=len(Rs)) as executor:
+                    assert sum(executor.map(n_wrong, range(len(Rs)))) == 0
+    finally:
+        sys.setswitchinterval(switch_interval)
+
+
 def test_SWSH_signatures(Rs):
     """There are two ways to call the SWSH function: with an array of Rs, or with an array of (ell,m) values.  This
     test ensures that the results are the same in both cases."""
@@ -8,6 +8,7 @@ from __future__ import print_function, division, absolute_import
 # Try to keep imports to a minimum; from the standard library as much
 # as possible.  We have to conda install all dependencies, and it's
 # not right to make Travis do too much work.
+import numpy as np
 import spherical_functions as sf
 import pytest
 
@@ -94,3 +95,84 @@ def test_Wigner3j_values():
                             sf_3j = Wigner3j(j1, j2, j3, m1, m2, m3)
                             sy_3j = N(wigner_3j(j1, j2, j3, m1, m2, m3))
                             assert abs(sf_3j - sy_3j) < precision_Wigner3j
+
+
+def test_Wigner3jTable(tmp_path, monkeypatch):
+    j_max = 8
+    table = sf.Wigner3jTable(j_max)
+    # Include some j values beyond j_max, which are computed directly, and some with m1+m2+m3 != 0
+    for j1 in range(j_max+3):
+        for j2 in range(j_max+3):
+            for j3 in range(j_max+3):
+                for m1 in range(-j1-1, j1+2):
+                    for m2 in range(-j2, j2+1):
+                        for m3 in [-m1-m2, -m1-m2+1]:
+                            assert abs(table(j1, j2, j3, m1, m2, m3)
+                                       - sf.Wigner3j(j1, j2, j3, m1, m2, m3)) < precision_Wigner3j
+    # The table can be cached on disk
+    monkeypatch.setenv('SPHERICAL_FUNCTIONS_CACHE_DIR', str(tmp_path))
+    sf.Wigner3jTable(j_max, cache=True)
+    assert (tmp_path / 'Wigner3j_{0}.npy'.format(j_max)).exists()
+    assert np.array_equal(sf.Wigner3jTable(j_max, cache=True).values, table.values)
+
+
+def test_Wigner3j_j3():
+    from spherical_functions.Wigner3j import Wigner3j_j3
+    j_max = 8
+    out = np.empty((2*j_max+2,))
+    for j1 in range(j_max+1):
+        for j2 in range(j_max+1):
+            for m1 in range(-j1, j1+1):
+                for m2 in range(-j2, j2+1):
+                    out[:] = np.nan
+                    j3_min = Wigner3j_j3(j1, j2, m1, m2, out)
+                    assert j3_min == max(abs(j1-j2), abs(m1+m2))
+                    for j3 in range(j3_min, j1+j2+1):
+                        assert abs(out[j3-j3_min] - sf.Wigner3j(j1, j2, j3, m1, m2, -m1-m2)) < precision_Wigner3j
+                    assert np.all(np.isnan(out[j1+j2-j3_min+1:]))
+
+
+@requires_sympy
+def test_Wigner3j_j3_large_j():
+    from sympy import N
+    from sympy.physics.wigner import wigner_3j
+    from spherical_functions.Wigner3j import Wigner3j_j3
+    out = np.empty((401,))
+    for j1, j2, m1, m2 in [(200, 150, 3, -70), (120, 200, -120, 17), (100, 100, 0, 0), (180, 37, 90, 30)]:
+        j3_min = Wigner3j_j3(j1, j2, m1, m2, out)
+        for j3 in [j3_min, j3_min+1, (j3_min+j1+j2)//2, j1+j2-1, j1+j2]:
+            exact = float(N(wigner_3j(j1, j2, j3, m1, m2, -m1-m2), 30))
+            assert abs(out[j3-j3_min] - exact) <= 1e-13 * abs(exact)
+
+
+@requires_sympy
+def test_Wigner3j_large_j():
+    from sympy import N
+    from sympy.physics.wigner import wigner_3j
+    # Spans the switch from the direct sum to recursion, and goes beyond the range of the factorials
+    for j1, j2, j3, m1, m2 in [(13, 14, 13, 2, -5), (14, 14, 14, 0, 0), (20, 21, 22, -7, 4),
+                               (60, 70, 80, 12, -30), (206, 252, 164, 198, -241), (392, 380, 527, -79, -221)]:
+        exact = float(N(wigner_3j(j1, j2, j3, m1, m2, -m1-m2), 30))
+        assert abs(sf.Wigner3j(j1, j2, j3, m1, m2, -m1-m2) - exact) <= 1e-12 * abs(exact)
+
+
+def test_Wigner3j_vectorized():
+    np.random.seed(1234)
+    j_max = 12
+    j1, j2 = np.random.randint(0, j_max+1, size=(2, 1000))
+    j3 = np.random.randint(abs(j1-j2), j1+j2+1)
+    m1 = np.random.randint(-j1, j1+1)
+    m2 = np.random.randint(-j2, j2+1)
+    m3 = -m1 - m2
+    expected_3j = np.array([sf.Wigner3j(*args) for args in zip(j1, j2, j3, m1, m2, m3)])
+    expected_cg = np.array([sf.clebsch_gordan(*args) for args in zip(j1, m1, j2, m2, j3, -m3)])
+    for target in ['cpu', 'parallel']:
+        assert np.array_equal(sf.Wigner3j_vectorized(j1, j2, j3, m1, m2, m3, target=target), expected_3j)
+        assert np.array_equal(sf.clebsch_gordan_vectorized(j1, m1, j2, m2, j3, -m3, target=target), expected_cg)
+    # Broadcasting and output arrays
+    out = np.empty((j_max+1, 3))
+    result = sf.Wigner3j_vectorized(np.arange(j_max+1)[:, np.newaxis], 2, 3, 0, [-1, 0, 1], [1, 0, -1], out=out)
+    assert result is out
+    assert np.array_equal(out, [[sf.Wigner3j(j, 2, 3, 0, m, -m) for m in [-1, 0, 1]] for j in range(j_max+1)])
+    with pytest.raises(TypeError):
+        sf.Wigner3j_vectorized(1.5, 1, 1, 0, 0, 0)
@@ -48,8 +48,8 @@ def test_Wigner_D_matrices_negative_argument(Rs, ell_max):
     a = np.empty((LMpM.shape[0],), dtype=complex)
     b = np.empty((LMpM.shape[0],), dtype=complex)
     for R in Rs:
-        sf._Wigner_D_matrices(R.a, R.b, 0, ell_max, a)
-        sf._Wigner_D_matrices(-R.a, -R.b, 0, ell_max, b)
+        sf._Wigner_D_matrices(sf._Wigner_coefficients, R.a, R.b, 0, ell_max, a)
+        sf._Wigner_D_matrices(sf._Wigner_coefficients, -R.a, -R.b, 0, ell_max, b)
         assert np.allclose(a, b, rtol=ell_max * precision_Wigner_D_element)
 
 
@@ -68,9 +68,9 @@ def test_Wigner_D_elements_representation_property(Rs, ell_max):
         for j, R2 in enumerate(Rs):
             # print("\t\t{0} of {1}: R2 = {2}".format(j+1, len(Rs), R2))
             R12 = R1 * R2
-            sf._Wigner_D_element(R1.a, R1.b, twoLMpM, D1)
-            sf._Wigner_D_element(R2.a, R2.b, twoLMpM, D2)
-            sf._Wigner_D_element(R12.a, R12.b, twoLMpM, D12)
+            sf._Wigner_D_element(sf._Wigner_coefficients, R1.a, R1.b, twoLMpM, D1)
+            sf._Wigner_D_element(sf._Wigner_coefficients, R2.a, R2.b, twoLMpM, D2)
+            sf._Wigner_D_element(sf._Wigner_coefficients, R12.a, R12.b, twoLMpM, D12)
             M12 = np.array([np.sum([D1[sf._Wigner_index(twoell, twomp, twompp)]
                                     * D2[sf._Wigner_index(twoell, twompp, twom)]
                                     for twompp in range(-twoell, twoell + 1, 2)])
@@ -99,9 +99,9 @@ def test_Wigner_D_matrices_representation_property(Rs, ell_max):
         for j, R2 in enumerate(Rs[i:]):
             # print("\t\t{0} of {1}: R2 = {2}".format(j+1, len(Rs), R2))
             R12 = R1 * R2
-            sf._Wigner_D_matrices(R1.a, R1.b, 0, ell_max, D1)
-            sf._Wigner_D_matrices(R2.a, R2.b, 0, ell_max, D2)
-            sf._Wigner_D_matrices(R12.a, R12.b, 0, ell_max, D12)
+            sf._Wigner_D_matrices(sf._Wigner_coefficients, R1.a, R1.b, 0, ell_max, D1)
+            sf._Wigner_D_matrices(sf._Wigner_coefficients, R2.a, R2.b, 0, ell_max, D2)
+            sf._Wigner_D_matrices(sf._Wigner_coefficients, R12.a, R12.b, 0, ell_max, D12)
             M12 = np.array([np.sum([D1[sf.LMpM_index(ell, mp, mpp, 0)] * D2[sf.LMpM_index(ell, mpp, m, 0)]
                                     for mpp in range(-ell, ell + 1)])
                             for ell in range(ell_max + 1)
@@ -286,12 +286,93 @@ def test_Wigner_D_matrix(Rs, ell_max):
             for R in Rs:
                 elements = sf.Wigner_D_element(R, LMpM)
                 matrix = np.empty(LMpM.shape[0], dtype=complex)
-                sf._Wigner_D_matrices(R.a, R.b, l_min, l_max, matrix)
+                sf._Wigner_D_matrices(sf._Wigner_coefficients, R.a, R.b, l_min, l_max, matrix)
                 assert np.allclose(elements, matrix,
                                    atol=1e3 * l_max * ell_max * precision_Wigner_D_element,
                                    rtol=1e3 * l_max * ell_max * precision_Wigner_D_element)
 
 
+def test_Wigner_D_matrices_array(Rs, ell_max):
+    for l_min in [0, 1, ell_max // 2]:
+        matrices = sf.Wigner_D_matrices(Rs, l_min, ell_max)
+        assert matrices.shape == Rs.shape + (sf.LMpM_total_size(l_min, ell_max),)
+        for i, R in enumerate(Rs):
+            assert np.array_equal(matrices[i], sf.Wigner_D_matrices(R, l_min, ell_max))
+        R_grid = Rs[:(Rs.size // 2) * 2].reshape((2, -1))
+        out = np.empty(R_grid.shape + matrices.shape[-1:], dtype=complex)
+        assert sf.Wigner_D_matrices(R_grid, l_min, ell_max, out=out) is out
+        assert np.array_equal(out.reshape((-1, out.shape[-1])), matrices[:R_grid.size])
+        with pytest.raises(ValueError):
+            sf.Wigner_D_matrices(Rs, l_min, ell_max, out=np.empty(matrices.shape[-1:], dtype=complex))
+
+
+def test_Wigner_D_matrices_recursive(Rs):
+    ell_max = 12
+    for l_min in [0, 1, 5]:
+        matrices = sf.Wigner_D_matrices_recursive(Rs, l_min, ell_max)
+        assert matrices.shape == Rs.shape + (sf.LMpM_total_size(l_min, ell_max),)
+        for i, R in enumerate(Rs):
+            matrix = np.empty(matrices.shape[-1], dtype=complex)
+            sf._Wigner_D_matrices(sf._Wigner_coefficients, R.a, R.b, l_min, ell_max, matrix)
+            assert np.allclose(matrices[i], matrix, atol=1e-12, rtol=0.0)
+
+    # Beyond the direct formula's range, check that each matrix is unitary
+    ell_max = 2 * sf.direct_ell_max
+    for R in Rs[::5]:
+        matrices = sf.Wigner_D_matrices(R, ell_max, ell_max)
+        D = matrices.reshape((2*ell_max+1, 2*ell_max+1))
+        assert np.allclose(D @ D.conj().T, np.eye(2*ell_max+1), atol=1e-12, rtol=0.0)
+
+        # Individual elements in that range also come from the recursion, rather than the direct sums
+        indices = np.array([[ell, mp, m] for ell in [1, ell_max] for mp in [-1, 0, 1] for m in [-ell, 0, 1]])
+        elements = sf.Wigner_D_element(R, indices)
+        assert np.allclose(elements[:9], sf.Wigner_D_element(R, indices[:9]), atol=1e-15, rtol=0.0)
+        assert np.array_equal(elements[9:], matrices[sf.LMpM_index(*indices[9:].T, ell_max)])
+        assert sf.Wigner_D_element(R, ell_max, 1, -2) == matrices[sf.LMpM_index(ell_max, 1, -2, ell_max)]
+    assert np.array_equal(sf.Wigner_D_element(Rs, ell_max, 1, -2),
+                          sf.Wigner_D_matrices(Rs, ell_max, ell_max)[:, sf.LMpM_index(ell_max, 1, -2, ell_max)])
+    with pytest.raises(ValueError):
+        sf.Wigner_D_element(Rs[0], ell_max + 0.5, 0.5, 0.5)
+
+
+def test_Wigner_D_matrices_coefficients(Rs):
+    # The compiled functions read the coefficient table passed to them, rather than a copy frozen into
+    # their compiled code, so memory-mapped tables are really shared between processes
+    ell_max = 8
+    for R in Rs:
+        if abs(R.a) <= sf.epsilon or abs(R.b) <= sf.epsilon:
+            continue  # These special cases don't use the coefficients
+        a = np.empty(sf.LMpM_total_size(0, ell_max), dtype=complex)
+        b = np.empty_like(a)
+        sf._Wigner_D_matrices(sf._Wigner_coefficients, R.a, R.b, 0, ell_max, a)
+        sf._Wigner_D_matrices(2 * sf._Wigner_coefficients, R.a, R.b, 0, ell_max, b)
+        assert np.allclose(b, 2 * a, atol=0.0, rtol=1e-15)
+
+
+def test_rotate_modes(Rs, ell_max):
+    from spherical_functions.WignerD import _Delta_matrices
+    rotate_modes = sf.rotate_modes
+    np.random.seed(1234)
+    for l_min in [0, 1, ell_max // 2]:
+        modes = np.random.normal(size=(sf.LM_total_size(l_min, ell_max), 2)).view(complex)[:, 0]
+        rotated = rotate_modes(modes, l_min, ell_max, Rs)
+        assert rotated.shape == Rs.shape + modes.shape
+        matrices = sf.Wigner_D_matrices_recursive(Rs, l_min, ell_max)
+        for i in range(Rs.size):
+            for ell in range(l_min, ell_max+1):
+                i0, i1 = sf.LM_index(ell, -ell, l_min), sf.LM_index(ell, ell, l_min)+1
+                D = matrices[i, sf.LMpM_index(ell, -ell, -ell, l_min):sf.LMpM_index(ell, ell, ell, l_min)+1]
+                expected = D.reshape((2*ell+1, 2*ell+1)).conjugate() @ modes[i0:i1]
+                assert np.allclose(rotated[i, i0:i1], expected, atol=1e-12, rtol=1e-12)
+        # One rotor per slice, with output array
+        out = np.empty(rotated.shape, dtype=complex)
+        assert rotate_modes(rotated, l_min, ell_max, np.conjugate(Rs), out=out) is out
+        assert np.allclose(out, modes, atol=1e-12, rtol=1e-12)
+    assert _Delta_matrices(ell_max) is _Delta_matrices(ell_max)
+    with pytest.raises(ValueError):
+        rotate_modes(modes, 0, ell_max, Rs)
+
+
 @slow
 def test_Wigner_D_input_types(Rs, special_angles, ell_max):
     LMpM = sf.LMpM_range(0, ell_max // 2)
@@ -75,6 +75,80 @@ def test_modes_creation():
         assert np.all(m[..., :sf.LM_total_size(0, abs(s)-1)] == 0.0)
 
 
+def test_modes_compact():
+    np.random.seed(1234)
+    ell_max = 6
+    expand = lambda c: np.concatenate(
+        (np.zeros(c.shape[:-1] + (sf.LM_total_size(0, c.ell_min-1),), dtype=complex), c.view(np.ndarray)), axis=-1
+    )
+    for s in range(-2, 2 + 1):
+        a = np.random.rand(3, sf.LM_total_size(abs(s), ell_max)*2).view(complex)
+        m = sf.Modes(a.copy(), spin_weight=s, ell_min=abs(s), ell_max=ell_max)
+        c = sf.Modes(a, spin_weight=s, ell_min=abs(s), ell_max=ell_max, compact=True)
+        assert c.ell_min == abs(s) and c.ell_max == ell_max and c.shape == a.shape
+        assert np.shares_memory(c, a)
+        assert c[..., c.index(ell_max, 1)][0] == m[..., m.index(ell_max, 1)][0]
+        # Input with modes below abs(s) is viewed, not copied
+        b = sf.Modes(m.view(np.ndarray), spin_weight=s, compact=True)
+        assert b.ell_min == abs(s) and np.shares_memory(b, m) and np.array_equal(expand(b), m.view(np.ndarray))
+        assert sf.Modes(c, compact=False).ell_min == 0
+        assert np.array_equal(sf.Modes(c, compact=False).view(np.ndarray), m.view(np.ndarray))
+        assert pickle.loads(pickle.dumps(c)).ell_min == abs(s)
+        # Results are compact, and agree with the padded storage
+        R = quaternion.from_rotation_vector(np.random.uniform(-1, 1, size=(3, 3)))
+        for compact, padded in [(c.conjugate(), m.conjugate()), (c + c, m + m), (2 * c - c, 2 * m - m),
+                                (c * c, m * m), (c.multiply(c, method='grid'), m.multiply(m, method='grid')),
+                                (c.eth, m.eth), (c.ethbar, m.ethbar), (c.Lplus(), m.Lplus()),
+                                (c.Lsquared(), m.Lsquared()), (c.rotate(R[0]), m.rotate(R[0])),
+                                (c.rotate(R), m.rotate(R)), (c.grid().modes(ell_max), m),
+                                (c.truncate_ell(4), m.truncate_ell(4))]:
+            assert isinstance(compact, sf.Modes) and compact._metadata['compact']
+            assert compact.ell_min >= abs(compact.s) and compact.s == padded.s and compact.ell_max == padded.ell_max
+            assert np.allclose(expand(compact), padded.view(np.ndarray), rtol=1e-12, atol=1e-12)
+        Q = quaternion.from_rotation_vector(np.random.uniform(-1, 1, size=(7, 3)))
+        assert np.allclose(c.evaluate(Q), m.evaluate(Q), rtol=1e-12, atol=1e-12)
+        assert np.allclose(c.grid(use_spinsfast=False).view(np.ndarray), m.grid().view(np.ndarray),
+                           rtol=1e-12, atol=1e-12)
+        assert np.allclose(np.abs(c), np.abs(m), rtol=1e-14, atol=0.0)
+
+
+def test_modes_zero_copy(tmp_path):
+    np.random.seed(1234)
+    ell_max = 8
+    for s in range(-2, 2 + 1):
+        a = np.random.rand(3, 7, sf.LM_total_size(0, ell_max)*2).view(complex)
+        a[..., :sf.LM_total_size(0, abs(s)-1)] = 0.0
+        a.flags.writeable = False
+        m = sf.Modes(a, spin_weight=s)
+        assert np.shares_memory(m, a) and not m.flags.writeable
+        assert np.array_equal(m.view(np.ndarray), a)
+        # Nonzero modes with ell<abs(s) cannot be zeroed in read-only data
+        b = np.random.rand(3, 7, sf.LM_total_size(0, ell_max)*2).view(complex)
+        b.flags.writeable = False
+        if s != 0:
+            with pytest.raises(ValueError):
+                sf.Modes(b, spin_weight=s)
+        m = sf.Modes(b, spin_weight=s, trusted=True)
+        assert np.shares_memory(m, b) and np.array_equal(m.view(np.ndarray), b)
+        m = sf.Modes(b, spin_weight=s, compact=True)
+        assert np.shares_memory(m, b) and m.ell_min == abs(s)
+    # Memory-mapped data are wrapped without being copied
+    s = -2
+    a = np.random.rand(10, sf.LM_total_size(0, ell_max)*2).view(complex)
+    a[..., :sf.LM_total_size(0, abs(s)-1)] = 0.0
+    a.tofile(tmp_path / 'modes.dat')
+    mapped = np.memmap(tmp_path / 'modes.dat', dtype=complex, mode='r', shape=a.shape)
+    for kwargs in [{}, {'trusted': True}, {'compact': True}]:
+        m = sf.Modes(mapped, spin_weight=s, ell_max=ell_max, **kwargs)
+        assert np.shares_memory(m, mapped)
+        assert np.array_equal(m.view(np.ndarray), sf.Modes(a, spin_weight=s, **kwargs).view(np.ndarray))
+        assert np.allclose(m.eth.view(np.ndarray), sf.Modes(a, spin_weight=s, **kwargs).eth.view(np.ndarray),
+                           rtol=1e-14, atol=1e-14)
+    with pytest.raises(ValueError):
+        sf.Modes(mapped, spin_weight=s, ell_max=ell_max-1, trusted=True)
+    del m, mapped
+
+
 def np_copy(m):
     return np.copy(m)
 
@@ -136,6 +210,88 @@ def test_modes_grid():
             assert g.shape[-2:] == (n_theta, n_phi)
 
 
+def test_modes_grid_separable():
+    for s in range(-2, 2 + 1):
+        ell_min = abs(s)
+        ell_max = 8
+        a = np.random.rand(3, 7, sf.LM_total_size(ell_min, ell_max)*2).view(complex)
+        m = sf.Modes(a, spin_weight=s, ell_min=ell_min, ell_max=ell_max)
+        n = 2*ell_max+1
+        for n_theta, n_phi in [[None, None], [n, None], [None, n], [n, n], [n+1, n], [n, n+1], [n+1, n+1]]:
+            g1 = m.grid(n_theta=n_theta, n_phi=n_phi)
+            g2 = m.grid(n_theta=n_theta, n_phi=n_phi, use_spinsfast=False)
+            assert isinstance(g2, sf.Grid)
+            assert g2.s == g1.s
+            assert g2.shape == g1.shape
+            assert np.allclose(g1.view(np.ndarray), g2.view(np.ndarray), atol=1e-13, rtol=0.0)
+
+
+def test_grid_modes():
+    for s in range(-2, 2 + 1):
+        ell_min = abs(s)
+        ell_max = 8
+        a = np.random.rand(3, 7, sf.LM_total_size(ell_min, ell_max)*2).view(complex)
+        m = sf.Modes(a, spin_weight=s, ell_min=ell_min, ell_max=ell_max, multiplication_truncator=max)
+        g = m.grid()
+        m2 = g.modes()
+        assert isinstance(m2, sf.Modes)
+        assert m2.s == s
+        assert m2.ell_max == ell_max
+        assert m2._metadata['multiplication_truncator'] is max
+        assert np.allclose(m.view(np.ndarray), m2.view(np.ndarray), rtol=1e-13, atol=1e-13)
+        assert g.modes(ell_max+2).ell_max == ell_max+2
+
+
+def test_modes_multiplication_methods():
+    from spherical_functions.multiplication import multiplication_method
+    np.random.seed(1234)
+    for ell_max1, ell_max2 in [(3, 2), (8, 5), (12, 12)]:
+        m1 = sf.Modes(np.random.rand(4, sf.LM_total_size(0, ell_max1)*2).view(complex), spin_weight=1)
+        m2 = sf.Modes(np.random.rand(sf.LM_total_size(0, ell_max2)*2).view(complex), spin_weight=-2)
+        products = [m1.multiply(m2, method=method) for method in ['modes', 'grid', 'auto']]
+        # The exact method is the default, including for the ufunc
+        assert np.array_equal(m1.multiply(m2).view(np.ndarray), products[0].view(np.ndarray))
+        assert np.array_equal((m1 * m2).view(np.ndarray), products[0].view(np.ndarray))
+        for product in products[1:]:
+            assert product.s == -1
+            assert product.ell_max == ell_max1 + ell_max2
+            assert np.allclose(product.view(np.ndarray), products[0].view(np.ndarray), rtol=1e-13, atol=1e-13)
+    assert multiplication_method(2, 2) == 'modes'
+    assert multiplication_method(16, 16) == 'grid'
+    with pytest.raises(ValueError):
+        m1.multiply(m2, method='bad')
+
+
+def test_modes_rotate():
+    np.random.seed(1234)
+    for s in range(-2, 2 + 1):
+        ell_max = 6
+        m = sf.Modes(np.random.rand(5, sf.LM_total_size(0, ell_max)*2).view(complex), spin_weight=s, ell_max=ell_max)
+        R = quaternion.from_rotation_vector(np.random.uniform(-1, 1, size=(5, 3)))
+        Q = quaternion.from_rotation_vector(np.random.uniform(-1, 1, size=(7, 3)))
+        # The rotated function satisfies g(R*Q) = f(Q)
+        g = m.rotate(R[0])
+        assert isinstance(g, sf.Modes)
+        assert g.s == s and g.ell_max == ell_max and g.shape == m.shape
+        assert np.allclose(g.evaluate(R[0] * Q), m.evaluate(Q), rtol=1e-13, atol=1e-13)
+        assert np.allclose(np.abs(g), np.abs(m), rtol=1e-13, atol=0.0)
+        # One rotor per slice is the same as rotating each slice separately
+        g = m.rotate(R)
+        for i in range(5):
+            assert np.allclose(g[i].view(np.ndarray), m[i].rotate(R[i]).view(np.ndarray), rtol=1e-13, atol=1e-13)
+        assert np.allclose(g.rotate(np.conjugate(R)).view(np.ndarray), m.view(np.ndarray), rtol=1e-13, atol=1e-13)
+        # Rotating by a product is the same as rotating successively
+        assert np.allclose(m.rotate(R[1] * R[0]).view(np.ndarray), m.rotate(R[0]).rotate(R[1]).view(np.ndarray),
+                           rtol=1e-13, atol=1e-13)
+        # A single function may be rotated by many rotors
+        assert m[0].rotate(R).shape == m.shape
+    # Large ell values use the recursive D matrices
+    ell_max = 40
+    m = sf.Modes(np.random.rand(3, sf.LM_total_size(0, ell_max)*2).view(complex), spin_weight=-2, ell_max=ell_max)
+    R = quaternion.from_rotation_vector(np.random.uniform(-1, 1, size=(3, 3)))
+    assert np.allclose(m.rotate(R).rotate(np.conjugate(R)).view(np.ndarray), m.view(np.ndarray), rtol=1e-12, atol=1e-12)
+
+
 def test_modes_addition():
     tolerance = 1e-14
     np.random.seed(1234)
@@ -259,7 +415,8 @@ def test_modes_multiplication():
     tolerance = 1e-13
     np.random.seed(1234)
     # Test without truncation
-    for i_mul, mul in enumerate([np.multiply, lambda a, b: a.multiply(b), lambda a, b: a.multiply(b, truncator=max)]):
+    for i_mul, mul in enumerate([np.multiply, lambda a, b: a.multiply(b), lambda a, b: a.multiply(b, truncator=max),
+                                 lambda a, b: a.multiply(b, method='modes'), lambda a, b: a.multiply(b, method='grid')]):
         for s1 in range(-2, 2 + 1):
             ell_min1 = abs(s1)
             ell_max1 = 8
@@ -339,6 +496,26 @@ def test_modes_conjugate():
             assert ell_max == mbar.ell_max
             assert shape == mbar.shape
             assert np.allclose(g, np.conjugate(gbar), rtol=tolerance, atol=tolerance)
+    # Compare the ufunc, and in-place conjugation of non-contiguous data, to the formula
+    for s in range(-2, 2 + 1):
+        ell_max = 6
+        m = sf.Modes(np.random.rand(4, 5, sf.LM_total_size(0, ell_max)*2).view(complex), spin_weight=s)
+        a = m.view(np.ndarray)
+        expected = np.zeros_like(a)
+        for ell in range(abs(s), ell_max+1):
+            for mm in range(-ell, ell+1):
+                expected[..., m.index(ell, mm)] = (-1)**(s+mm) * np.conjugate(a[..., m.index(ell, -mm)])
+        mbar = np.conjugate(m)
+        assert isinstance(mbar, sf.Modes) and mbar.s == -s
+        assert np.array_equal(mbar.view(np.ndarray), expected)
+        out = np.empty_like(m.view(np.ndarray))
+        np.conjugate(m, out=out)
+        assert np.array_equal(out, expected)
+        untouched = m[:, 1::2].view(np.ndarray).copy()
+        view = m[:, ::2]
+        assert view.conjugate(inplace=True) is view
+        assert np.array_equal(m[:, ::2].view(np.ndarray), expected[:, ::2])
+        assert np.array_equal(m[:, 1::2].view(np.ndarray), untouched)
 
 
 def test_modes_real():
@@ -436,6 +613,42 @@ def test_modes_squared_angular_momenta():
         assert np.allclose(m1, m2, rtol=tolerance, atol=tolerance)
 
 
+def test_modes_derivative_formulas():
+    # Compare each operator to the formula for its action on the modes, and check `out`
+    np.random.seed(1234)
+    ell_max = 6
+    formulas = {
+        'Lsquared': (0, lambda s, ell, m: ell*(ell+1), 0),
+        'Lz': (0, lambda s, ell, m: m, 0),
+        'Lplus': (0, lambda s, ell, m: math.sqrt((ell+m)*(ell-m+1)), 1),
+        'Lminus': (0, lambda s, ell, m: math.sqrt((ell-m)*(ell+m+1)), -1),
+        'Rz': (0, lambda s, ell, m: -s, 0),
+        'Rplus': (-1, lambda s, ell, m: math.sqrt((ell-s+1)*(ell+s)), 0),
+        'Rminus': (1, lambda s, ell, m: math.sqrt((ell+s+1)*(ell-s)), 0),
+    }
+    for s in range(-2, 2 + 1):
+        m = sf.Modes(np.random.rand(3, 4, sf.LM_total_size(0, ell_max)*2).view(complex), spin_weight=s)
+        a = m.view(np.ndarray)
+        for name, (ds, coefficient, shift) in formulas.items():
+            expected = np.zeros_like(a)
+            for ell in range(max(abs(s), abs(s+ds)), ell_max+1):
+                for mm in range(-ell, ell+1):
+                    if abs(mm-shift) <= ell:
+                        expected[..., m.index(ell, mm)] = coefficient(s, ell, mm) * a[..., m.index(ell, mm-shift)]
+            d = getattr(m, name)()
+            assert isinstance(d, sf.Modes) and d.s == s+ds and d.ell_max == ell_max
+            assert np.allclose(d.view(np.ndarray), expected, rtol=1e-14, atol=1e-14)
+            out = sf.Modes(np.zeros_like(a), spin_weight=0)
+            assert getattr(m, name)(out=out) is out
+            assert out.s == s+ds
+            assert np.allclose(out.view(np.ndarray), expected, rtol=1e-14, atol=1e-14)
+            out = np.zeros_like(a)
+            getattr(m, name)(out=out)
+            assert np.allclose(out, expected, rtol=1e-14, atol=1e-14)
+        assert np.array_equal(m.eth.view(np.ndarray), m.Rminus().view(np.ndarray))
+        assert np.array_equal(m.ethbar.view(np.ndarray), -m.Rplus().view(np.ndarray))
+
+
 def test_modes_derivative_commutators():
     tolerance = 1e-13
     np.random.seed(1234)
@@ -484,6 +697,44 @@ def test_modes_derivative_commutators():
         assert np.allclose(ethbar(eth(m)) - eth(ethbar(m)), 2 * m.s * m, rtol=tolerance, atol=tolerance)
 
 
+def test_modes_operator_algebra():
+    from spherical_functions.SWSH_modes import operators as op
+    tolerance = 1e-12
+    np.random.seed(1234)
+    for s in range(-2, 2+1):
+        ell_max = 8
+        a = np.random.rand(3, 7, sf.LM_total_size(0, ell_max)*2).view(complex)
+        m = sf.Modes(a, spin_weight=s, ell_min=0, ell_max=ell_max)
+        # Fused chains agree with applying the operators one at a time
+        for fused, expected in [(op.eth * op.eth * op.ethbar, m.ethbar.eth.eth),
+                                (op.eth**2 * op.ethbar, m.ethbar.eth.eth),
+                                (op.ethbar**2, m.ethbar.ethbar),
+                                (op.Lsquared * op.Lz, m.Lz().Lsquared()),
+                                (op.Lplus * op.Rminus * op.Lminus, m.Lminus().Rminus().Lplus()),
+                                (op.Lplus + op.Lminus, m.Lplus() + m.Lminus()),
+                                (2 * op.Lz - op.Lsquared / 3 + 1, 2 * m.Lz() - m.Lsquared() / 3 + m),
+                                (op.eth**0, m)]:
+            d = fused(m)
+            assert isinstance(d, sf.Modes) and d.s == expected.s
+            assert np.allclose(d, expected, rtol=tolerance, atol=tolerance)
+            out = np.zeros_like(a)
+            fused(m, out=out)
+            assert np.allclose(out, expected.view(np.ndarray), rtol=tolerance, atol=tolerance)
+        # Commutators, as single operators
+        assert np.allclose((op.Lz * op.Lplus - op.Lplus * op.Lz)(m), m.Lplus(), rtol=tolerance, atol=tolerance)
+        assert np.allclose((op.Lplus * op.Lminus - op.Lminus * op.Lplus)(m), 2 * m.Lz(), rtol=tolerance, atol=tolerance)
+        assert np.allclose((op.ethbar * op.eth - op.eth * op.ethbar)(m), 2 * s * m, rtol=tolerance, atol=tolerance)
+        assert np.allclose((op.Lz * op.Lsquared - op.Lsquared * op.Lz)(m), 0, rtol=tolerance, atol=tolerance)
+        # In-place application of a multi-shift sum
+        b = m.copy()
+        (op.Lplus + op.Lminus)(b, out=b)
+        assert np.allclose(b, m.Lplus() + m.Lminus(), rtol=tolerance, atol=tolerance)
+    with pytest.raises(ValueError):
+        op.eth + op.ethbar
+    with pytest.raises(ValueError):
+        op.eth**-1
+
+
 def test_modes_derivatives_on_grids():
     # Test various SWSH-derivative expressions on grids
     tolerance = 2e-14
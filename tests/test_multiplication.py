@@ -475,3 +475,75 @@ def test_first_nontrivial_multiplication(multiplication_function):
             assert ellmin_gf == 0
             assert ellmax_gf == ellmax_g + ellmax_f
             assert np.allclose(gf[:i_max+1], fg2[:i_max+1], atol=atol, rtol=rtol)
+
+
+def test_multiplication_coupling_tensor(monkeypatch):
+    """Test products over leading axes, and agreement between the cached tensor and direct kernel"""
+    from spherical_functions import multiplication
+    np.random.seed(1234)
+    ellmax_f, s_f, ellmax_g, s_g = 5, 1, 4, -2
+    f = np.random.normal(size=(3, 1, sf.LM_total_size(0, ellmax_f))) + 1j*np.random.normal(size=(3, 1, sf.LM_total_size(0, ellmax_f)))
+    g = np.random.normal(size=(4, sf.LM_total_size(0, ellmax_g))) + 1j*np.random.normal(size=(4, sf.LM_total_size(0, ellmax_g)))
+    fg = sf.multiply(f, 0, ellmax_f, s_f, g, 0, ellmax_g, s_g)[0]
+    assert fg.shape == (3, 4, sf.LM_total_size(0, ellmax_f+ellmax_g))
+    for i in range(3):
+        for j in range(4):
+            assert np.allclose(fg[i, j], sf.multiply(f[i, 0], 0, ellmax_f, s_f, g[j], 0, ellmax_g, s_g)[0],
+                               rtol=1e-14, atol=1e-14)
+    tensor = multiplication._coupling_tensor(0, ellmax_f, s_f, 0, ellmax_g, s_g, 0, ellmax_f+ellmax_g, s_f+s_g)
+    assert tensor is multiplication._coupling_tensor(0, ellmax_f, s_f, 0, ellmax_g, s_g, 0, ellmax_f+ellmax_g, s_f+s_g)
+    monkeypatch.setattr(multiplication, 'coupling_tensor_max_size', 0)
+    multiplication.clear_coupling_tensor_cache()
+    try:
+        assert multiplication._coupling_tensor(0, ellmax_f, s_f, 0, ellmax_g, s_g, 0, ellmax_f+ellmax_g, s_f+s_g) is None
+        assert np.allclose(sf.multiply(f, 0, ellmax_f, s_f, g, 0, ellmax_g, s_g)[0], fg, rtol=1e-14, atol=1e-14)
+    finally:
+        multiplication.clear_coupling_tensor_cache()
+
+
+def test_multiplication_coupling_tensor_cache(monkeypatch):
+    """Test that the cached coupling tensors stay within the limits on their number and total size"""
+    from spherical_functions import multiplication
+    multiplication.clear_coupling_tensor_cache()
+    keys = [(0, ellmax, 0, 0, ellmax, 0, 0, 2*ellmax, 0) for ellmax in range(1, 7)]
+    try:
+        monkeypatch.setattr(multiplication, 'coupling_tensor_cache_size', 4)
+        tensors = [multiplication._coupling_tensor(*key) for key in keys]
+        assert list(multiplication._coupling_tensor_cache) == keys[-4:]
+        assert multiplication._coupling_tensor(*keys[-1]) is tensors[-1]
+        nbytes = [multiplication._coupling_tensor_nbytes(tensor) for tensor in tensors]
+        monkeypatch.setattr(multiplication, 'coupling_tensor_cache_bytes', nbytes[-1] + nbytes[-2])
+        multiplication.clear_coupling_tensor_cache()
+        for key in keys[-3:]:
+            multiplication._coupling_tensor(*key)
+        assert list(multiplication._coupling_tensor_cache) == keys[-2:]
+        multiplication.clear_coupling_tensor_cache()
+        assert not multiplication._coupling_tensor_cache
+    finally:
+        multiplication.clear_coupling_tensor_cache()
+
+
+def test_multiplication_kernel_chunks():
+    """Test that the direct kernel gives the same result however the leading axes are split"""
+    from spherical_functions import multiplication
+    np.random.seed(1234)
+    ellmin_f, ellmax_f, s_f, ellmin_g, ellmax_g, s_g = 1, 4, 1, 2, 3, 0
+    ellmin_fg, ellmax_fg, s_fg = 2, ellmax_f+ellmax_g, s_f+s_g
+    N = 11
+    f = np.random.normal(size=(sf.LM_total_size(ellmin_f, ellmax_f), N, 2)).view(complex)[..., 0]
+    g = np.random.normal(size=(sf.LM_total_size(ellmin_g, ellmax_g), N, 2)).view(complex)[..., 0]
+    indptr, index_f, index_g, coefficients = multiplication._coupling_tensor(ellmin_f, ellmax_f, s_f,
+                                                                             ellmin_g, ellmax_g, s_g,
+                                                                             ellmin_fg, ellmax_fg, s_fg)
+    expected = np.zeros((sf.LM_total_size(ellmin_fg, ellmax_fg), N), dtype=complex)
+    for k in range(indptr.size-1):
+        for p in range(indptr[k], indptr[k+1]):
+            expected[k] += coefficients[p] * f[index_f[p]] * g[index_g[p]]
+    for n_chunks in [1, 3, N]:
+        fg = np.zeros_like(expected)
+        multiplication._multiplication_kernel(f, ellmin_f, ellmax_f, s_f, g, ellmin_g, ellmax_g, s_g,
+                                              fg, ellmin_fg, ellmax_fg, s_fg, n_chunks)
+        assert np.allclose(fg, expected, rtol=1e-14, atol=1e-14)
+        fg = np.zeros_like(expected)
+        multiplication._coupling_contraction(indptr, index_f, index_g, coefficients, f, g, fg)
+        assert np.allclose(fg, expected, rtol=1e-14, atol=1e-14)
@@ -8,6 +8,7 @@ import numpy as np
 import quaternion
 import spherical_functions as sf
 from spherical_functions.WignerD.WignerDRecursion import HCalculator, _step_2, _step_3, _step_4, _step_5, _step_6
+from spherical_functions.WignerD.WignerDRecursion import triangle_index, triangle_total_size
 
 
 def test_WignerDRecursion_accuracy():
@@ -46,6 +47,66 @@ def test_WignerDRecursion_accuracy():
     print("Testing Wigner d recursion: max error = {}".format(max_error))
 
 
+def test_WignerDRecursion_parallel():
+    hcalc = HCalculator(12)
+    cosβ = 2*np.random.rand(37, 3) - 1
+    for mp_max in [None, 2]:
+        serial = hcalc(cosβ, mp_max=mp_max).copy()
+        for num_threads in [None, 1]:
+            parallel = hcalc(cosβ, mp_max=mp_max, parallel=True, num_threads=num_threads)
+            assert np.array_equal(serial, parallel)
+
+
+def test_WignerDRecursion_triangle():
+    n_max = 16
+    hcalc = HCalculator(n_max)
+    cosβ = 2*np.random.rand(13) - 1
+    Hnmpm = hcalc(cosβ).copy()
+    Htriangle = hcalc(cosβ, triangle=True).copy()
+    assert Htriangle.shape == (triangle_total_size(n_max), cosβ.size)
+    assert np.allclose(hcalc.materialize(Htriangle), Hnmpm, atol=1e-14, rtol=0.0)
+    for n, mp, m in sf.LMpM_range(0, n_max):
+        assert np.allclose(Htriangle[triangle_index(n, mp, m)], Hnmpm[sf.LMpM_index(n, mp, m, 0)], atol=1e-14, rtol=0.0)
+    assert np.array_equal(hcalc(cosβ, triangle=True, parallel=True), Htriangle)
+
+    # Restricting mp_max
+    mp_max = 3
+    rows = np.abs(sf.LMpM_range(0, n_max)[:, 1]) <= mp_max
+    Hnmpm = hcalc(cosβ, mp_max=mp_max).copy()
+    Htriangle = hcalc(cosβ, mp_max=mp_max, triangle=True)
+    assert np.allclose(hcalc.materialize(Htriangle, mp_max=mp_max)[rows], Hnmpm[rows], atol=1e-14, rtol=0.0)
+
+
+def test_WignerDRecursion_caching(tmp_path, monkeypatch):
+    from spherical_functions.WignerD import WignerDRecursion
+    hcalc1 = HCalculator(10)
+    hcalc2 = HCalculator(10)
+    assert hcalc1.d is hcalc2.d
+    assert not hcalc1.d.flags.writeable
+
+    # Coefficients persisted to disk are read back identically
+    monkeypatch.setattr(WignerDRecursion, 'coefficient_cache_directory', str(tmp_path))
+    WignerDRecursion._coefficients.cache_clear()
+    hcalc3 = HCalculator(10)
+    assert (tmp_path / 'HCalculator_coefficients_10.npz').exists()
+    WignerDRecursion._coefficients.cache_clear()
+    hcalc4 = HCalculator(10)
+    for key in ['sqrt_factorial_ratio', 'a', 'b', 'd', 'g', 'h', 'absm']:
+        assert np.array_equal(getattr(hcalc3, key), getattr(hcalc4, key), equal_nan=True)
+    WignerDRecursion._coefficients.cache_clear()
+
+    # Pooled workspaces are reused for the same shape, and give the same results
+    cosβ = 2*np.random.rand(5, 4) - 1
+    workspace = hcalc1.workspace(cosβ, pooled=True)
+    assert hcalc2.workspace(cosβ, pooled=True) is workspace
+    assert hcalc1.workspace(cosβ) is not workspace
+    # ...but each thread has its own pool
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        assert executor.submit(hcalc2.workspace, cosβ, True).result() is not workspace
+    assert np.array_equal(hcalc1(cosβ), hcalc1(cosβ, workspace=workspace))
+
+
 def test_WignerDRecursion_timing():
     import timeit
     import textwrap
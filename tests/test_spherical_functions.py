@@ -16,6 +16,44 @@ import spherical_functions as sf
 import numba  # This is to check to make sure we're actually using numba
 
 
+def test_import_does_not_compile():
+    # Importing the package should not compile any numba functions, and should only memory-map the
+    # coefficient tables
+    import sys
+    import subprocess
+    code = """\
+import numba, numpy as np, spherical_functions as sf
+dispatchers = [getattr(module, name) for module in list(sys.modules.values())
+               if getattr(module, '__name__', '').startswith('spherical_functions')
+               for name in dir(module)
+               if isinstance(getattr(module, name, None), numba.core.dispatcher.Dispatcher)]
+assert dispatchers
+print(sum(len(dispatcher.signatures) for dispatcher in dispatchers))
+print(isinstance(sf._Wigner_coefficients, np.memmap))
+"""
+    output = subprocess.check_output([sys.executable, '-c', 'import sys\n' + code]).decode().split()
+    assert output == ['0', 'True']
+
+
+def test_numba_cache(tmp_path):
+    # With caching turned on, compiled functions are written to the cache directory, and read back
+    # by later processes
+    import os
+    import sys
+    import subprocess
+    code = """\
+import spherical_functions as sf
+sf.LM_index(2, 1, 0)
+print(len(sf.LM_index.stats.cache_hits), len(sf.LM_index.stats.cache_misses))
+"""
+    env = dict(os.environ, SPHERICAL_FUNCTIONS_NUMBA_CACHE='1', NUMBA_CACHE_DIR=str(tmp_path))
+    output = subprocess.check_output([sys.executable, '-c', code], env=env).decode().split()
+    assert output == ['0', '1']
+    assert list(tmp_path.rglob('__init__.LM_index-*.nbi'))
+    output = subprocess.check_output([sys.executable, '-c', code], env=env).decode().split()
+    assert output == ['1', '0']
+
+
 def test_constant_as_ell_0_mode(special_angles):
     indices = np.array([[0, 0]])
     np.random.seed(123)
@@ -116,6 +154,61 @@ def test_Wigner_coefficient():
                 i += 1
 
 
+def test_coefficient_tables(tmp_path, monkeypatch):
+    from spherical_functions import _coefficient_tables
+    shipped_ell_max = _coefficient_tables.shipped_ell_max
+    monkeypatch.setenv('SPHERICAL_FUNCTIONS_CACHE_DIR', str(tmp_path))
+    for name, generator in _coefficient_tables._generators.items():
+        # Generated tables agree with the shipped tables (which were produced with mpmath)
+        a = generator(shipped_ell_max)
+        b = _coefficient_tables.load(name, shipped_ell_max)
+        assert a.shape == b.shape
+        assert np.allclose(a, b, atol=0.0, rtol=1e-15)
+        # Larger tables extend the shipped ones, and are cached on disk
+        c = _coefficient_tables.load(name, shipped_ell_max + 8)
+        assert np.allclose(c[:b.size], b, atol=0.0, rtol=1e-15)
+        assert (tmp_path / '{0}_{1}.npy'.format(name, shipped_ell_max + 8)).exists()
+        assert isinstance(_coefficient_tables.load(name, shipped_ell_max + 8), np.memmap)
+
+
+def test_coefficients_beyond_shipped_tables(tmp_path, monkeypatch):
+    # Values beyond the shipped tables come from larger tables, loaded when first needed
+    import mpmath
+    from spherical_functions import _coefficient_tables
+    monkeypatch.setenv('SPHERICAL_FUNCTIONS_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(_coefficient_tables, '_tables', {})
+    assert sf.ell_max < 35
+    assert sf.binomial_coefficient(70, 3) == nCk(70, 3) == 54740
+    assert np.isclose(sf.binomial_coefficient(97, 40), float(nCk(97, 40)), atol=0.0, rtol=1e-15)
+    assert np.isclose(sf.ladder_operator_coefficient(70, 3), math.sqrt(70 * 71 - 3 * 4), atol=0.0, rtol=1e-15)
+    assert np.isclose(sf._ladder_operator_coefficient(141, -7), math.sqrt(141 * 143 - 7 * 5) / 2, atol=0.0, rtol=1e-15)
+    mpmath.mp.dps = 50
+    for twoell, twomp, twom in [(80, 2, -6), (81, 5, -3), (96, -96, 96), (96, 40, 12)]:
+        tworho_min = max(0, twomp - twom)
+        b = float(mpmath.sqrt(mpmath.fac((twoell + twom)//2) * mpmath.fac((twoell - twom)//2)
+                              / (mpmath.fac((twoell + twomp)//2) * mpmath.fac((twoell - twomp)//2)))
+                  * mpmath.binomial((twoell + twomp)//2, tworho_min//2)
+                  * mpmath.binomial((twoell - twomp)//2, (twoell - twom - tworho_min)//2))
+        assert np.isclose(sf._Wigner_coefficient(twoell, twomp, twom), b, atol=0.0, rtol=1e-14)
+    assert sf.Wigner_coefficient(40, 1, -3) == sf._Wigner_coefficient(80, 2, -6)
+
+
+def test_coefficient_table(tmp_path, monkeypatch):
+    # Larger tables are only loaded when first requested, and then serve all smaller requests
+    from spherical_functions import _coefficient_tables
+    monkeypatch.setenv('SPHERICAL_FUNCTIONS_CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(_coefficient_tables, '_tables', {})
+    for name in _coefficient_tables._generators:
+        a = sf.coefficient_table(name, 4)
+        assert a.size == getattr(sf, '_' + name).size
+        assert not list(tmp_path.glob(name + '_*.npy'))
+        b = sf.coefficient_table(name, sf.ell_max + 8)
+        assert (tmp_path / '{0}_{1}.npy'.format(name, sf.ell_max + 8)).exists()
+        assert np.allclose(b[:a.size], a, atol=0.0, rtol=1e-15)
+        assert sf.coefficient_table(name, sf.ell_max + 2) is b
+        assert sf.coefficient_table(name, 4) is b
+
+
 
 def test_LM_range(ell_max):
     for l_max in range(ell_max + 1):
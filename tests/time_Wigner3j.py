@@ -0,0 +1,46 @@
+#! /usr/bin/env python
+
+# Copyright (c) 2020, Michael Boyle
+# See LICENSE file for details: <https://github.com/moble/spherical_functions/blob/master/LICENSE>
+
+"""Compare the speed of `Wigner3j` called in a python loop with the vectorized versions
+
+Run as
+
+    python tests/time_Wigner3j.py [j_max]
+
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import sys
+import timeit
+import numpy as np
+import spherical_functions as sf
+
+j_max = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+np.random.seed(1234)
+N = 1_000_000
+j_1, j_2 = np.random.randint(0, j_max+1, size=(2, N))
+j_3 = np.random.randint(abs(j_1-j_2), j_1+j_2+1)
+m_1 = np.random.randint(-j_1, j_1+1)
+m_2 = np.random.randint(-j_2, j_2+1)
+m_3 = -m_1 - m_2  # Some of these are out of range, which is fine
+
+# Compile everything first
+sf.Wigner3j(2, 6, 4, 0, 0, 0)
+sf.Wigner3j_vectorized(j_1[:2], j_2[:2], j_3[:2], m_1[:2], m_2[:2], m_3[:2], target='cpu')
+sf.Wigner3j_vectorized(j_1[:2], j_2[:2], j_3[:2], m_1[:2], m_2[:2], m_3[:2], target='parallel')
+
+n_loop = N // 20
+args = list(zip(j_1[:n_loop].tolist(), j_2[:n_loop].tolist(), j_3[:n_loop].tolist(),
+                m_1[:n_loop].tolist(), m_2[:n_loop].tolist(), m_3[:n_loop].tolist()))
+loop = min(timeit.repeat(lambda: [sf.Wigner3j(*a) for a in args], number=1, repeat=3)) / n_loop
+cpu = min(timeit.repeat(lambda: sf.Wigner3j_vectorized(j_1, j_2, j_3, m_1, m_2, m_3, target='cpu'),
+                        number=1, repeat=3)) / N
+parallel = min(timeit.repeat(lambda: sf.Wigner3j_vectorized(j_1, j_2, j_3, m_1, m_2, m_3, target='parallel'),
+                             number=1, repeat=3)) / N
+print("With j_max={0}, average time per symbol:".format(j_max))
+print("    python loop over Wigner3j: {0:.0f} ns".format(1e9 * loop))
+print("    Wigner3j_vectorized (cpu): {0:.0f} ns ({1:.1f}x faster)".format(1e9 * cpu, loop / cpu))
+print("    Wigner3j_vectorized (parallel): {0:.0f} ns ({1:.1f}x faster)".format(1e9 * parallel, loop / parallel))
@@ -30,7 +30,7 @@ for i, ell_max in enumerate(ells):
         [[ell, mp, m] for ell in range(ell_max + 1) for mp in range(-ell, ell + 1) for m in range(-ell, ell + 1)],
         dtype=int)
     elements = np.empty((indices.shape[0],), dtype=complex)
-    result = ipython.magic("timeit -o sf._Wigner_D_element(q.a, q.b, indices, elements)")
+    result = ipython.magic("timeit -o sf._Wigner_D_element(sf._Wigner_coefficients, q.a, q.b, indices, elements)")
     evals[i] = len(indices)
     nanoseconds[i] = 1e9 * result.best / len(indices)
     print("With ell_max={0}, and {1} evaluations, each D component averages {2:.0f} ns".format(ell_max, evals[i],
@@ -35,7 +35,7 @@ for i, ell_max in enumerate(ells):
         [[ell, mp, m] for ell in range(ell_max + 1) for mp in range(-ell, ell + 1) for m in range(-ell, ell + 1)],
         dtype=int)
     elements = np.zeros((indices.shape[0],), dtype=complex)
-    result = ipython.magic("timeit -o sf._Wigner_D_matrices(q.a, q.b, 0, ell_max, elements)")
+    result = ipython.magic("timeit -o sf._Wigner_D_matrices(sf._Wigner_coefficients, q.a, q.b, 0, ell_max, elements)")
     evals[i] = len(indices)
     nanoseconds[i] = 1e9 * result.best / evals[i]
     print("With ell_max={0}, and {1} evaluations, each D component averages {2:.0f} ns".format(ell_max, evals[i],
@@ -0,0 +1,38 @@
+#! /usr/bin/env python
+
+# Copyright (c) 2020, Michael Boyle
+# See LICENSE file for details: <https://github.com/moble/spherical_functions/blob/master/LICENSE>
+
+"""Measure the time taken to import spherical_functions in a fresh process
+
+The time taken to import numba and quaternion (which this package cannot avoid) is measured
+separately, and subtracted.  Run as
+
+    python tests/time_import.py [number_of_repetitions]
+
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import sys
+import subprocess
+
+code = """\
+import time
+t0 = time.perf_counter()
+import numba, quaternion
+t1 = time.perf_counter()
+import spherical_functions
+t2 = time.perf_counter()
+print(t1 - t0, t2 - t1)
+"""
+
+number = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+times = []
+for i in range(number):
+    output = subprocess.check_output([sys.executable, '-c', code])
+    dependencies, package = [float(t) for t in output.decode().split()]
+    times.append(package)
+    print("Dependencies: {0:.3f} s;  spherical_functions: {1:.3f} s".format(dependencies, package))
+    sys.stdout.flush()
+print("Best time to import spherical_functions: {0:.1f} ms".format(1_000 * min(times)))
@@ -0,0 +1,54 @@
+#! /usr/bin/env python
+
+# Copyright (c) 2020, Michael Boyle
+# See LICENSE file for details: <https://github.com/moble/spherical_functions/blob/master/LICENSE>
+
+"""Measure the throughput of rotating one set of modes by many rotors
+
+The factored rotation in `spherical_functions.rotate_modes` is compared to computing the
+full D matrices for each rotor with `Wigner_D_matrices` and applying them.  Run as
+
+    python tests/time_rotate_modes.py [number_of_rotors]
+
+"""
+
+from __future__ import print_function, division, absolute_import
+
+import sys
+import time
+import numpy as np
+import quaternion
+import spherical_functions as sf
+
+n_rotors = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+np.random.seed(1234)
+R = quaternion.from_rotation_vector(np.random.uniform(-np.pi, np.pi, size=(n_rotors, 3)))
+
+
+def rotate_with_D_matrices(modes, ell_max, R):
+    D = sf.Wigner_D_matrices(R, 0, ell_max)
+    rotated = np.empty(R.shape + modes.shape, dtype=complex)
+    for ell in range(ell_max+1):
+        i0, i1 = sf.LM_index(ell, -ell, 0), sf.LM_index(ell, ell, 0)+1
+        D_ell = D[:, sf.LMpM_index(ell, -ell, -ell, 0):sf.LMpM_index(ell, ell, ell, 0)+1]
+        rotated[:, i0:i1] = np.einsum('jab,b->ja', D_ell.reshape((-1, 2*ell+1, 2*ell+1)).conjugate(), modes[i0:i1])
+    return rotated
+
+
+def best_time(function, *args, number=3):
+    function(*args)
+    times = []
+    for i in range(number):
+        t0 = time.perf_counter()
+        function(*args)
+        times.append(time.perf_counter() - t0)
+    return min(times)
+
+
+for ell_max in [2, 4, 8, 16, 32]:
+    modes = np.random.normal(size=(sf.LM_total_size(0, ell_max), 2)).view(complex)[:, 0]
+    t_D = best_time(rotate_with_D_matrices, modes, ell_max, R)
+    t_factored = best_time(sf.rotate_modes, modes, 0, ell_max, R)
+    print("ell_max={0:2}: D matrices {1:9.0f} rotors/s;  factored {2:9.0f} rotors/s;  speedup {3:.1f}x".format(
+        ell_max, n_rotors / t_D, n_rotors / t_factored, t_D / t_factored))
+    sys.stdout.flush()